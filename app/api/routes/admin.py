@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.database import get_db
 from app.services.admin_service import AdminService
+from app.services.db import DatabaseService
 from app.schemas.admin import AdminUpdate
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -25,4 +26,9 @@ async def toggle_user_admin(
     success = await AdminService.toggle_user_admin(db, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
-    return {"message": "User admin status toggled"}
\ No newline at end of file
+    return {"message": "User admin status toggled"}
+
+@router.get("/db-pool")
+async def get_db_pool_stats():
+    """Состояние пулов соединений с БД"""
+    return DatabaseService.get_pool_stats()
@@ -1,19 +1,19 @@
 # app/api/routes/duty.py
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_
 from typing import List, Optional, Dict, Any
 from datetime import date, datetime, timedelta
 from enum import Enum
-from collections import defaultdict
 import calendar
-from app.models.database import get_db
-from app.models.user import User, FIO, Sector
+from app.models.database import get_db, get_session_factory
+from app.models.user import User
 from app.models.duty import DutyAdminPool, DutySchedule, DutyStatistics
+from app.models.loaders import load_profile
 from app.services.duty_service import DutyService
 from app.services.user_service import UserService
 from app.services.health_service import HealthService
+from app.services.name_resolver import user_name_resolver, default_user_name
 from app.schemas.duty import (
     DutyAdminPoolCreate,
     DutyAdminPoolResponse,
@@ -124,19 +124,7 @@ async def assign_weekly_manual(
             )
 
     # Получаем ФИО пользователя
-    from app.models.user import FIO
-
-    fio_query = await db.execute(select(FIO).where(FIO.user_id == user.user_id))
-    fio = fio_query.scalar_one_or_none()
-
-    if fio and fio.last_name and fio.first_name:
-        user_name = f"{fio.last_name} {fio.first_name}".strip()
-    else:
-        user_name = (
-            f"{user.last_name} {user.first_name}".strip()
-            if user.last_name and user.first_name
-            else f"Пользователь {user.user_id}"
-        )
+    user_name = await user_name_resolver.resolve(db, user.user_id)
 
     # Создаем записи в расписании
     from app.models.duty import DutySchedule, DutyStatistics
@@ -262,7 +250,6 @@ async def get_available_admins(
     """
     Получить список доступных администраторов для назначения на неделю
     """
-    from app.models.user import User, FIO
     from app.models.duty import DutyAdminPool, DutySchedule, DutyStatistics
 
     # Получаем всех активных дежурных в пуле
@@ -278,13 +265,8 @@ async def get_available_admins(
 
     pool_user_ids = [p.user_id for p in active_pool]
 
-    # Получаем информацию о пользователях
-    users_query = await db.execute(select(User).where(User.user_id.in_(pool_user_ids)))
-    users = {u.user_id: u for u in users_query.scalars().all()}
-
-    # Получаем ФИО пользователей
-    fio_query = await db.execute(select(FIO).where(FIO.user_id.in_(pool_user_ids)))
-    fios = {f.user_id: f for f in fio_query.scalars().all()}
+    # Получаем имена пользователей
+    user_names = await user_name_resolver.resolve_many(db, pool_user_ids)
 
     # Получаем админа с прошлой недели (если нужно исключить)
     prev_admin_id = None
@@ -320,21 +302,10 @@ async def get_available_admins(
         if exclude_last_week and prev_admin_id == user_id:
             continue
 
-        user = users.get(user_id)
-        fio = fios.get(user_id)
-
-        # Формируем имя
-        if fio and fio.last_name and fio.first_name:
-            user_name = f"{fio.last_name} {fio.first_name}".strip()
-        elif user and user.last_name and user.first_name:
-            user_name = f"{user.last_name} {user.first_name}".strip()
-        else:
-            user_name = f"Пользователь {user_id}"
-
         result.append(
             {
                 "user_id": user_id,
-                "user_name": user_name,
+                "user_name": user_names[user_id],
                 "total_duties": stats.get(user_id, 0),
             }
         )
@@ -380,18 +351,13 @@ async def add_to_duty_pool(
     result = await DutyService.add_to_pool(db, pool_data)
 
     # Загружаем дополнительные данные для ответа
-    from sqlalchemy.orm import selectinload
-
     refreshed = await db.execute(
         select(DutyAdminPool)
         .where(DutyAdminPool.pool_id == result.pool_id)
-        .options(
-            selectinload(DutyAdminPool.user),
-            selectinload(DutyAdminPool.sector),
-            selectinload(DutyAdminPool.added_by_user),
-        )
+        .options(*load_profile(DutyAdminPool, "list"))
     )
     result = refreshed.scalar_one()
+    result.user_name = await user_name_resolver.resolve(db, result.user_id)
 
     return result
 
@@ -420,33 +386,7 @@ async def get_sector_pool(
         db, sector_id, active_only, skip, limit
     )
 
-    # Добавляем имена пользователей и названия секторов
-    for item in items:
-        # Имя пользователя
-        if item.user:
-            # Пробуем получить из FIO
-            fio_result = await db.execute(
-                select(FIO).where(FIO.user_id == item.user_id)
-            )
-            fio = fio_result.scalar_one_or_none()
-            if fio:
-                item.user_name = f"{fio.last_name} {fio.first_name}".strip()
-            elif item.user.last_name and item.user.first_name:
-                item.user_name = f"{item.user.last_name} {item.user.first_name}".strip()
-            else:
-                item.user_name = f"Пользователь {item.user_id}"
-
-        # Название сектора
-        if item.sector:
-            item.sector_name = item.sector.name or f"Сектор {item.sector_id}"
-        else:
-            # Если сектор не загружен, получаем отдельно
-            sector_result = await db.execute(
-                select(Sector).where(Sector.sector_id == item.sector_id)
-            )
-            sector = sector_result.scalar_one_or_none()
-            item.sector_name = sector.name if sector else f"Сектор {item.sector_id}"
-
+    # Имена пользователей и названия секторов подставлены сервисом
     return {"items": items, "total": total, "skip": skip, "limit": limit}
 
 
@@ -548,12 +488,15 @@ async def get_month_schedule(
     if sector_id:
         query = query.where(DutySchedule.sector_id == sector_id)
 
-    query = query.options(
-        selectinload(DutySchedule.user), selectinload(DutySchedule.sector)
-    ).order_by(DutySchedule.duty_date)
+    query = query.options(*load_profile(DutySchedule, "schedule")).order_by(
+        DutySchedule.duty_date
+    )
 
     result = await db.execute(query)
     duties = result.scalars().all()
+    user_names = await user_name_resolver.resolve_many(
+        db, [duty.user_id for duty in duties]
+    )
 
     # Группируем по датам
     duties_by_date = {}
@@ -562,16 +505,7 @@ async def get_month_schedule(
         if date_str not in duties_by_date:
             duties_by_date[date_str] = []
 
-        user_name = "Неизвестно"
-        if duty.user:
-            fio_result = await db.execute(
-                select(FIO).where(FIO.user_id == duty.user_id)
-            )
-            fio = fio_result.scalar_one_or_none()
-            if fio:
-                user_name = f"{fio.last_name} {fio.first_name}".strip()
-            elif duty.user.last_name and duty.user.first_name:
-                user_name = f"{duty.user.last_name} {duty.user.first_name}".strip()
+        user_name = user_names[duty.user_id]
 
         sector_name = duty.sector.name if duty.sector else f"Сектор {duty.sector_id}"
 
@@ -629,9 +563,7 @@ async def get_today_duty(
     if sector_id:
         query = query.where(DutySchedule.sector_id == sector_id)
 
-    query = query.options(
-        selectinload(DutySchedule.user), selectinload(DutySchedule.sector)
-    )
+    query = query.options(*load_profile(DutySchedule, "schedule"))
 
     result = await db.execute(query)
     duties = result.scalars().all()
@@ -639,21 +571,14 @@ async def get_today_duty(
     if not duties:
         return {"message": "Сегодня нет назначенных дежурных", "duties": []}
 
+    user_names = await user_name_resolver.resolve_many(
+        db, [duty.user_id for duty in duties]
+    )
+
     response = []
     for duty in duties:
         # Получаем ФИО пользователя
-        user_name = "Неизвестно"
-        if duty.user:
-            fio_result = await db.execute(
-                select(FIO).where(FIO.user_id == duty.user_id)
-            )
-            fio = fio_result.scalar_one_or_none()
-            if fio:
-                user_name = f"{fio.last_name} {fio.first_name}".strip()
-            elif duty.user.last_name and duty.user.first_name:
-                user_name = f"{duty.user.last_name} {duty.user.first_name}".strip()
-            else:
-                user_name = f"Пользователь {duty.user_id}"
+        user_name = user_names[duty.user_id]
 
         # Получаем название сектора
         sector_name = f"Сектор {duty.sector_id}"
@@ -707,12 +632,15 @@ async def get_week_schedule(
     if sector_id:
         query = query.where(DutySchedule.sector_id == sector_id)
 
-    query = query.options(
-        selectinload(DutySchedule.user), selectinload(DutySchedule.sector)
-    ).order_by(DutySchedule.duty_date)
+    query = query.options(*load_profile(DutySchedule, "schedule")).order_by(
+        DutySchedule.duty_date
+    )
 
     result = await db.execute(query)
     duties = result.scalars().all()
+    user_names = await user_name_resolver.resolve_many(
+        db, [duty.user_id for duty in duties]
+    )
 
     # Группируем по датам
     days_of_week = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
@@ -720,16 +648,7 @@ async def get_week_schedule(
 
     for duty in duties:
         day_index = duty.duty_date.weekday()  # 0 = понедельник
-        user_name = "Неизвестно"
-        if duty.user:
-            fio_result = await db.execute(
-                select(FIO).where(FIO.user_id == duty.user_id)
-            )
-            fio = fio_result.scalar_one_or_none()
-            if fio:
-                user_name = f"{fio.last_name} {fio.first_name}".strip()
-            elif duty.user.last_name and duty.user.first_name:
-                user_name = f"{duty.user.last_name} {duty.user.first_name}".strip()
+        user_name = user_names[duty.user_id]
 
         schedule_by_day[day_index].append(
             {
@@ -798,12 +717,15 @@ async def get_month_schedule(
     if sector_id:
         query = query.where(DutySchedule.sector_id == sector_id)
 
-    query = query.options(
-        selectinload(DutySchedule.user), selectinload(DutySchedule.sector)
-    ).order_by(DutySchedule.duty_date)
+    query = query.options(*load_profile(DutySchedule, "schedule")).order_by(
+        DutySchedule.duty_date
+    )
 
     result = await db.execute(query)
     duties = result.scalars().all()
+    user_names = await user_name_resolver.resolve_many(
+        db, [duty.user_id for duty in duties]
+    )
 
     # Группируем по датам
     duties_by_date = {}
@@ -812,14 +734,7 @@ async def get_month_schedule(
         if date_str not in duties_by_date:
             duties_by_date[date_str] = []
 
-        user_name = "Неизвестно"
-        if duty.user:
-            fio_result = await db.execute(
-                select(FIO).where(FIO.user_id == duty.user_id)
-            )
-            fio = fio_result.scalar_one_or_none()
-            if fio:
-                user_name = f"{fio.last_name} {fio.first_name}".strip()
+        user_name = user_names[duty.user_id]
 
         duties_by_date[date_str].append(
             {
@@ -878,87 +793,37 @@ async def get_year_schedule(
     if not year:
         year = date.today().year
 
-    # Получаем статистику за год по месяцам
-    query = select(DutySchedule).where(
-        func.extract("year", DutySchedule.duty_date) == year
+    # Итоги и рейтинги считаются в БД, сюда приходят только агрегаты
+    month_totals, month_tops, top_users_yearly = await DutyService.get_year_summary(
+        db, year, sector_id
     )
-
-    if sector_id:
-        query = query.where(DutySchedule.sector_id == sector_id)
-
-    query = query.options(selectinload(DutySchedule.user))
-
-    result = await db.execute(query)
-    duties = result.scalars().all()
-
-    # Группируем по месяцам
-    monthly_stats = defaultdict(
-        lambda: {
-            "total_duties": 0,  # ← ИСПРАВЛЕНО: используем total_duties вместо total
-            "users": defaultdict(int),
-        }
+    user_names = await user_name_resolver.resolve_many(
+        db,
+        [user_id for users in month_tops.values() for user_id, _ in users]
+        + [user_id for user_id, _ in top_users_yearly],
     )
 
-    user_names = {}
-
-    for duty in duties:
-        month = duty.duty_date.month
-        monthly_stats[month]["total_duties"] += 1  # ← ИСПРАВЛЕНО
-
-        # Получаем имя пользователя
-        user_id = duty.user_id
-        if user_id not in user_names:
-            if duty.user:
-                fio_result = await db.execute(select(FIO).where(FIO.user_id == user_id))
-                fio = fio_result.scalar_one_or_none()
-                if fio:
-                    user_names[user_id] = f"{fio.last_name} {fio.first_name}".strip()
-                elif duty.user.last_name and duty.user.first_name:
-                    user_names[user_id] = (
-                        f"{duty.user.last_name} {duty.user.first_name}".strip()
-                    )
-                else:
-                    user_names[user_id] = f"ID {user_id}"
-
-        monthly_stats[month]["users"][user_id] += 1
-
     # Формируем данные для графика
     months = []
     for month in range(1, 13):
-        month_data = monthly_stats[month]
-
-        # Топ-3 дежурных в этом месяце
-        top_users = sorted(
-            month_data["users"].items(), key=lambda x: x[1], reverse=True
-        )[:3]
-
         months.append(
             {
                 "month": month,
                 "month_name": calendar.month_name[month],
-                "total_duties": month_data["total_duties"],  # ← ИСПРАВЛЕНО
+                "total_duties": month_totals.get(month, 0),
                 "top_users": [
                     {
                         "user_id": user_id,
-                        "user_name": user_names.get(user_id, f"ID {user_id}"),
+                        "user_name": user_names[user_id],
                         "count": count,
                     }
-                    for user_id, count in top_users
+                    for user_id, count in month_tops.get(month, [])
                 ],
             }
         )
 
     # Общая статистика за год
-    total_duties = sum(m["total_duties"] for m in months)  # ← ИСПРАВЛЕНО
-
-    # Статистика по пользователям за год
-    user_yearly_stats = defaultdict(int)
-    for duty in duties:
-        user_yearly_stats[duty.user_id] += 1
-
-    top_users_yearly = sorted(
-        user_yearly_stats.items(), key=lambda x: x[1], reverse=True
-    )[:5]
+    total_duties = sum(month_totals.values())
 
     return {
         "period": "year",
@@ -969,7 +834,7 @@ async def get_year_schedule(
         "top_users": [
             {
                 "user_id": user_id,
-                "user_name": user_names.get(user_id, f"ID {user_id}"),
+                "user_name": user_names[user_id],
                 "count": count,
             }
             for user_id, count in top_users_yearly
@@ -990,29 +855,11 @@ async def get_duty_statistics_chart(
     if not year:
         year = date.today().year
 
-    # Базовый запрос
-    query = select(DutySchedule).where(
-        func.extract("year", DutySchedule.duty_date) == year
+    # Обе гистограммы считаются в БД одним сгруппированным запросом
+    monthly_data, weekday_data = await DutyService.get_year_histograms(
+        db, year, sector_id, user_id
     )
-
-    if sector_id:
-        query = query.where(DutySchedule.sector_id == sector_id)
-    if user_id:
-        query = query.where(DutySchedule.user_id == user_id)
-
-    result = await db.execute(query)
-    duties = result.scalars().all()
-
-    # Данные для графика по месяцам
-    monthly_data = [0] * 12
-    for duty in duties:
-        monthly_data[duty.duty_date.month - 1] += 1
-
-    # Данные для графика по дням недели
-    weekday_data = [0] * 7
     weekday_names = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
-    for duty in duties:
-        weekday_data[duty.duty_date.weekday()] += 1
 
     return {
         "year": year,
@@ -1021,7 +868,7 @@ async def get_duty_statistics_chart(
             "data": monthly_data,
         },
         "weekly": {"labels": weekday_names, "data": weekday_data},
-        "total": len(duties),
+        "total": sum(monthly_data),
     }
 
 
@@ -1085,28 +932,8 @@ async def get_sector_statistics_summary(
     sector_id: int, year: Optional[int] = None, db: AsyncSession = Depends(get_db)
 ):
     """Получить сводку статистики по сектору"""
-    summary = await DutyService.get_sector_statistics_summary(db, sector_id, year)
-
-    # Добавляем имена пользователей
-    for item in summary:
-        # Получаем ФИО из таблицы fio
-        fio_result = await db.execute(select(FIO).where(FIO.user_id == item["user_id"]))
-        fio = fio_result.scalar_one_or_none()
-
-        if fio:
-            item["user_name"] = f"{fio.last_name} {fio.first_name}".strip()
-        else:
-            # Если нет в fio, пробуем получить из users
-            user_result = await db.execute(
-                select(User).where(User.user_id == item["user_id"])
-            )
-            user = user_result.scalar_one_or_none()
-            if user and user.last_name and user.first_name:
-                item["user_name"] = f"{user.last_name} {user.first_name}".strip()
-            else:
-                item["user_name"] = f"Пользователь {item['user_id']}"
-
-    return summary
+    # Имена пользователей уже подставлены сервисом в том же запросе
+    return await DutyService.get_sector_statistics_summary(db, sector_id, year)
 
 
 # ========== ДОПОЛНИТЕЛЬНЫЕ ЭНДПОИНТЫ ==========
@@ -1117,40 +944,34 @@ async def get_eligible_users(
     sector_id: Optional[int] = None, db: AsyncSession = Depends(get_db)
 ):
     """Получить список пользователей, которые могут быть дежурными"""
-    from sqlalchemy import select
-    from app.models.user import User, FIO
-
     query = select(User).where(User.is_duty_eligible == True)
     result = await db.execute(query)
     users = result.scalars().all()
 
+    # Участники пула сектора и имена - по одному запросу на всех
+    pool_user_ids = set()
+    if sector_id:
+        pool_result = await db.execute(
+            select(DutyAdminPool.user_id).where(
+                DutyAdminPool.sector_id == sector_id,
+                DutyAdminPool.is_active == True,
+            )
+        )
+        pool_user_ids = set(pool_result.scalars().all())
+
+    user_names = await user_name_resolver.resolve_many(
+        db, [user.user_id for user in users]
+    )
+
     response = []
     for user in users:
         # Проверяем, в пуле ли пользователь для данного сектора
-        in_pool = False
-        if sector_id:
-            pool_result = await db.execute(
-                select(DutyAdminPool).where(
-                    DutyAdminPool.user_id == user.user_id,
-                    DutyAdminPool.sector_id == sector_id,
-                    DutyAdminPool.is_active == True,
-                )
-            )
-            in_pool = pool_result.first() is not None
-
-        # Получаем ФИО из таблицы fio
-        fio_result = await db.execute(select(FIO).where(FIO.user_id == user.user_id))
-        fio = fio_result.scalar_one_or_none()
+        in_pool = user.user_id in pool_user_ids
 
         # Формируем имя
-        if fio and fio.last_name and fio.first_name:
-            user_name = f"{fio.last_name} {fio.first_name}".strip()
-        elif user.last_name and user.first_name:
-            user_name = f"{user.last_name} {user.first_name}".strip()
-        elif user.username:
+        user_name = user_names[user.user_id]
+        if user_name == default_user_name(user.user_id) and user.username:
             user_name = f"@{user.username}"
-        else:
-            user_name = f"Пользователь {user.user_id}"
 
         response.append(
             {
@@ -1298,6 +1119,19 @@ async def plan_yearly_duty_schedule(
     }
 
 
+@router.post("/plan-year/all")
+async def plan_yearly_duty_schedule_all_sectors(
+    year: int,
+    working_days_only: bool = Query(True, description="Только рабочие дни"),
+    created_by: Optional[int] = None,
+    session_factory=Depends(get_session_factory),
+):
+    """Спланировать дежурства на год для всех секторов (каждый в своей транзакции)"""
+    return await DutyService.plan_all_sectors(
+        year, working_days_only, created_by, session_factory=session_factory
+    )
+
+
 @router.get("/availability/{sector_id}")
 async def check_duty_availability(
     sector_id: int,
@@ -1309,20 +1143,21 @@ async def check_duty_availability(
 
     # Получаем всех активных дежурных
     pool_result = await db.execute(
-        select(DutyAdminPool)
-        .where(DutyAdminPool.sector_id == sector_id, DutyAdminPool.is_active == True)
-        .options(selectinload(DutyAdminPool.user))
+        select(DutyAdminPool).where(
+            DutyAdminPool.sector_id == sector_id, DutyAdminPool.is_active == True
+        )
     )
     active_pool = pool_result.scalars().all()
+    user_names = await user_name_resolver.resolve_many(
+        db, [pool_entry.user_id for pool_entry in active_pool]
+    )
 
     # Получаем уже назначенные дежурства на этот период
     schedule_result = await db.execute(
-        select(DutySchedule)
-        .where(
+        select(DutySchedule).where(
             DutySchedule.sector_id == sector_id,
             DutySchedule.duty_date.between(start_date, end_date),
         )
-        .options(selectinload(DutySchedule.user))
     )
     existing = schedule_result.scalars().all()
 
@@ -1336,16 +1171,7 @@ async def check_duty_availability(
     # Формируем ответ
     availability = []
     for pool_entry in active_pool:
-        user = pool_entry.user
-        user_name = "Неизвестно"
-        if user:
-            fio_result = await db.execute(
-                select(FIO).where(FIO.user_id == user.user_id)
-            )
-            fio = fio_result.scalar_one_or_none()
-            if fio:
-                user_name = f"{fio.last_name} {fio.first_name}".strip()
-
+        user_name = user_names[pool_entry.user_id]
         duties_count = len(user_duties.get(pool_entry.user_id, []))
 
         availability.append(
@@ -26,21 +26,12 @@ async def get_health_report(
             final_sector_id = user_sector
     
     # Получаем отчет
-    status_stats, users_data = await HealthService.get_report(db, final_sector_id)
+    status_stats, users_list = await HealthService.get_report(db, final_sector_id)
     
     # Получаем название сектора если нужно
     if include_sector_name and final_sector_id:
         sector_name = await HealthService.get_sector_name(db, final_sector_id)
     
-    users_list = []
-    for user in users_data:
-        users_list.append({
-            "first_name": user[0],
-            "last_name": user[1],
-            "status": user[2],
-            "disease": user[3] if user[3] else ""
-        })
-    
     # Создаем ответ
     response = ReportResponse(
         status_summary=status_stats,
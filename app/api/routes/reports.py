@@ -0,0 +1,17 @@
+# app/api/routes/reports.py
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
+from app.models.database import get_db
+from app.services.report_service import ReportService
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+
+@router.get("/daily-digest")
+async def get_daily_digest(
+    day: Optional[date] = None, db: AsyncSession = Depends(get_db)
+):
+    """Отчеты о здоровье и дежурные по всем секторам одним ответом"""
+    return await ReportService.get_daily_digest(db, day)
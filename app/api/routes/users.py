@@ -1,9 +1,14 @@
 # app/api/routes/users.py - ИСПРАВЛЕННАЯ ВЕРСИЯ
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from datetime import datetime
 from app.models.database import get_db
 from app.services.user_service import UserService
+from app.services.name_resolver import user_name_resolver
+from app.services.user_search import UserSearchService
+from app.services.health_snapshot import health_report_snapshot
+from app.services.health_buffer import health_write_buffer
 from app.schemas.user import UserCreate, UserResponse, UserUpdate, UserStatusUpdate
 from app.schemas.health import HealthUpdate, DiseaseUpdate
 
@@ -11,20 +16,49 @@ router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[int] = Query(None, description="Курсор: последний user_id предыдущей страницы"),
+    enable_admin: Optional[bool] = None,
+    sector_id: Optional[int] = None,
+    enable_report: Optional[bool] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    users = await UserService.get_all_users(db, skip, limit)
+    """
+    Список пользователей по возрастанию user_id
+    
+    Общее количество и курсор следующей страницы возвращаются в заголовках
+    X-Total-Count и X-Next-Cursor, тело ответа остается списком.
+    """
+    filters = dict(enable_admin=enable_admin, sector_id=sector_id, enable_report=enable_report)
+    # UserResponse содержит вложенные статус, ФИО, здоровье и заболевание
+    users = await UserService.get_all_users(
+        db, skip, limit + 1, after, profile="detail", **filters
+    )
+    
+    response.headers["X-Total-Count"] = str(await UserService.count_users(db, **filters))
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-Cursor"] = str(users[-1].user_id)
+    
     return users
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
-    user = await UserService.get_user_by_id(db, user_id)
+    user = await UserService.get_user_by_id(db, user_id, profile="detail")
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+@router.get("/{user_id}/permissions")
+async def get_user_permissions(user_id: int, db: AsyncSession = Depends(get_db)):
+    """Облегченная проверка прав (для бота), без полной карточки пользователя"""
+    permissions = await UserService.get_user_permissions(db, user_id)
+    if not permissions:
+        raise HTTPException(status_code=404, detail="User not found")
+    return permissions
+
 @router.post("/", response_model=UserResponse)
 async def create_user(
     user_data: UserCreate,
@@ -67,7 +101,7 @@ async def update_user_status(
         raise HTTPException(status_code=404, detail="User not found")
     
     await UserService.update_user_status(db, user_id, status_data)
-    return await UserService.get_user_by_id(db, user_id)
+    return await UserService.get_user_by_id(db, user_id, profile="detail")
 
 @router.put("/{user_id}/health")
 async def update_user_health(
@@ -84,34 +118,39 @@ async def update_user_health(
     if not status:
         raise HTTPException(status_code=400, detail="Status is required")
     
-    # Обновляем статус здоровья
-    health, updated_disease = await UserService.update_health_status(
-        db, user_id, status, reset_disease=(status != "болен")
-    )
-    
-    # Если статус "болен" и указано заболевание - обновляем
-    if status == "болен" and disease:
-        await UserService.update_disease(db, user_id, disease)
+    if health_write_buffer.running:
+        # Отложенная запись: изменение уйдет в БД пачкой вместе с другими
+        status, disease = health_write_buffer.submit(user_id, status, disease)
+        return {
+            "user_id": user_id,
+            "health_info": {
+                "status": status
+            },
+            "disease_info": {
+                "disease": disease or ""
+            },
+            "pending": True
+        }
     
-    # Возвращаем обновленного пользователя с деталями
-    user_details = await UserService.get_user_with_details(db, user_id)
-    if not user_details or not user_details.get("user"):
+    # Статус и заболевание записываются одной транзакцией, ответ - из RETURNING
+    row = await UserService.set_health_status(db, user_id, status, disease)
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Формируем ответ
     response = {
-        "id": user_details["user"].id,
-        "user_id": user_details["user"].user_id,
-        "first_name": user_details["user"].first_name,
-        "last_name": user_details["user"].last_name,
-        "username": user_details["user"].username,
-        "created_at": user_details["user"].created_at,
-        "updated_at": user_details["user"].updated_at,
+        "id": row["id"],
+        "user_id": row["user_id"],
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+        "username": row["username"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
         "health_info": {
-            "status": health.status if health else None
+            "status": row["status"]
         },
         "disease_info": {
-            "disease": user_details["disease"].disease if user_details.get("disease") else ""
+            "disease": row["disease"] or ""
         }
     }
     
@@ -127,9 +166,10 @@ async def update_health_status_only(
     from app.services.user_service import UserService
     
     if health_data.status:
+        await health_write_buffer.flush_user(user_id)
         await UserService.update_health_status(db, user_id, health_data.status)
     
-    updated_user = await UserService.get_user_by_id(db, user_id)
+    updated_user = await UserService.get_user_by_id(db, user_id, profile="detail")
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -145,9 +185,10 @@ async def update_disease_only(
     from app.services.user_service import UserService
     
     if disease_data.disease:
+        await health_write_buffer.flush_user(user_id)
         await UserService.update_disease(db, user_id, disease_data.disease)
     
-    updated_user = await UserService.get_user_by_id(db, user_id)
+    updated_user = await UserService.get_user_by_id(db, user_id, profile="detail")
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -170,7 +211,7 @@ async def register_user(
             raise HTTPException(status_code=400, detail="Missing required fields")
         
         # Проверяем существование пользователя
-        existing_user = await UserService.get_user_by_id(db, user_id)
+        existing_user = await UserService.get_user_by_id(db, user_id, profile="detail")
         if existing_user:
             return {
                 "status": "success", 
@@ -238,13 +279,11 @@ async def register_user(
                 )
                 
                 await db.commit()
+                user_name_resolver.invalidate(user_id)
+                await health_report_snapshot.refresh_user(db, user_id)
                 
                 # Получаем пользователя
-                from sqlalchemy import select
-                result = await db.execute(
-                    select(User).where(User.user_id == user_id)
-                )
-                user = result.scalar_one_or_none()
+                user = await UserService.get_user_by_id(db, user_id, profile="detail")
                 
                 return {
                     "status": "success",
@@ -267,53 +306,54 @@ async def search_users(
     limit: int = 20,
     db: AsyncSession = Depends(get_db)
 ):
-    """Поиск пользователей по имени, фамилии или username"""
-    from sqlalchemy import or_, select
-    from app.models.user import User, FIO
-    
-    # Создаем запрос с JOIN
-    query = (
-        select(User)
-        .join(FIO, FIO.user_id == User.user_id)
-        .where(
-            or_(
-                User.first_name.ilike(f"%{q}%"),
-                User.last_name.ilike(f"%{q}%"),
-                User.username.ilike(f"%{q}%"),
-                FIO.first_name.ilike(f"%{q}%"),
-                FIO.last_name.ilike(f"%{q}%")
-            )
-        )
-        .offset(skip)
-        .limit(limit)
-    )
-    
-    result = await db.execute(query)
-    users = result.scalars().all()
-    
-    # Форматируем ответ
-    users_list = []
-    for user in users:
-        users_list.append({
-            "id": user.id,
-            "user_id": user.user_id,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "username": user.username,
-            "created_at": user.created_at,
-            "updated_at": user.updated_at
-        })
+    """
+    Поиск пользователей по имени, фамилии или username
+
+    Регистр (в том числе кириллицы) и ё/е не различаются, результаты
+    отсортированы по сходству с запросом (см. UserSearchService).
+    """
+    users_list = await UserSearchService.search(db, q, skip, limit)
     
     return {"users": users_list, "total": len(users_list), "query": q}
 
 
+@router.get("/directory/")
+async def get_users_directory(
+    updated_since: Optional[datetime] = Query(
+        None, description="Только пользователи, измененные начиная с этого момента"
+    ),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Справочник пользователей для поиска в боте (inline-режим)
+    
+    Без updated_since - все пользователи, с ним - изменения для
+    инкрементального обновления; cursor передается в следующий запрос.
+    """
+    users, cursor = await UserService.get_directory(db, updated_since)
+    return {
+        "users": users,
+        "total": len(users),
+        "cursor": cursor or updated_since,
+    }
+
+
 @router.get("/admin/list")
 async def get_users_for_admin(
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[int] = Query(None, description="Курсор: последний user_id предыдущей страницы"),
+    enable_admin: Optional[bool] = None,
+    sector_id: Optional[int] = None,
+    enable_report: Optional[bool] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Получить список пользователей для админ-панели с расширенной информацией"""
+    """
+    Получить список пользователей для админ-панели с расширенной информацией
+    
+    Поддерживает keyset-пагинацию по user_id (after/next_cursor) и фильтры
+    по правам, сектору и включенному отчету; total - общее число записей.
+    """
     from sqlalchemy import select
     from app.models.user import User, UserStatus, FIO, Health, Disease
     
@@ -336,14 +376,23 @@ async def get_users_for_admin(
         .outerjoin(FIO, User.user_id == FIO.user_id)
         .outerjoin(Health, User.user_id == Health.user_id)
         .outerjoin(Disease, User.user_id == Disease.user_id)
-        .order_by(User.user_id)
-        .offset(skip)
-        .limit(limit)
     )
+    filters = dict(enable_admin=enable_admin, sector_id=sector_id, enable_report=enable_report)
+    query = UserService.filter_users(query, **filters)
+    
+    if after is not None:
+        query = query.where(User.user_id > after)
+    else:
+        query = query.offset(skip)
     
-    result = await db.execute(query)
+    result = await db.execute(query.order_by(User.user_id).limit(limit + 1))
     rows = result.all()
     
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+    
     users_list = []
     for row in rows:
         users_list.append({
@@ -361,7 +410,8 @@ async def get_users_for_admin(
     
     return {
         "users": users_list,
-        "total": len(users_list),
+        "total": await UserService.count_users(db, **filters),
         "skip": skip,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor
     }
\ No newline at end of file
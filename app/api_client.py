@@ -1,19 +1,425 @@
 # app/api_client.py - исправленная версия с правильными отступами
+import asyncio
+import copy
+import logging
+import random
+import time
 import aiohttp
+from contextlib import AsyncExitStack, asynccontextmanager
 from app.core.config import settings
-from typing import Optional, Dict, Any
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (метод, аргументы)
+CacheKey = Tuple[str, Tuple]
+
+
+class ResponseCache:
+    """
+    Кэш ответов API в памяти процесса со stale-while-revalidate
+
+    Ответ свежий ttl секунд; после этого еще stale_ttl секунд он отдается
+    сразу, а в фоне запрашивается новый (один запрос на ключ). Ответы с
+    ошибкой не кэшируются. invalidate() сбрасывает записи метода, и
+    фоновое обновление, начатое до сброса, свой результат не сохраняет.
+    """
+
+    def __init__(self, stale_ttl: float = 600):
+        self.stale_ttl = stale_ttl
+        # ключ -> (ответ, свежий до, допустим до)
+        self._entries: Dict[CacheKey, Tuple[Any, float, float]] = {}
+        self._generations: Dict[str, int] = {}
+        self._refreshing: Dict[CacheKey, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _store(self, key: CacheKey, generation: int, value: Any, ttl: float):
+        if "error" in value or self._generations.get(key[0], 0) != generation:
+            return
+        now = time.monotonic()
+        self._entries[key] = (value, now + ttl, now + ttl + self.stale_ttl)
+
+    async def _refresh(
+        self, key: CacheKey, ttl: float, fetch: Callable[[], Awaitable[Any]]
+    ):
+        generation = self._generations.get(key[0], 0)
+        try:
+            self._store(key, generation, await fetch(), ttl)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить кэш {key[0]}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def get(
+        self, key: CacheKey, ttl: float, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Ответ из кэша или от fetch(); возвращается копия"""
+        if ttl <= 0:
+            return await fetch()
+
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now < entry[2]:
+            value, fresh_until, _ = entry
+            if now < fresh_until:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.create_task(
+                        self._refresh(key, ttl, fetch)
+                    )
+            return copy.deepcopy(value)
+
+        self.misses += 1
+        generation = self._generations.get(key[0], 0)
+        value = await fetch()
+        self._store(key, generation, value, ttl)
+        return copy.deepcopy(value)
+
+    def invalidate(self, *methods: str):
+        """Сбросить ответы методов (все, если методы не указаны)"""
+        if not methods:
+            methods = tuple({key[0] for key in self._entries} | set(self._generations))
+        for method in methods:
+            self._generations[method] = self._generations.get(method, 0) + 1
+        self._entries = {
+            key: entry for key, entry in self._entries.items() if key[0] not in methods
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи для запросов к API
+
+    closed - запросы идут как обычно; после failure_threshold сбоев подряд
+    (сеть, таймаут, 502/503/504) цепь размыкается (open) и запросы сразу
+    завершаются ошибкой. Через reset_timeout секунд пропускается один
+    пробный запрос (half_open): успех замыкает цепь, сбой размыкает снова.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 15):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self.retry_after() == 0:
+            return self.HALF_OPEN
+        return self._state
+
+    @property
+    def available(self) -> bool:
+        """Можно ли сейчас обращаться к API (цепь не разомкнута)"""
+        return self.state != self.OPEN
+
+    def retry_after(self) -> float:
+        """Через сколько секунд будет пропущен пробный запрос"""
+        if self._state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow_request(self) -> bool:
+        """Разрешить запрос; в half_open - только один пробный"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self._state != self.CLOSED:
+            logger.info("API снова доступен, размыкатель замкнут")
+        self._state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning(
+                    f"API недоступен ({self.failures} сбоев подряд), "
+                    f"запросы приостановлены на {self.reset_timeout} с"
+                )
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self):
+        """Запрос завершился без результата (отменен): освободить пробу"""
+        self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_after": round(self.retry_after(), 1),
+        }
+
+
+class ASGIResponse:
+    """Ответ httpx с интерфейсом ответа aiohttp, который использует клиент"""
+
+    def __init__(self, response):
+        self.status = response.status_code
+        self._response = response
+
+    async def json(self) -> Any:
+        return self._response.json()
+
+    async def text(self) -> str:
+        return self._response.text
+
+
+class ASGISession:
+    """
+    Сессия, передающая запросы приложению FastAPI в том же процессе
+
+    Повторяет используемую клиентом часть aiohttp.ClientSession, поэтому
+    кэш, объединение запросов, повторы и размыкатель работают так же, как
+    по HTTP, но без соединения и разбора HTTP. Перед первым запросом
+    запускается lifespan приложения (БД, пул, отложенная запись),
+    при close() - завершается.
+    """
+
+    def __init__(self, app, lifespan: bool = True):
+        import httpx
+
+        self.app = app
+        self.lifespan = lifespan
+        self._client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://api"
+        )
+        self._stack = AsyncExitStack()
+        self._started = False
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def closed(self) -> bool:
+        return self._client.is_closed
+
+    async def _start(self):
+        async with self._start_lock:
+            if not self._started:
+                if self.lifespan:
+                    await self._stack.enter_async_context(
+                        self.app.router.lifespan_context(self.app)
+                    )
+                self._started = True
+
+    @asynccontextmanager
+    async def request(self, method, url, params=None, json=None, timeout=None):
+        if not self._started:
+            await self._start()
+        response = await asyncio.wait_for(
+            self._client.request(method, url, params=params, json=json),
+            timeout.sock_read if timeout else None,
+        )
+        yield ASGIResponse(response)
+
+    async def close(self):
+        await self._client.aclose()
+        await self._stack.aclose()
+        self._started = False
 
 
 class APIClient:
+    # Ответы, при которых идемпотентный запрос повторяется, а сбой
+    # учитывается размыкателем (API перезапускается или перегружен)
+    RETRY_STATUSES = {502, 503, 504}
+
+    # Эндпоинты с долгой обработкой (префиксы путей)
+    SLOW_ENDPOINTS = ("/duty/plan-year", "/duty/assign", "/reports/daily-digest")
+
+    # Время жизни кэшированных ответов по методам (сек)
+    CACHE_TTLS = {
+        "get_sectors": settings.API_CACHE_SECTORS_TTL,
+        "get_sector_statistics_summary": settings.API_CACHE_STATISTICS_TTL,
+        "get_eligible_users": settings.API_CACHE_ELIGIBLE_TTL,
+    }
+
     def __init__(self):
         self.base_url = settings.API_BASE_URL
+        self.transport = settings.API_TRANSPORT
         self.session: Optional[aiohttp.ClientSession] = None
+        self.cache = ResponseCache(stale_ttl=settings.API_CACHE_STALE_TTL)
+        # Выполняющиеся GET-запросы: (url, параметры) -> задача
+        self._in_flight: Dict[Tuple[str, Tuple], asyncio.Future] = {}
+        self.get_requests = 0
+        self.coalesced_requests = 0
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.API_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.API_BREAKER_RESET_TIMEOUT,
+        )
+        self.retry_attempts = max(1, settings.API_RETRY_ATTEMPTS)
+        self.retry_base_delay = settings.API_RETRY_BASE_DELAY
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=settings.API_CONNECT_TIMEOUT,
+            sock_read=settings.API_READ_TIMEOUT,
+        )
+        self.slow_timeout = aiohttp.ClientTimeout(
+            sock_connect=settings.API_CONNECT_TIMEOUT,
+            sock_read=settings.API_SLOW_READ_TIMEOUT,
+        )
+
+    async def _cached(
+        self, method: str, args: Tuple, fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Ответ метода через кэш с временем жизни из CACHE_TTLS"""
+        return await self.cache.get((method, args), self.CACHE_TTLS.get(method, 0), fetch)
+
+    def invalidate(self, *methods: str):
+        """Сбросить кэш методов после изменения данных (без аргументов - весь)"""
+        self.cache.invalidate(*methods)
+
+    def _timeout_for(self, url: str) -> aiohttp.ClientTimeout:
+        if url.startswith(self.SLOW_ENDPOINTS):
+            return self.slow_timeout
+        return self.timeout
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Any] = None,
+        not_found: Optional[str] = None,
+        idempotent: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Запрос к API через размыкатель цепи
+
+        Идемпотентные запросы при сетевой ошибке, таймауте или 502/503/504
+        повторяются до retry_attempts раз с экспоненциальной задержкой со
+        случайным разбросом (full jitter). Пока цепь разомкнута, запрос не
+        отправляется: возвращается ошибка с признаком "unavailable".
+
+        Args:
+            not_found: Текст ошибки для ответа 404 (иначе "API error 404: ...")
+        """
+        attempts = self.retry_attempts if idempotent else 1
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(
+                    random.uniform(0, self.retry_base_delay * 2 ** (attempt - 1))
+                )
+            if not self.breaker.allow_request():
+                return {
+                    "error": "API временно недоступен, повторите через "
+                    f"{self.breaker.retry_after():.0f} с",
+                    "unavailable": True,
+                }
+
+            session = await self.get_session()
+            try:
+                async with session.request(
+                    method, url, params=params, json=json, timeout=self._timeout_for(url)
+                ) as response:
+                    if response.status in self.RETRY_STATUSES:
+                        self.breaker.record_failure()
+                        error_text = await response.text()
+                        result = {"error": f"API error {response.status}: {error_text}"}
+                        continue
+
+                    self.breaker.record_success()
+                    if response.status == 200:
+                        return await response.json()
+                    elif response.status == 404 and not_found:
+                        return {"error": not_found}
+                    else:
+                        error_text = await response.text()
+                        return {"error": f"API error {response.status}: {error_text}"}
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.breaker.record_failure()
+                result = {"error": f"Connection error: {str(e) or type(e).__name__}"}
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self.breaker.release()
+                return {"error": f"Unexpected error: {str(e)}"}
+
+        return result
+
+    async def _get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        not_found: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        GET-запрос к API с объединением одинаковых запросов (single-flight)
+
+        Если такой же запрос (URL и параметры) уже выполняется, новый не
+        отправляется: вызов ждет результат выполняющегося. Каждый вызов
+        получает свою копию ответа. Отмена одного из ожидающих не отменяет
+        общий запрос.
+
+        Args:
+            not_found: Текст ошибки для ответа 404 (иначе "API error 404: ...")
+        """
+        key = (url, tuple(sorted((params or {}).items())))
+        request = self._in_flight.get(key)
+        if request is None:
+            request = asyncio.ensure_future(
+                self._request(
+                    "get", url, params=params, not_found=not_found, idempotent=True
+                )
+            )
+            self._in_flight[key] = request
+            request.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.get_requests += 1
+        else:
+            self.coalesced_requests += 1
+
+        return copy.deepcopy(await asyncio.shield(request))
+
+    def coalescing_stats(self) -> Dict[str, int]:
+        """Отправленные GET-запросы и вызовы, объединенные с уже выполняющимися"""
+        return {
+            "requests": self.get_requests,
+            "coalesced": self.coalesced_requests,
+            "in_flight": len(self._in_flight),
+        }
+
+    @property
+    def in_process(self) -> bool:
+        """Запросы выполняются приложением FastAPI в этом же процессе"""
+        return self.transport == "asgi"
 
     async def get_session(self) -> aiohttp.ClientSession:
         if self.session is None or self.session.closed:
+            if self.in_process:
+                from main import app
+
+                self.session = ASGISession(app)
+                return self.session
+
             self.session = aiohttp.ClientSession(
                 base_url=self.base_url,
-                timeout=aiohttp.ClientTimeout(total=30),
+                timeout=self.timeout,
                 headers={"Content-Type": "application/json"},
             )
         return self.session
@@ -25,7 +431,6 @@ class APIClient:
         include_sector_name: bool = True,
     ) -> Dict[str, Any]:
         """Получить отчет через API"""
-        session = await self.get_session()
         url = "/health/report"
         params = {}
 
@@ -36,62 +441,33 @@ class APIClient:
         if include_sector_name:
             params["include_sector_name"] = "true"
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except aiohttp.ClientConnectorError as e:
-            return {"error": f"Connection error: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_user(self, user_id: int) -> Dict[str, Any]:
         """Получить информацию о пользователе"""
-        session = await self.get_session()
         url = f"/users/{user_id}"
 
-        try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    return await response.json()
-                elif response.status == 404:
-                    return {"error": "User not found in the system"}
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except aiohttp.ClientConnectorError as e:
-            return {"error": f"Connection error: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
+        return await self._get(url, not_found="User not found in the system")
+
+    async def get_user_permissions(self, user_id: int) -> Dict[str, Any]:
+        """Получить права пользователя (админ, отчеты, сектор)"""
+        url = f"/users/{user_id}/permissions"
+
+        return await self._get(url, not_found="User not found in the system")
 
     async def create_user(
         self, user_data: Dict[str, Any], chat_id: int
     ) -> Dict[str, Any]:
         """Создать нового пользователя"""
-        session = await self.get_session()
         url = "/users/"
         params = {"chat_id": chat_id}
 
-        try:
-            async with session.post(url, json=user_data, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except aiohttp.ClientConnectorError as e:
-            return {"error": f"Connection error: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
+        return await self._request("post", url, json=user_data, params=params)
 
     async def update_health_status(
         self, user_id: int, status: str, disease: Optional[str] = None
     ) -> Dict[str, Any]:
         """Обновить статус здоровья пользователя"""
-        session = await self.get_session()
         url = f"/users/{user_id}/health"
 
         # Подготовка данных
@@ -104,45 +480,27 @@ class APIClient:
             # Для других статусов явно указываем пустое заболевание
             health_data["disease"] = ""
 
-        try:
-            async with session.put(url, json=health_data) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except aiohttp.ClientConnectorError as e:
-            return {"error": f"Connection error: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
+        return await self._request("put", url, json=health_data)
 
     async def get_sectors(self) -> Dict[str, Any]:
-        """Получить список секторов"""
-        session = await self.get_session()
+        """Получить список секторов (кэшируется)"""
+        return await self._cached("get_sectors", (), self._fetch_sectors)
+
+    async def _fetch_sectors(self) -> Dict[str, Any]:
         url = "/health/sectors"
 
-        try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except aiohttp.ClientConnectorError as e:
-            return {"error": f"Connection error: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
+        return await self._get(url)
 
-    async def check_health(self) -> bool:
-        """Проверить доступность API"""
-        session = await self.get_session()
-        url = "/"
+    async def get_daily_digest(self) -> Dict[str, Any]:
+        """Получить отчеты и дежурных по всем секторам одним запросом"""
+        url = "/reports/daily-digest"
 
-        try:
-            async with session.get(url) as response:
-                return response.status == 200
-        except:
-            return False
+        return await self._get(url)
+
+    async def check_health(self) -> bool:
+        """Проверить доступность API (без повторов, пока цепь разомкнута - сразу False)"""
+        result = await self._request("get", "/")
+        return "error" not in result
 
     async def close(self):
         """Закрыть сессию"""
@@ -151,120 +509,89 @@ class APIClient:
 
     async def register_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Зарегистрировать пользователя (упрощенный метод)"""
-        session = await self.get_session()
         url = "/users/register"
 
-        try:
-            async with session.post(url, json=user_data) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._request("post", url, json=user_data)
 
     async def toggle_user_report(self, user_id: int) -> Dict[str, Any]:
         """Переключить статус отчетов пользователя"""
-        session = await self.get_session()
         url = f"/admin/users/{user_id}/toggle-report"
 
-        try:
-            async with session.put(url) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._request("put", url)
 
     async def toggle_user_admin(self, user_id: int) -> Dict[str, Any]:
         """Переключить админ статус пользователя"""
-        session = await self.get_session()
         url = f"/admin/users/{user_id}/toggle-admin"
 
-        try:
-            async with session.put(url) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._request("put", url)
 
     async def search_users(self, query: str) -> Dict[str, Any]:
         """Поиск пользователей по имени, фамилии или username"""
-        session = await self.get_session()
-
-        try:
-            # Используем эндпоинт /users/ с параметрами поиска
-            params = {"search": query, "limit": 10}
-            async with session.get("/users/", params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        # Используем эндпоинт /users/ с параметрами поиска
+        params = {"search": query, "limit": 10}
+        return await self._get("/users/", params)
 
     async def search_users_by_name(self, name: str) -> Dict[str, Any]:
         """Поиск пользователей по имени или фамилии"""
         return await self.search_users(name)
 
-    async def get_all_users(self, skip: int = 0, limit: int = 100) -> Dict[str, Any]:
-        """Получить всех пользователей"""
-        session = await self.get_session()
+    async def get_all_users(
+        self, skip: int = 0, limit: int = 100, after: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Получить всех пользователей (курсор следующей страницы - в X-Next-Cursor)"""
         url = "/users/"
         params = {"skip": skip, "limit": limit}
+        if after is not None:
+            params["after"] = after
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def search_users_api(
         self, query: str, skip: int = 0, limit: int = 10
     ) -> Dict[str, Any]:
         """Поиск пользователей через API"""
-        session = await self.get_session()
         url = "/users/search/"
         params = {"q": query, "skip": skip, "limit": limit}
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
+
+    async def get_users_directory(
+        self, updated_since: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Справочник пользователей целиком или изменения с updated_since"""
+        url = "/users/directory/"
+        params = {}
+        if updated_since is not None:
+            params["updated_since"] = updated_since
+
+        return await self._get(url, params)
 
     async def get_admin_users_list(
-        self, skip: int = 0, limit: int = 100
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[int] = None,
+        enable_admin: Optional[bool] = None,
+        sector_id: Optional[int] = None,
+        enable_report: Optional[bool] = None,
     ) -> Dict[str, Any]:
-        """Получить список пользователей для админ-панели"""
-        session = await self.get_session()
+        """
+        Получить список пользователей для админ-панели
+
+        Для следующей страницы передайте after=next_cursor из ответа.
+        """
         url = "/users/admin/list"
         params = {"skip": skip, "limit": limit}
+        if after is not None:
+            params["after"] = after
+        if enable_admin is not None:
+            params["enable_admin"] = str(enable_admin).lower()
+        if sector_id is not None:
+            params["sector_id"] = sector_id
+        if enable_report is not None:
+            params["enable_report"] = str(enable_report).lower()
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     # ========== МЕТОДЫ ДЛЯ СИСТЕМЫ ДЕЖУРНЫХ ==========
 
@@ -272,76 +599,47 @@ class APIClient:
         self, sector_id: int, active_only: bool = True
     ) -> Dict[str, Any]:
         """Получить пул дежурных для сектора"""
-        session = await self.get_session()
         url = f"/duty/pool/sector/{sector_id}"
         params = {"active_only": str(active_only).lower()}
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    # Здесь уже должны быть заполненные user_name и sector_name
-                    return data
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def add_to_duty_pool(
         self, user_id: int, sector_id: int, added_by: Optional[int] = None
     ) -> Dict[str, Any]:
         """Добавить пользователя в пул дежурных"""
-        session = await self.get_session()
         url = "/duty/pool"
         data = {"user_id": user_id, "sector_id": sector_id, "added_by": added_by}
 
-        try:
-            async with session.post(url, json=data) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        result = await self._request("post", url, json=data)
+        if "error" not in result:
+            self.invalidate("get_eligible_users", "get_sector_statistics_summary")
+        return result
 
     async def remove_from_duty_pool(
         self, user_id: int, sector_id: int
     ) -> Dict[str, Any]:
         """Удалить пользователя из пула дежурных"""
-        session = await self.get_session()
         url = f"/duty/pool/{user_id}/{sector_id}"
 
-        try:
-            async with session.delete(url) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        result = await self._request("delete", url)
+        if "error" not in result:
+            self.invalidate("get_eligible_users", "get_sector_statistics_summary")
+        return result
 
     async def assign_weekly_duty(
         self, sector_id: int, week_start: str, created_by: Optional[int] = None
     ) -> Dict[str, Any]:
         """Автоматически назначить дежурного на неделю"""
-        session = await self.get_session()
         url = "/duty/assign-weekly"
         params = {"sector_id": sector_id, "week_start": week_start}
         if created_by:
             params["created_by"] = created_by
 
-        try:
-            async with session.post(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        result = await self._request("post", url, params=params)
+        if "error" not in result:
+            self.invalidate("get_sector_statistics_summary")
+        return result
 
     async def get_duty_schedule(
         self,
@@ -351,7 +649,6 @@ class APIClient:
         end_date: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Получить расписание дежурств"""
-        session = await self.get_session()
         url = "/duty/schedule"
         params = {}
 
@@ -364,52 +661,25 @@ class APIClient:
         if end_date:
             params["end_date"] = end_date
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_monthly_schedule(
         self, sector_id: int, year: int, month: int
     ) -> Dict[str, Any]:
         """Получить расписание на месяц"""
-        session = await self.get_session()
         url = "/duty/schedule/monthly"
         params = {"sector_id": sector_id, "year": year, "month": month}
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_today_duty(self, sector_id: Optional[int] = None) -> Dict[str, Any]:
         """Кто дежурит сегодня"""
-        session = await self.get_session()
         url = "/duty/schedule/today"
         params = {}
         if sector_id:
             params["sector_id"] = sector_id
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_duty_statistics(
         self,
@@ -418,7 +688,6 @@ class APIClient:
         year: Optional[int] = None,
     ) -> Dict[str, Any]:
         """Получить статистику дежурств"""
-        session = await self.get_session()
         url = "/duty/statistics"
         params = {}
 
@@ -429,75 +698,57 @@ class APIClient:
         if year:
             params["year"] = year
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_sector_statistics_summary(
         self, sector_id: int, year: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Получить сводку статистики по сектору"""
-        session = await self.get_session()
+        """Получить сводку статистики по сектору (кэшируется)"""
+        return await self._cached(
+            "get_sector_statistics_summary",
+            (sector_id, year),
+            lambda: self._fetch_sector_statistics_summary(sector_id, year),
+        )
+
+    async def _fetch_sector_statistics_summary(
+        self, sector_id: int, year: Optional[int]
+    ) -> Dict[str, Any]:
         url = f"/duty/statistics/sector/{sector_id}/summary"
         params = {}
         if year:
             params["year"] = year
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_eligible_users(
         self, sector_id: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Получить список пользователей, которые могут быть дежурными"""
-        session = await self.get_session()
+        """Получить список пользователей, которые могут быть дежурными (кэшируется)"""
+        return await self._cached(
+            "get_eligible_users",
+            (sector_id,),
+            lambda: self._fetch_eligible_users(sector_id),
+        )
+
+    async def _fetch_eligible_users(self, sector_id: Optional[int]) -> Dict[str, Any]:
         url = "/duty/eligible-users"
         params = {}
         if sector_id:
             params["sector_id"] = sector_id
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def toggle_user_eligible(
         self, user_id: int, eligible: bool
     ) -> Dict[str, Any]:
         """Включить/выключить возможность быть дежурным"""
-        session = await self.get_session()
         url = f"/duty/eligible-users/{user_id}/toggle"
         params = {"eligible": str(eligible).lower()}
 
-        try:
-            async with session.post(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        result = await self._request("post", url, params=params)
+        if "error" not in result:
+            self.invalidate("get_eligible_users", "get_sector_statistics_summary")
+        return result
 
     async def assign_duty_for_period(
         self,
@@ -507,27 +758,20 @@ class APIClient:
         created_by: Optional[int] = None,
     ) -> Dict[str, Any]:
         """Назначить дежурного на период"""
-        session = await self.get_session()
         url = "/duty/assign"
         params = {"sector_id": sector_id, "period": period, "start_date": start_date}
         if created_by:
             params["created_by"] = created_by
 
-        try:
-            async with session.post(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        result = await self._request("post", url, params=params)
+        if "error" not in result:
+            self.invalidate("get_sector_statistics_summary")
+        return result
 
     async def plan_yearly_schedule(
         self, sector_id: int, year: int, working_days_only: bool = True
     ) -> Dict[str, Any]:
         """Спланировать дежурства на весь год"""
-        session = await self.get_session()
         url = "/duty/plan-year"
         params = {
             "sector_id": sector_id,
@@ -537,39 +781,36 @@ class APIClient:
             ).lower(),  # Преобразуем bool в строку
         }
 
-        try:
-            async with session.post(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        result = await self._request("post", url, params=params)
+        if "error" not in result:
+            self.invalidate("get_sector_statistics_summary")
+        return result
+
+    async def plan_all_sectors(
+        self, year: int, working_days_only: bool = True
+    ) -> Dict[str, Any]:
+        """Спланировать дежурства на год для всех секторов"""
+        url = "/duty/plan-year/all"
+        params = {"year": year, "working_days_only": str(working_days_only).lower()}
+
+        result = await self._request("post", url, params=params)
+        if "error" not in result:
+            self.invalidate("get_sector_statistics_summary")
+        return result
 
     async def check_availability(
         self, sector_id: int, start_date: str, end_date: str
     ) -> Dict[str, Any]:
         """Проверить доступность дежурных на период"""
-        session = await self.get_session()
         url = f"/duty/availability/{sector_id}"
         params = {"start_date": start_date, "end_date": end_date}
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_week_schedule(
         self, sector_id: Optional[int] = None, week_start: Optional[str] = None
     ) -> Dict[str, Any]:
         """Получить график дежурств на неделю"""
-        session = await self.get_session()
         url = "/duty/schedule/week"
         params = {}
         if sector_id:
@@ -577,15 +818,7 @@ class APIClient:
         if week_start:
             params["week_start"] = week_start
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_month_schedule(
         self,
@@ -594,7 +827,6 @@ class APIClient:
         month: Optional[int] = None,
     ) -> Dict[str, Any]:
         """Получить график дежурств на месяц"""
-        session = await self.get_session()
         url = "/duty/schedule/month"
         params = {}
         if sector_id:
@@ -604,21 +836,12 @@ class APIClient:
         if month:
             params["month"] = month
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_year_schedule(
         self, sector_id: Optional[int] = None, year: Optional[int] = None
     ) -> Dict[str, Any]:
         """Получить годовую статистику дежурств"""
-        session = await self.get_session()
         url = "/duty/schedule/year"
         params = {}
         if sector_id:
@@ -626,15 +849,7 @@ class APIClient:
         if year:
             params["year"] = year
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_duty_statistics_chart(
         self,
@@ -643,7 +858,6 @@ class APIClient:
         year: Optional[int] = None,
     ) -> Dict[str, Any]:
         """Получить данные для построения графиков"""
-        session = await self.get_session()
         url = "/duty/statistics/chart"
         params = {}
         if sector_id:
@@ -653,15 +867,7 @@ class APIClient:
         if year:
             params["year"] = year
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     # ========== НОВЫЕ МЕТОДЫ ДЛЯ ПЛАНИРОВАНИЯ ==========
 
@@ -673,7 +879,6 @@ class APIClient:
         allow_same_admin: bool = False,
     ) -> Dict[str, Any]:
         """Автоматическое назначение дежурного на неделю"""
-        session = await self.get_session()
         url = "/duty/assign-weekly-auto"
         params = {
             "sector_id": sector_id,
@@ -683,15 +888,10 @@ class APIClient:
         if created_by:
             params["created_by"] = created_by
 
-        try:
-            async with session.post(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        result = await self._request("post", url, params=params)
+        if "error" not in result:
+            self.invalidate("get_sector_statistics_summary")
+        return result
 
     async def assign_weekly_manual(
         self,
@@ -702,7 +902,6 @@ class APIClient:
         force: bool = False,
     ) -> Dict[str, Any]:
         """Ручное назначение конкретного дежурного на неделю"""
-        session = await self.get_session()
         url = "/duty/assign-weekly-manual"
         params = {
             "sector_id": sector_id,
@@ -713,15 +912,10 @@ class APIClient:
         if created_by:
             params["created_by"] = created_by
 
-        try:
-            async with session.post(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        result = await self._request("post", url, params=params)
+        if "error" not in result:
+            self.invalidate("get_sector_statistics_summary")
+        return result
 
     async def get_available_admins(
         self,
@@ -730,22 +924,13 @@ class APIClient:
         exclude_last_week: bool = True,
     ) -> Dict[str, Any]:
         """Получить список доступных администраторов"""
-        session = await self.get_session()
         url = f"/duty/available-admins/{sector_id}"
         params = {
             "week_start": week_start,
             "exclude_last_week": str(exclude_last_week).lower(),
         }
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
     async def get_week_schedule_api(
         self,
@@ -753,21 +938,12 @@ class APIClient:
         week_start: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Получить расписание на неделю"""
-        session = await self.get_session()
         url = f"/duty/week-schedule/{sector_id}"
         params = {}
         if week_start:
             params["week_start"] = week_start
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    return {"error": f"API error {response.status}: {error_text}"}
-        except Exception as e:
-            return {"error": f"Connection error: {str(e)}"}
+        return await self._get(url, params)
 
 
 # Глобальный экземпляр клиента
@@ -20,10 +20,60 @@ class Settings(BaseSettings):
     
     # Optional API settings
     API_BASE_URL: Optional[str] = "http://localhost:8000"
+    # http - запросы к API_BASE_URL; asgi - бот вызывает приложение FastAPI
+    # (main:app) в своем процессе, без сети (API и бот на одном узле)
+    API_TRANSPORT: str = "http"
     LOG_LEVEL: Optional[str] = "INFO"
     REPORT_TIME: Optional[str] = "07:30"
     REPORT_TIMEZONE: Optional[str] = "Europe/Moscow"
     
+    # Кэш отображаемых имен пользователей
+    NAME_CACHE_TTL: int = 300
+    NAME_CACHE_SIZE: int = 10000
+    
+    # Время жизни снимка отчета о здоровье в памяти (сек)
+    HEALTH_SNAPSHOT_TTL: int = 300
+    
+    # Отложенная пакетная запись статусов здоровья
+    HEALTH_WRITE_BEHIND: bool = False
+    HEALTH_FLUSH_INTERVAL_MS: int = 300
+    
+    # Пул asyncpg для сырых SQL-запросов
+    RAW_POOL_MIN_SIZE: int = 1
+    RAW_POOL_MAX_SIZE: int = 5
+    RAW_STATEMENT_CACHE_SIZE: int = 100
+    
+    # Журнал SQL: echo движка, порог медленных запросов (мс, 0 - выкл.)
+    # и доля остальных запросов, попадающих в журнал (0.01 - 1%)
+    SQL_ECHO: bool = False
+    SQL_SLOW_QUERY_MS: int = 200
+    SQL_SAMPLE_RATE: float = 0.0
+    
+    # Заголовки X-DB-Queries/Server-Timing и предупреждение о N+1, если
+    # одна форма запроса повторяется в запросе больше N раз (0 - выкл.)
+    SQL_TIMING_HEADERS: bool = True
+    SQL_REPEAT_WARN_THRESHOLD: int = 10
+    
+    # Кэш справочных ответов API в клиенте бота (сек, 0 - не кэшировать);
+    # устаревший ответ отдается еще API_CACHE_STALE_TTL, пока он обновляется
+    API_CACHE_SECTORS_TTL: int = 300
+    API_CACHE_STATISTICS_TTL: int = 30
+    API_CACHE_ELIGIBLE_TTL: int = 60
+    API_CACHE_STALE_TTL: int = 600
+    
+    # Таймауты запросов клиента к API (сек); долгие операции планирования
+    # ждут ответа API_SLOW_READ_TIMEOUT
+    API_CONNECT_TIMEOUT: float = 3
+    API_READ_TIMEOUT: float = 15
+    API_SLOW_READ_TIMEOUT: float = 120
+    # Повторы идемпотентных запросов (GET) при сетевых ошибках и 502/503/504
+    API_RETRY_ATTEMPTS: int = 3
+    API_RETRY_BASE_DELAY: float = 0.2
+    # Размыкатель: после N сбоев подряд запросы не отправляются
+    # API_BREAKER_RESET_TIMEOUT секунд, затем пропускается один пробный
+    API_BREAKER_FAILURE_THRESHOLD: int = 5
+    API_BREAKER_RESET_TIMEOUT: float = 15
+    
     @property
     def DATABASE_URL(self):
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
@@ -0,0 +1,121 @@
+# app/core/query_stats.py
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger("app.sql")
+
+# Список параметров "(?, ?, ?)" / "($1, $2)" / "(%(p_1)s, ...)" - IN с разным
+# числом значений считается одной и той же формой запроса
+_PARAM_LIST = re.compile(
+    r"\(\s*(?:\?|\$\d+|%\(\w+\)s)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s))*\s*\)"
+)
+
+
+def statement_shape(statement: str) -> str:
+    """Форма запроса: SQL без лишних пробелов и с одним параметром в списках"""
+    return _PARAM_LIST.sub("(?)", " ".join(statement.split()))
+
+
+class QueryStats:
+    """Запросы к БД, выполненные в рамках одного HTTP-запроса или теста"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Формы запросов, выполненные больше threshold раз"""
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count > threshold
+        ]
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+class QueryCounter:
+    """
+    Подсчет SQL-запросов и времени БД в текущем контексте
+
+    Хуки движка учитывают запрос, только если в контексте открыт сбор
+    (collect()), поэтому вне HTTP-запросов и тестов они ничего не делают.
+    """
+
+    def __init__(self, repeat_threshold: int = 10):
+        self.repeat_threshold = repeat_threshold
+        self._engines: List[AsyncEngine] = []
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if current_query_stats.get() is not None:
+            conn.info.setdefault("query_counter_started_at", []).append(
+                time.perf_counter()
+            )
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = current_query_stats.get()
+        if stats is None:
+            return
+        stats.count += 1
+        stats.duration += time.perf_counter() - conn.info["query_counter_started_at"].pop()
+        stats.shapes[statement_shape(statement)] += 1
+
+    def install(self, engine: AsyncEngine):
+        """Подключить подсчет к движку"""
+        if engine in self._engines:
+            return
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_execute)
+        self._engines.append(engine)
+
+    def remove(self, engine: AsyncEngine):
+        """Отключить подсчет от движка"""
+        if engine not in self._engines:
+            return
+        event.remove(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.remove(engine.sync_engine, "after_cursor_execute", self._after_execute)
+        self._engines.remove(engine)
+
+    @contextmanager
+    def collect(self):
+        """Собрать статистику запросов, выполненных внутри блока"""
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            current_query_stats.reset(token)
+
+    def warn_repeated(self, stats: QueryStats, route: str):
+        """Предупредить о повторяющихся формах запросов (признак N+1)"""
+        if self.repeat_threshold <= 0:
+            return
+        for shape, count in stats.repeated(self.repeat_threshold):
+            logger.warning(
+                "Возможный N+1 [%s]: запрос выполнен %d раз: %s",
+                route,
+                count,
+                shape[:500],
+            )
+
+    @staticmethod
+    def headers(stats: QueryStats) -> dict:
+        """Заголовки ответа со статистикой запросов к БД"""
+        return {
+            "X-DB-Queries": str(stats.count),
+            "Server-Timing": (
+                f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+            ),
+        }
@@ -0,0 +1,109 @@
+# app/core/sql_logging.py
+import logging
+import queue
+import random
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Маршрут текущего HTTP-запроса ("GET /duty/schedule/month"), задается middleware
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+# Максимальная длина SQL в записи журнала
+MAX_STATEMENT_LENGTH = 1000
+
+
+class SQLQueryLogger:
+    """
+    Журнал медленных и выборочных SQL-запросов вместо echo=True
+
+    Запросы дольше slow_ms пишутся с уровнем WARNING, из остальных в журнал
+    попадает доля sample_rate (0.01 - каждый сотый) с уровнем INFO. Записи
+    содержат длительность и маршрут, из которого выполнен запрос; параметры
+    не пишутся. Форматирование и вывод выполняются в отдельном потоке
+    (QueueHandler/QueueListener), запрос не ждет записи в stdout.
+    """
+
+    def __init__(
+        self,
+        slow_ms: float = 200,
+        sample_rate: float = 0.0,
+        logger_name: str = "app.sql",
+        handlers: Optional[List[logging.Handler]] = None,
+    ):
+        self.slow = slow_ms / 1000 if slow_ms > 0 else None
+        self.sample_rate = sample_rate
+        self.logger = logging.getLogger(logger_name)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        if handlers is None:
+            handler = logging.StreamHandler()
+            handler.setFormatter(
+                logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+            )
+            handlers = [handler]
+        self._listener = QueueListener(self._queue, *handlers)
+        self._engines: List[AsyncEngine] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.slow is not None or self.sample_rate > 0
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_started_at"].pop()
+
+        if self.slow is not None and duration >= self.slow:
+            level = logging.WARNING
+            kind = "Медленный запрос"
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            level = logging.INFO
+            kind = "Запрос"
+        else:
+            return
+
+        statement = " ".join(statement.split())
+        if len(statement) > MAX_STATEMENT_LENGTH:
+            statement = statement[:MAX_STATEMENT_LENGTH] + "..."
+        self.logger.log(
+            level,
+            "%s %.1f мс [%s]: %s",
+            kind,
+            duration * 1000,
+            current_route.get() or "-",
+            statement,
+        )
+
+    def install(self, engine: AsyncEngine):
+        """Подключить журнал к движку; без порогов ничего не подключается"""
+        if not self.enabled:
+            return
+
+        if not self._engines:
+            self.logger.addHandler(QueueHandler(self._queue))
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+            self._listener.start()
+
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_execute)
+        self._engines.append(engine)
+
+    def stop(self):
+        """Отключить журнал и дописать накопленные записи"""
+        if not self._engines:
+            return
+
+        for engine in self._engines:
+            event.remove(engine.sync_engine, "before_cursor_execute", self._before_execute)
+            event.remove(engine.sync_engine, "after_cursor_execute", self._after_execute)
+        self._engines = []
+        self._listener.stop()
+        for handler in list(self.logger.handlers):
+            if isinstance(handler, QueueHandler):
+                self.logger.removeHandler(handler)
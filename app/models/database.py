@@ -2,6 +2,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.core.config import settings
+from app.core.sql_logging import SQLQueryLogger
+from app.core.query_stats import QueryCounter
+from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
+import time
 import asyncpg
 
 # Используем PostgreSQL
@@ -10,13 +16,23 @@ DATABASE_URL = settings.DATABASE_URL
 # Создаем асинхронный движок для PostgreSQL
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,
+    echo=settings.SQL_ECHO,
     future=True,
     pool_size=20,
     max_overflow=0,
     pool_pre_ping=True  # Проверка соединения перед использованием
 )
 
+# Медленные и выборочные запросы пишутся в журнал app.sql
+sql_logger = SQLQueryLogger(
+    slow_ms=settings.SQL_SLOW_QUERY_MS, sample_rate=settings.SQL_SAMPLE_RATE
+)
+sql_logger.install(engine)
+
+# Счетчик запросов к БД на HTTP-запрос (заголовки X-DB-Queries, Server-Timing)
+query_counter = QueryCounter(repeat_threshold=settings.SQL_REPEAT_WARN_THRESHOLD)
+query_counter.install(engine)
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -35,6 +51,124 @@ async def get_db():
         finally:
             await session.close()
 
+def get_session_factory() -> async_sessionmaker:
+    """
+    Зависимость для получения фабрики сессий БД
+
+    Для операций, которые открывают несколько собственных сессий
+    (например, параллельная обработка секторов).
+    """
+    return AsyncSessionLocal
+
+class RawConnectionPool:
+    """
+    Общий пул соединений asyncpg для сырых SQL-запросов
+    
+    Открывается в lifespan приложения вместе с движком SQLAlchemy (или
+    лениво при первом запросе) и закрывается перед engine.dispose().
+    Каждое соединение кэширует подготовленные выражения asyncpg, поэтому
+    повторяющиеся запросы не разбираются сервером заново.
+    """
+    
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 5,
+        statement_cache_size: int = 100,
+        **connect_kwargs
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.connect_kwargs = connect_kwargs
+        self._pool: Optional[asyncpg.Pool] = None
+        self._lock = asyncio.Lock()
+        self.queries = 0
+        self.errors = 0
+        self.acquire_wait_total = 0.0
+        self.acquire_wait_max = 0.0
+    
+    async def open(self) -> asyncpg.Pool:
+        """Создать пул, если он еще не создан"""
+        if self._pool is None:
+            async with self._lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        statement_cache_size=self.statement_cache_size,
+                        **self.connect_kwargs
+                    )
+        return self._pool
+    
+    async def close(self):
+        """Закрыть пул (дожидается возврата соединений)"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.close()
+    
+    @asynccontextmanager
+    async def acquire(self):
+        """Взять соединение из пула на время блока"""
+        pool = await self.open()
+        started = time.perf_counter()
+        async with pool.acquire() as conn:
+            wait = time.perf_counter() - started
+            self.acquire_wait_total += wait
+            self.acquire_wait_max = max(self.acquire_wait_max, wait)
+            yield conn
+    
+    async def fetch(self, query: str, *args):
+        """Выполнить запрос и вернуть строки"""
+        async with self.acquire() as conn:
+            self.queries += 1
+            try:
+                return await conn.fetch(query, *args)
+            except Exception:
+                self.errors += 1
+                raise
+    
+    def stats(self) -> dict:
+        """Состояние пула и счетчики запросов"""
+        pool = self._pool
+        return {
+            "open": pool is not None,
+            "size": pool.get_size() if pool else 0,
+            "idle": pool.get_idle_size() if pool else 0,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "statement_cache_size": self.statement_cache_size,
+            "queries": self.queries,
+            "errors": self.errors,
+            "acquire_wait_avg_ms": round(
+                self.acquire_wait_total / self.queries * 1000, 3
+            ) if self.queries else 0.0,
+            "acquire_wait_max_ms": round(self.acquire_wait_max * 1000, 3),
+        }
+
+
+# Пул для DatabaseService.execute_raw_sql
+raw_pool = RawConnectionPool(
+    min_size=settings.RAW_POOL_MIN_SIZE,
+    max_size=settings.RAW_POOL_MAX_SIZE,
+    statement_cache_size=settings.RAW_STATEMENT_CACHE_SIZE,
+    user=settings.POSTGRES_USER,
+    password=settings.POSTGRES_PASSWORD,
+    host=settings.POSTGRES_HOST,
+    port=settings.POSTGRES_PORT,
+    database=settings.POSTGRES_DB,
+)
+
+def engine_pool_stats() -> dict:
+    """Состояние пула соединений движка SQLAlchemy"""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
 async def init_database():
     """Инициализация базы данных (создание если не существует)"""
     try:
@@ -8,34 +8,39 @@ from sqlalchemy import (
     DateTime,
     Date,
     ForeignKey,
+    Index,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.database import Base
 from sqlalchemy.ext.hybrid import hybrid_property
 
+# BIGSERIAL в PostgreSQL; в SQLite автоинкремент работает только у INTEGER
+BigIntegerPK = BigInteger().with_variant(Integer, "sqlite")
+
 
 class DutyAdminPool(Base):
     __tablename__ = "duty_admin_pool"
+    __table_args__ = (
+        UniqueConstraint("user_id", "sector_id", name="unique_duty_admin_per_sector"),
+    )
 
-    pool_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    pool_id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
     sector_id = Column(BigInteger, ForeignKey("sectors.sector_id"), nullable=False)
     is_active = Column(Boolean, default=True)
     added_at = Column(DateTime, default=datetime.utcnow)
     added_by = Column(BigInteger, ForeignKey("users.user_id"), nullable=True)
 
-    # Relationships
-    user = relationship("User", foreign_keys=[user_id], lazy="selectin")
-    sector = relationship("Sector", foreign_keys=[sector_id], lazy="selectin")
-    added_by_user = relationship("User", foreign_keys=[added_by], lazy="selectin")
+    # Relationships (загружаются только явно, см. app/models/loaders.py)
+    user = relationship("User", foreign_keys=[user_id], lazy="raise_on_sql")
+    sector = relationship("Sector", foreign_keys=[sector_id], lazy="raise_on_sql")
+    added_by_user = relationship("User", foreign_keys=[added_by], lazy="raise_on_sql")
 
     @hybrid_property
     def user_name(self):
         """Получить имя пользователя"""
-        if not self.user:
-            return f"Пользователь {self.user_id}"
-
         # Здесь мы не можем сделать запрос к FIO, поэтому это поле будет заполняться в сервисе
         return getattr(self, "_user_name", f"Пользователь {self.user_id}")
 
@@ -45,9 +50,10 @@ class DutyAdminPool(Base):
 
     @hybrid_property
     def sector_name(self):
-        """Получить название сектора"""
-        if self.sector and self.sector.name:
-            return self.sector.name
+        """Получить название сектора (из связи sector, только если она загружена)"""
+        sector = self.__dict__.get("sector")
+        if sector is not None and sector.name:
+            return sector.name
         return getattr(self, "_sector_name", f"Сектор {self.sector_id}")
 
     @sector_name.setter
@@ -57,8 +63,23 @@ class DutyAdminPool(Base):
 
 class DutySchedule(Base):
     __tablename__ = "duty_schedule"
-
-    duty_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    __table_args__ = (
+        UniqueConstraint("sector_id", "duty_date", name="unique_duty_per_day"),
+        # Покрывающие индексы для чтения по диапазону дат (миграция 007)
+        Index(
+            "idx_duty_schedule_sector_date_cover",
+            "sector_id",
+            "duty_date",
+            postgresql_include=["user_id"],
+        ),
+        Index(
+            "idx_duty_schedule_date_cover",
+            "duty_date",
+            postgresql_include=["sector_id", "user_id"],
+        ),
+    )
+
+    duty_id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
     sector_id = Column(BigInteger, ForeignKey("sectors.sector_id"), nullable=False)
     duty_date = Column(Date, nullable=False)
@@ -66,16 +87,19 @@ class DutySchedule(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     created_by = Column(BigInteger, ForeignKey("users.user_id"), nullable=True)
 
-    # Relationships
-    user = relationship("User", foreign_keys=[user_id], lazy="selectin")
-    sector = relationship("Sector", foreign_keys=[sector_id], lazy="selectin")
-    created_by_user = relationship("User", foreign_keys=[created_by], lazy="selectin")
+    # Relationships (загружаются только явно, см. app/models/loaders.py)
+    user = relationship("User", foreign_keys=[user_id], lazy="raise_on_sql")
+    sector = relationship("Sector", foreign_keys=[sector_id], lazy="raise_on_sql")
+    created_by_user = relationship("User", foreign_keys=[created_by], lazy="raise_on_sql")
 
 
 class DutyStatistics(Base):
     __tablename__ = "duty_statistics"
+    __table_args__ = (
+        UniqueConstraint("user_id", "sector_id", "year", name="unique_user_sector_year"),
+    )
 
-    stat_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    stat_id = Column(BigIntegerPK, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
     sector_id = Column(BigInteger, ForeignKey("sectors.sector_id"), nullable=False)
     year = Column(Integer, nullable=False)
@@ -83,6 +107,6 @@ class DutyStatistics(Base):
     last_duty_date = Column(Date, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Relationships
-    user = relationship("User", foreign_keys=[user_id], lazy="selectin")
-    sector = relationship("Sector", foreign_keys=[sector_id], lazy="selectin")
+    # Relationships (загружаются только явно, см. app/models/loaders.py)
+    user = relationship("User", foreign_keys=[user_id], lazy="raise_on_sql")
+    sector = relationship("Sector", foreign_keys=[sector_id], lazy="raise_on_sql")
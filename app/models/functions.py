@@ -0,0 +1,31 @@
+# app/models/functions.py
+from sqlalchemy import Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class iso_weekday(FunctionElement):
+    """
+    День недели по ISO 8601: 1 - понедельник, ..., 7 - воскресенье
+
+    В PostgreSQL это extract(isodow ...), в SQLite (тесты) - пересчет
+    strftime('%w'), где 0 - воскресенье.
+    """
+
+    type = Integer()
+    inherit_cache = True
+    name = "iso_weekday"
+
+
+@compiles(iso_weekday)
+def _iso_weekday_default(element, compiler, **kw):
+    return "CAST(EXTRACT(isodow FROM %s) AS INTEGER)" % compiler.process(
+        element.clauses, **kw
+    )
+
+
+@compiles(iso_weekday, "sqlite")
+def _iso_weekday_sqlite(element, compiler, **kw):
+    return "((CAST(strftime('%%w', %s) AS INTEGER) + 6) %% 7 + 1)" % compiler.process(
+        element.clauses, **kw
+    )
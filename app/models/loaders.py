@@ -0,0 +1,54 @@
+# app/models/loaders.py
+from typing import Dict, List, Tuple
+
+from sqlalchemy.orm import joinedload
+
+from app.models.user import User
+from app.models.duty import DutyAdminPool, DutySchedule
+
+# Все связи моделей объявлены с lazy="raise_on_sql": select(Model) загружает
+# только столбцы, а обращение к незагруженной связи - ошибка, а не скрытый
+# запрос. Нужные связи запрос указывает явно, выбирая профиль загрузки.
+# Связи один-к-одному и многие-к-одному подтягиваются LEFT JOIN в том же
+# запросе, без дополнительных обращений к БД.
+LOADER_PROFILES: Dict[type, Dict[str, Tuple]] = {
+    User: {
+        # Строки списков: права/сектор и ФИО
+        "list": (User.status_info, User.fio_info),
+        # Карточка пользователя (UserResponse)
+        "detail": (
+            User.status_info,
+            User.fio_info,
+            User.health_info,
+            User.disease_info,
+        ),
+    },
+    DutyAdminPool: {
+        # Записи пула: название сектора; имена берутся из user_name_resolver
+        "list": (DutyAdminPool.sector,),
+    },
+    DutySchedule: {
+        # Календарь дежурств: название сектора; имена - из user_name_resolver
+        "schedule": (DutySchedule.sector,),
+    },
+}
+
+
+def load_profile(model: type, profile: str) -> List:
+    """
+    Опции загрузки связей для профиля
+
+    Args:
+        model: Модель, по которой строится select()
+        profile: Название профиля из LOADER_PROFILES
+
+    Returns:
+        Список опций для query.options(*...)
+    """
+    try:
+        relationships = LOADER_PROFILES[model][profile]
+    except KeyError:
+        raise ValueError(
+            f"Неизвестный профиль загрузки {profile!r} для {model.__name__}"
+        ) from None
+    return [joinedload(relationship) for relationship in relationships]
@@ -7,6 +7,7 @@ from sqlalchemy import (
     BigInteger,
     DateTime,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -15,6 +16,10 @@ from app.models.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Инкрементальное обновление справочника бота (миграция 009)
+        Index("idx_users_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(BigInteger, unique=True, index=True, nullable=False)
@@ -25,18 +30,18 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_duty_eligible = Column(Boolean, default=False)  # НОВОЕ ПОЛЕ
 
-    # Relationships
+    # Relationships (загружаются только явно, см. app/models/loaders.py)
     status_info = relationship(
-        "UserStatus", back_populates="user", uselist=False, lazy="selectin"
+        "UserStatus", back_populates="user", uselist=False, lazy="raise_on_sql"
     )
     fio_info = relationship(
-        "FIO", back_populates="user", uselist=False, lazy="selectin"
+        "FIO", back_populates="user", uselist=False, lazy="raise_on_sql"
     )
     health_info = relationship(
-        "Health", back_populates="user", uselist=False, lazy="selectin"
+        "Health", back_populates="user", uselist=False, lazy="raise_on_sql"
     )
     disease_info = relationship(
-        "Disease", back_populates="user", uselist=False, lazy="selectin"
+        "Disease", back_populates="user", uselist=False, lazy="raise_on_sql"
     )
 
 
@@ -50,8 +55,8 @@ class UserStatus(Base):
     enable_admin = Column(Boolean, default=False)
     sector_id = Column(BigInteger)
 
-    # Relationship
-    user = relationship("User", back_populates="status_info", lazy="selectin")
+    # Relationship (загружается только явно, см. app/models/loaders.py)
+    user = relationship("User", back_populates="status_info", lazy="raise_on_sql")
 
 
 class FIO(Base):
@@ -64,8 +69,8 @@ class FIO(Base):
     last_name = Column(String(100))
     patronymic_name = Column(String(100))
 
-    # Relationship
-    user = relationship("User", back_populates="fio_info", lazy="selectin")
+    # Relationship (загружается только явно, см. app/models/loaders.py)
+    user = relationship("User", back_populates="fio_info", lazy="raise_on_sql")
 
 
 class Health(Base):
@@ -76,8 +81,8 @@ class Health(Base):
     )
     status = Column(String(50))
 
-    # Relationship
-    user = relationship("User", back_populates="health_info", lazy="selectin")
+    # Relationship (загружается только явно, см. app/models/loaders.py)
+    user = relationship("User", back_populates="health_info", lazy="raise_on_sql")
 
 
 class Disease(Base):
@@ -88,8 +93,8 @@ class Disease(Base):
     )
     disease = Column(String(100))
 
-    # Relationship
-    user = relationship("User", back_populates="disease_info", lazy="selectin")
+    # Relationship (загружается только явно, см. app/models/loaders.py)
+    user = relationship("User", back_populates="disease_info", lazy="raise_on_sql")
 
 
 class Sector(Base):
@@ -2,6 +2,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.user import UserStatus
+from app.services.health_snapshot import health_report_snapshot
 
 class AdminService:
     @staticmethod
@@ -15,6 +16,7 @@ class AdminService:
         if user_status:
             user_status.enable_report = not user_status.enable_report
             await db.commit()
+            await health_report_snapshot.refresh_user(db, user_id)
             return True
         return False
     
@@ -2,24 +2,30 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from app.models.user import User, UserStatus, FIO, Health, Disease
+from app.models.loaders import load_profile
 from typing import List, Optional, Tuple
-import asyncpg
-from app.core.config import settings
+from app.models.database import raw_pool, engine_pool_stats
 
 class DatabaseService:
     
     @staticmethod
-    async def get_users(db: AsyncSession) -> List[User]:
-        """Получить всех пользователей"""
-        result = await db.execute(select(User))
+    async def get_users(db: AsyncSession, profile: Optional[str] = None) -> List[User]:
+        """Получить всех пользователей (связи - только по профилю загрузки)"""
+        query = select(User)
+        if profile:
+            query = query.options(*load_profile(User, profile))
+        result = await db.execute(query)
         return result.scalars().all()
     
     @staticmethod
-    async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
-        """Получить пользователя по ID"""
-        result = await db.execute(
-            select(User).where(User.user_id == user_id)
-        )
+    async def get_user_by_id(
+        db: AsyncSession, user_id: int, profile: Optional[str] = None
+    ) -> Optional[User]:
+        """Получить пользователя по ID (связи - только по профилю загрузки)"""
+        query = select(User).where(User.user_id == user_id)
+        if profile:
+            query = query.options(*load_profile(User, profile))
+        result = await db.execute(query)
         return result.scalar_one_or_none()
     
     @staticmethod
@@ -33,23 +39,15 @@ class DatabaseService:
     
     @staticmethod
     async def execute_raw_sql(query: str, params: dict = None):
-        """Выполнить raw SQL запрос (для сложных операций)"""
-        conn = await asyncpg.connect(
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            host=settings.POSTGRES_HOST,
-            port=settings.POSTGRES_PORT,
-            database=settings.POSTGRES_DB
-        )
-        
-        try:
-            if params:
-                result = await conn.fetch(query, *params.values())
-            else:
-                result = await conn.fetch(query)
-            return result
-        finally:
-            await conn.close()
+        """Выполнить raw SQL запрос (для сложных операций) через общий пул asyncpg"""
+        if params:
+            return await raw_pool.fetch(query, *params.values())
+        return await raw_pool.fetch(query)
+    
+    @staticmethod
+    def get_pool_stats() -> dict:
+        """Статистика пулов соединений: движка SQLAlchemy и сырого asyncpg"""
+        return {"orm": engine_pool_stats(), "raw": raw_pool.stats()}
     
     @staticmethod
     async def get_health_report(db: AsyncSession, sector_id: Optional[int] = None) -> Tuple[dict, list]:
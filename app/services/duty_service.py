@@ -1,17 +1,33 @@
 # app/services/duty_service.py
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, insert, and_, func, desc, literal, union_all
+from app.models.database import AsyncSessionLocal
 from app.models.user import User, FIO, Sector
 from app.models.duty import DutyAdminPool, DutySchedule, DutyStatistics
+from app.models.functions import iso_weekday
+from app.models.loaders import load_profile
 from app.schemas.duty import DutyAdminPoolCreate, DutyScheduleCreate
+from app.services.name_resolver import format_user_name, user_name_resolver
 from typing import List, Optional, Tuple, Dict, Any
 from datetime import date, datetime, timedelta
 from collections import defaultdict
+import asyncio
 import random
 
 
 class DutyService:
+    @staticmethod
+    def in_year(year: int):
+        """
+        Условие "дежурство в году year" диапазоном дат
+
+        В отличие от extract('year', duty_date) такое условие использует
+        индексы по (sector_id, duty_date) и duty_date.
+        """
+        return and_(
+            DutySchedule.duty_date >= date(year, 1, 1),
+            DutySchedule.duty_date < date(year + 1, 1, 1),
+        )
 
     # ========== УПРАВЛЕНИЕ ПУЛОМ ДЕЖУРНЫХ ==========
 
@@ -85,39 +101,11 @@ class DutyService:
         query = query.order_by(DutyAdminPool.added_at.desc())
         query = query.offset(skip).limit(limit)
 
-        # Загружаем связанные данные
-        query = query.options(
-            selectinload(DutyAdminPool.user),
-            selectinload(DutyAdminPool.sector),
-            selectinload(DutyAdminPool.added_by_user),
-        )
+        query = query.options(*load_profile(DutyAdminPool, "list"))
 
         result = await db.execute(query)
         items = result.scalars().all()
-
-        # Добавляем имена пользователей и названия секторов
-        for item in items:
-            # Имя пользователя
-            if item.user:
-                # Пробуем получить из FIO
-                fio_result = await db.execute(
-                    select(FIO).where(FIO.user_id == item.user_id)
-                )
-                fio = fio_result.scalar_one_or_none()
-                if fio and fio.last_name and fio.first_name:
-                    item.user_name = f"{fio.last_name} {fio.first_name}".strip()
-                elif item.user.last_name and item.user.first_name:
-                    item.user_name = (
-                        f"{item.user.last_name} {item.user.first_name}".strip()
-                    )
-                else:
-                    item.user_name = f"Пользователь {item.user_id}"
-
-            # Название сектора
-            if item.sector and item.sector.name:
-                item.sector_name = item.sector.name
-            else:
-                item.sector_name = f"Сектор {item.sector_id}"
+        await DutyService._fill_pool_names(db, items)
 
         return items, total
 
@@ -129,12 +117,20 @@ class DutyService:
         result = await db.execute(
             select(DutyAdminPool)
             .where(DutyAdminPool.user_id == user_id)
-            .options(
-                selectinload(DutyAdminPool.sector),
-                selectinload(DutyAdminPool.added_by_user),
-            )
+            .options(*load_profile(DutyAdminPool, "list"))
+        )
+        items = result.scalars().all()
+        await DutyService._fill_pool_names(db, items)
+        return items
+
+    @staticmethod
+    async def _fill_pool_names(db: AsyncSession, items: List[DutyAdminPool]):
+        """Подставить имена пользователей одним запросом (сектор - из профиля "list")"""
+        user_names = await user_name_resolver.resolve_many(
+            db, [item.user_id for item in items]
         )
-        return result.scalars().all()
+        for item in items:
+            item.user_name = user_names[item.user_id]
 
     # ========== ОСНОВНЫЕ МЕТОДЫ ДЛЯ НАЗНАЧЕНИЯ ==========
 
@@ -168,31 +164,24 @@ class DutyService:
                 "assigned_user_id": None,
             }
 
-        # Получаем всех активных дежурных в пуле
-        pool_result = await db.execute(
-            select(DutyAdminPool).where(
-                DutyAdminPool.sector_id == sector_id, DutyAdminPool.is_active == True
-            )
-        )
-        active_pool = pool_result.scalars().all()
+        # Получаем всех активных дежурных в пуле вместе с их статистикой
+        year = week_start.year
+        pool_candidates = await DutyService._get_pool_candidates(db, sector_id, year)
 
-        if not active_pool:
+        if not pool_candidates:
             return {
                 "success": False,
                 "message": "В пуле нет активных дежурных для этого сектора",
                 "assigned_user_id": None,
             }
 
-        # Получаем ID дежурных в пуле
-        pool_user_ids = [p.user_id for p in active_pool]
-
         # Определяем предыдущую неделю
         prev_week_start = week_start - timedelta(days=7)
         prev_week_end = prev_week_start + timedelta(days=6)
 
         # Получаем дежурного на предыдущей неделе
-        prev_week_result = await db.execute(
-            select(DutySchedule)
+        prev_admin_id = await db.scalar(
+            select(DutySchedule.user_id)
             .where(
                 DutySchedule.sector_id == sector_id,
                 DutySchedule.duty_date >= prev_week_start,
@@ -200,56 +189,25 @@ class DutyService:
             )
             .limit(1)
         )
-        prev_week_duty = prev_week_result.scalar_one_or_none()
-        prev_admin_id = prev_week_duty.user_id if prev_week_duty else None
-
-        # Получаем статистику за год
-        year = week_start.year
-        stats_result = await db.execute(
-            select(DutyStatistics).where(
-                DutyStatistics.sector_id == sector_id,
-                DutyStatistics.year == year,
-                DutyStatistics.user_id.in_(pool_user_ids),
-            )
-        )
-        stats = stats_result.scalars().all()
-        stats_dict = {s.user_id: s.total_duties for s in stats}
 
-        # Получаем всех дежурных с их количеством дежурств
         candidates = []
-        for user_id in pool_user_ids:
-            # Получаем ФИО
-            fio = await DutyService._get_user_fio(db, user_id)
-
+        for candidate in pool_candidates:
             # Проверяем, был ли этот админ на прошлой неделе
-            was_last_week = prev_admin_id == user_id
+            was_last_week = prev_admin_id == candidate["user_id"]
 
             # Если запрещено назначать того же и он был на прошлой неделе - пропускаем
             if not allow_same_admin and was_last_week:
                 continue
 
-            candidates.append(
-                {
-                    "user_id": user_id,
-                    "user_name": fio,
-                    "total_duties": stats_dict.get(user_id, 0),
-                    "was_last_week": was_last_week,
-                }
-            )
+            candidates.append({**candidate, "was_last_week": was_last_week})
 
         # Если после фильтрации не осталось кандидатов, снимаем фильтр
         if not candidates and not allow_same_admin:
             # Добавляем всех, включая того, кто был на прошлой неделе
-            for user_id in pool_user_ids:
-                fio = await DutyService._get_user_fio(db, user_id)
-                candidates.append(
-                    {
-                        "user_id": user_id,
-                        "user_name": fio,
-                        "total_duties": stats_dict.get(user_id, 0),
-                        "was_last_week": (prev_admin_id == user_id),
-                    }
-                )
+            candidates = [
+                {**c, "was_last_week": prev_admin_id == c["user_id"]}
+                for c in pool_candidates
+            ]
 
         # Сортируем по количеству дежурств (меньше -> лучше)
         candidates.sort(key=lambda x: x["total_duties"])
@@ -264,12 +222,6 @@ class DutyService:
         week_dates = [week_start + timedelta(days=i) for i in range(7)]
 
         # Удаляем существующие записи на эту неделю (если есть)
-        await db.execute(
-            select(DutySchedule).where(
-                DutySchedule.sector_id == sector_id,
-                DutySchedule.week_start == week_start,
-            )
-        )
         await db.execute(
             DutySchedule.__table__.delete().where(
                 DutySchedule.sector_id == sector_id,
@@ -439,29 +391,18 @@ class DutyService:
         Returns:
             Dict с результатами распределения
         """
-        # Получаем всех активных дежурных
-        pool_result = await db.execute(
-            select(DutyAdminPool)
-            .where(
-                DutyAdminPool.sector_id == sector_id, DutyAdminPool.is_active == True
-            )
-            .options(selectinload(DutyAdminPool.user))
-        )
-        active_pool = pool_result.scalars().all()
+        # Получаем всех активных дежурных вместе с ФИО
+        candidates = await DutyService._get_pool_candidates(db, sector_id, year)
 
-        if not active_pool:
+        if not candidates:
             return {
                 "success": False,
                 "message": "В пуле нет активных дежурных",
                 "assignments": [],
             }
 
-        pool_user_ids = [p.user_id for p in active_pool]
-
-        # Получаем ФИО для всех
-        user_names = {}
-        for user_id in pool_user_ids:
-            user_names[user_id] = await DutyService._get_user_fio(db, user_id)
+        pool_user_ids = [c["user_id"] for c in candidates]
+        user_names = {c["user_id"]: c["user_name"] for c in candidates}
 
         # Определяем все даты в году
         start_date = date(year, 1, 1)
@@ -501,6 +442,7 @@ class DutyService:
 
         # Распределяем дежурства по неделям
         assignments = []
+        schedule_rows = []
         user_index = 0
         num_users = len(pool_user_ids)
 
@@ -511,6 +453,7 @@ class DutyService:
 
         # Сортируем недели
         sorted_weeks = sorted(weeks.keys())
+        created_at = datetime.utcnow()
 
         for week_key in sorted_weeks:
             week_data = weeks[week_key]
@@ -522,14 +465,16 @@ class DutyService:
 
             # Создаем записи для всех дней недели
             for duty_date in week_data["dates"]:
-                schedule_entry = DutySchedule(
-                    user_id=current_user_id,
-                    sector_id=sector_id,
-                    duty_date=duty_date,
-                    week_start=week_start,
-                    created_by=created_by,
+                schedule_rows.append(
+                    {
+                        "user_id": current_user_id,
+                        "sector_id": sector_id,
+                        "duty_date": duty_date,
+                        "week_start": week_start,
+                        "created_by": created_by,
+                        "created_at": created_at,
+                    }
                 )
-                db.add(schedule_entry)
                 stats[current_user_id] += 1
 
             assignments.append(
@@ -541,11 +486,24 @@ class DutyService:
                 }
             )
 
-        # Обновляем статистику
-        for user_id, total in stats.items():
-            await DutyService._update_statistics(
-                db, user_id, sector_id, year, total, end_date if total > 0 else None
-            )
+        # Все записи расписания вставляются одним многострочным INSERT
+        if schedule_rows:
+            await db.execute(insert(DutySchedule).values(schedule_rows))
+
+        # Обновляем статистику одним upsert
+        await DutyService._upsert_statistics(
+            db,
+            [
+                {
+                    "user_id": user_id,
+                    "sector_id": sector_id,
+                    "year": year,
+                    "total_duties": total,
+                    "last_duty_date": end_date if total > 0 else None,
+                }
+                for user_id, total in stats.items()
+            ],
+        )
 
         await db.commit()
 
@@ -556,23 +514,145 @@ class DutyService:
             "stats": stats,
         }
 
+    @staticmethod
+    async def plan_all_sectors(
+        year: int,
+        working_days_only: bool = True,
+        created_by: Optional[int] = None,
+        concurrency: int = 4,
+        session_factory=AsyncSessionLocal,
+    ) -> Dict[str, Any]:
+        """
+        Спланировать годовые дежурства для всех секторов
+
+        Сектора обрабатываются параллельно (не более concurrency одновременно),
+        каждый в собственной сессии и транзакции: ошибка в одном секторе
+        не откатывает остальные.
+
+        Args:
+            year: Год
+            working_days_only: Только рабочие дни
+            created_by: ID создателя
+            concurrency: Максимальное количество секторов в работе одновременно
+            session_factory: Фабрика сессий БД
+
+        Returns:
+            Dict с результатами по каждому сектору
+        """
+        async with session_factory() as db:
+            sector_ids = (
+                await db.execute(select(Sector.sector_id).order_by(Sector.sector_id))
+            ).scalars().all()
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def plan_sector(sector_id: int) -> Dict[str, Any]:
+            async with semaphore:
+                async with session_factory() as db:
+                    try:
+                        result = await DutyService.assign_yearly_schedule(
+                            db, sector_id, year, working_days_only, created_by
+                        )
+                    except Exception as e:
+                        await db.rollback()
+                        result = {"success": False, "message": str(e)}
+            return {
+                "sector_id": sector_id,
+                "success": result["success"],
+                "message": result["message"],
+                "weeks": len(result.get("assignments", [])),
+            }
+
+        sectors = await asyncio.gather(*(plan_sector(s) for s in sector_ids))
+
+        return {
+            "year": year,
+            "total_sectors": len(sectors),
+            "planned": sum(1 for s in sectors if s["success"]),
+            "sectors": sectors,
+        }
+
     # ========== ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ==========
 
     @staticmethod
-    async def _get_user_fio(db: AsyncSession, user_id: int) -> str:
-        """Получить ФИО пользователя"""
-        fio_result = await db.execute(select(FIO).where(FIO.user_id == user_id))
-        fio = fio_result.scalar_one_or_none()
+    async def _get_pool_candidates(
+        db: AsyncSession, sector_id: int, year: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Получить активных дежурных сектора с данными для выбора кандидата
+
+        Статистика, количество дежурств по расписанию (GROUP BY), дата
+        последнего дежурства и ФИО собираются одним запросом для всего пула.
+
+        Returns:
+            Список словарей user_id, user_name, total_duties,
+            prev_days_count, last_duty_date в порядке добавления в пул
+        """
+        schedule_stats = (
+            select(
+                DutySchedule.user_id.label("user_id"),
+                func.count().label("days_count"),
+                func.max(DutySchedule.duty_date).label("last_date"),
+            )
+            .where(
+                DutySchedule.sector_id == sector_id,
+                DutyService.in_year(year),
+            )
+            .group_by(DutySchedule.user_id)
+            .subquery()
+        )
 
-        if fio and fio.last_name and fio.first_name:
-            return f"{fio.last_name} {fio.first_name}".strip()
+        query = (
+            select(
+                DutyAdminPool.user_id,
+                User.first_name,
+                User.last_name,
+                FIO.first_name,
+                FIO.last_name,
+                DutyStatistics.total_duties,
+                DutyStatistics.last_duty_date,
+                schedule_stats.c.days_count,
+                schedule_stats.c.last_date,
+            )
+            .select_from(DutyAdminPool)
+            .outerjoin(User, User.user_id == DutyAdminPool.user_id)
+            .outerjoin(FIO, FIO.user_id == DutyAdminPool.user_id)
+            .outerjoin(
+                DutyStatistics,
+                and_(
+                    DutyStatistics.user_id == DutyAdminPool.user_id,
+                    DutyStatistics.sector_id == sector_id,
+                    DutyStatistics.year == year,
+                ),
+            )
+            .outerjoin(
+                schedule_stats, schedule_stats.c.user_id == DutyAdminPool.user_id
+            )
+            .where(
+                DutyAdminPool.sector_id == sector_id, DutyAdminPool.is_active == True
+            )
+            .order_by(DutyAdminPool.pool_id)
+        )
 
-        user_result = await db.execute(select(User).where(User.user_id == user_id))
-        user = user_result.scalar_one_or_none()
-        if user and user.last_name and user.first_name:
-            return f"{user.last_name} {user.first_name}".strip()
+        rows = (await db.execute(query)).all()
+
+        return [
+            {
+                "user_id": row[0],
+                "user_name": format_user_name(
+                    row[0], row[4], row[3], row[2], row[1]
+                ),
+                "total_duties": row[5] or 0,
+                "prev_days_count": row[7] or 0,
+                "last_duty_date": row[6] or row[8],
+            }
+            for row in rows
+        ]
 
-        return f"Пользователь {user_id}"
+    @staticmethod
+    async def _get_user_fio(db: AsyncSession, user_id: int) -> str:
+        """Получить ФИО пользователя"""
+        return await user_name_resolver.resolve(db, user_id)
 
     @staticmethod
     async def _update_statistics(
@@ -608,6 +688,43 @@ class DutyService:
             )
             db.add(stats)
 
+    @staticmethod
+    async def _upsert_statistics(db: AsyncSession, rows: List[Dict[str, Any]]):
+        """
+        Добавить дежурства к статистике нескольких пользователей одним запросом
+
+        Каждая строка: user_id, sector_id, year, total_duties (прибавляется
+        к существующему значению), last_duty_date.
+        """
+        if not rows:
+            return
+
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        updated_at = datetime.utcnow()
+        stmt = dialect_insert(DutyStatistics).values(
+            [{**row, "updated_at": updated_at} for row in rows]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                DutyStatistics.user_id,
+                DutyStatistics.sector_id,
+                DutyStatistics.year,
+            ],
+            set_={
+                "total_duties": func.coalesce(DutyStatistics.total_duties, 0)
+                + stmt.excluded.total_duties,
+                "last_duty_date": func.coalesce(
+                    stmt.excluded.last_duty_date, DutyStatistics.last_duty_date
+                ),
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await db.execute(stmt)
+
     # ========== МЕТОДЫ ДЛЯ ПРОВЕРКИ И ПОЛУЧЕНИЯ ДАННЫХ ==========
 
     @staticmethod
@@ -629,55 +746,35 @@ class DutyService:
         Returns:
             Список доступных админов
         """
-        # Получаем всех активных дежурных
-        pool_result = await db.execute(
-            select(DutyAdminPool).where(
-                DutyAdminPool.sector_id == sector_id, DutyAdminPool.is_active == True
-            )
+        # Получаем всех активных дежурных вместе со статистикой за год
+        candidates = await DutyService._get_pool_candidates(
+            db, sector_id, week_start.year
         )
-        active_pool = pool_result.scalars().all()
-        pool_user_ids = [p.user_id for p in active_pool]
 
         if exclude_last_week:
             # Получаем админа с прошлой недели
             prev_week = week_start - timedelta(days=7)
-            prev_result = await db.execute(
-                select(DutySchedule)
+            prev_user_id = await db.scalar(
+                select(DutySchedule.user_id)
                 .where(
                     DutySchedule.sector_id == sector_id,
                     DutySchedule.week_start == prev_week,
                 )
                 .limit(1)
             )
-            prev_duty = prev_result.scalar_one_or_none()
-            if prev_duty:
+            if prev_user_id:
                 # Исключаем его из списка
-                pool_user_ids = [
-                    uid for uid in pool_user_ids if uid != prev_duty.user_id
-                ]
-
-        # Получаем статистику за год
-        year = week_start.year
-        stats_result = await db.execute(
-            select(DutyStatistics).where(
-                DutyStatistics.sector_id == sector_id,
-                DutyStatistics.year == year,
-                DutyStatistics.user_id.in_(pool_user_ids),
-            )
-        )
-        stats = stats_result.scalars().all()
-        stats_dict = {s.user_id: s.total_duties for s in stats}
+                candidates = [c for c in candidates if c["user_id"] != prev_user_id]
 
         # Формируем список
-        result = []
-        for user_id in pool_user_ids:
-            result.append(
-                {
-                    "user_id": user_id,
-                    "user_name": await DutyService._get_user_fio(db, user_id),
-                    "total_duties": stats_dict.get(user_id, 0),
-                }
-            )
+        result = [
+            {
+                "user_id": c["user_id"],
+                "user_name": c["user_name"],
+                "total_duties": c["total_duties"],
+            }
+            for c in candidates
+        ]
 
         # Сортируем по количеству дежурств
         result.sort(key=lambda x: x["total_duties"])
@@ -715,9 +812,11 @@ class DutyService:
                 DutySchedule.duty_date <= week_end,
             )
             .order_by(DutySchedule.duty_date)
-            .options(selectinload(DutySchedule.user))
         )
         duties = result.scalars().all()
+        user_names = await user_name_resolver.resolve_many(
+            db, [d.user_id for d in duties]
+        )
 
         # Группируем по дням
         days = []
@@ -738,7 +837,7 @@ class DutyService:
                     {
                         "duty_id": duty.duty_id,
                         "user_id": duty.user_id,
-                        "user_name": await DutyService._get_user_fio(db, duty.user_id),
+                        "user_name": user_names[duty.user_id],
                     }
                 )
 
@@ -780,11 +879,6 @@ class DutyService:
         # Загружаем с пагинацией
         query = query.order_by(DutySchedule.duty_date.desc())
         query = query.offset(skip).limit(limit)
-        query = query.options(
-            selectinload(DutySchedule.user),
-            selectinload(DutySchedule.sector),
-            selectinload(DutySchedule.created_by_user),
-        )
 
         result = await db.execute(query)
         items = result.scalars().all()
@@ -819,9 +913,6 @@ class DutyService:
             DutyStatistics.year.desc(), DutyStatistics.total_duties.desc()
         )
         query = query.offset(skip).limit(limit)
-        query = query.options(
-            selectinload(DutyStatistics.user), selectinload(DutyStatistics.sector)
-        )
 
         result = await db.execute(query)
         items = result.scalars().all()
@@ -836,53 +927,54 @@ class DutyService:
         if not year:
             year = date.today().year
 
-        # Получаем всех пользователей, которые могут быть дежурными
-        users_result = await db.execute(
-            select(User).where(User.is_duty_eligible == True)
+        # Пул, статистика и ФИО собираются одним запросом
+        in_pool = (
+            select(DutyAdminPool.pool_id)
+            .where(
+                DutyAdminPool.user_id == User.user_id,
+                DutyAdminPool.sector_id == sector_id,
+                DutyAdminPool.is_active == True,
+            )
+            .exists()
         )
-        users = users_result.scalars().all()
 
-        result = []
-        for user in users:
-            # Проверяем, в пуле ли пользователь
-            pool_result = await db.execute(
-                select(DutyAdminPool).where(
-                    DutyAdminPool.user_id == user.user_id,
-                    DutyAdminPool.sector_id == sector_id,
-                    DutyAdminPool.is_active == True,
-                )
+        query = (
+            select(
+                User.user_id,
+                User.first_name,
+                User.last_name,
+                FIO.first_name,
+                FIO.last_name,
+                DutyStatistics.total_duties,
+                DutyStatistics.last_duty_date,
+                in_pool,
             )
-            in_pool = pool_result.first() is not None
-
-            # Получаем статистику
-            stats_result = await db.execute(
-                select(DutyStatistics).where(
-                    DutyStatistics.user_id == user.user_id,
+            .select_from(User)
+            .outerjoin(FIO, FIO.user_id == User.user_id)
+            .outerjoin(
+                DutyStatistics,
+                and_(
+                    DutyStatistics.user_id == User.user_id,
                     DutyStatistics.sector_id == sector_id,
                     DutyStatistics.year == year,
-                )
+                ),
             )
-            stats = stats_result.scalar_one_or_none()
-
-            # Получаем ФИО
-            fio_result = await db.execute(
-                select(FIO).where(FIO.user_id == user.user_id)
-            )
-            fio = fio_result.scalar_one_or_none()
+            .where(User.is_duty_eligible == True)
+        )
 
-            user_name = "Неизвестно"
-            if fio:
-                user_name = f"{fio.last_name} {fio.first_name}".strip()
-            elif user.last_name and user.first_name:
-                user_name = f"{user.last_name} {user.first_name}".strip()
+        rows = (await db.execute(query)).all()
 
+        result = []
+        for row in rows:
             result.append(
                 {
-                    "user_id": user.user_id,
-                    "user_name": user_name,
-                    "total_duties": stats.total_duties if stats else 0,
-                    "last_duty_date": stats.last_duty_date if stats else None,
-                    "in_pool": in_pool,
+                    "user_id": row[0],
+                    "user_name": format_user_name(
+                        row[0], row[4], row[3], row[2], row[1]
+                    ),
+                    "total_duties": row[5] or 0,
+                    "last_duty_date": row[6],
+                    "in_pool": bool(row[7]),
                 }
             )
 
@@ -891,6 +983,142 @@ class DutyService:
 
         return result
 
+    @staticmethod
+    async def get_year_summary(
+        db: AsyncSession,
+        year: int,
+        sector_id: Optional[int] = None,
+        month_top: int = 3,
+        year_top: int = 5,
+    ) -> Tuple[Dict[int, int], Dict[int, List[Tuple[int, int]]], List[Tuple[int, int]]]:
+        """
+        Агрегаты расписания за год, посчитанные в БД
+
+        Дежурства группируются по (месяц, пользователь), месячные итоги и
+        места в рейтингах считаются оконными функциями. Из БД возвращается
+        не больше month_top строк на месяц и year_top строк за год, объем
+        ответа не зависит от числа дежурств.
+
+        Returns:
+            (итоги по месяцам {месяц: дежурств},
+             топ по месяцам {месяц: [(user_id, дежурств), ...]},
+             топ за год [(user_id, дежурств), ...])
+        """
+        month = func.extract("month", DutySchedule.duty_date)
+        conditions = [DutyService.in_year(year)]
+        if sector_id:
+            conditions.append(DutySchedule.sector_id == sector_id)
+
+        per_month = (
+            select(
+                month.label("month"),
+                DutySchedule.user_id,
+                func.count().label("duties"),
+            )
+            .where(*conditions)
+            .group_by(month, DutySchedule.user_id)
+            .cte("per_month")
+        )
+
+        month_ranked = select(
+            per_month.c.month,
+            per_month.c.user_id,
+            per_month.c.duties,
+            func.sum(per_month.c.duties)
+            .over(partition_by=per_month.c.month)
+            .label("month_total"),
+            func.row_number()
+            .over(
+                partition_by=per_month.c.month,
+                order_by=(per_month.c.duties.desc(), per_month.c.user_id),
+            )
+            .label("place"),
+        ).subquery("month_ranked")
+
+        year_duties = func.sum(per_month.c.duties)
+        year_ranked = (
+            select(
+                per_month.c.user_id,
+                year_duties.label("duties"),
+                func.row_number()
+                .over(order_by=(year_duties.desc(), per_month.c.user_id))
+                .label("place"),
+            )
+            .group_by(per_month.c.user_id)
+            .subquery("year_ranked")
+        )
+
+        # Месяц 0 - строки годового рейтинга
+        query = union_all(
+            select(
+                month_ranked.c.month,
+                month_ranked.c.user_id,
+                month_ranked.c.duties,
+                month_ranked.c.month_total,
+            ).where(month_ranked.c.place <= month_top),
+            select(
+                literal(0),
+                year_ranked.c.user_id,
+                year_ranked.c.duties,
+                literal(0),
+            ).where(year_ranked.c.place <= year_top),
+        )
+
+        month_totals: Dict[int, int] = {}
+        month_tops: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        year_tops: List[Tuple[int, int]] = []
+        for row_month, user_id, duties, month_total in (await db.execute(query)).all():
+            row_month = int(row_month)
+            if row_month == 0:
+                year_tops.append((user_id, int(duties)))
+            else:
+                month_totals[row_month] = int(month_total)
+                month_tops[row_month].append((user_id, int(duties)))
+
+        # Строки union_all приходят без порядка - восстанавливаем места
+        for users in month_tops.values():
+            users.sort(key=lambda item: (-item[1], item[0]))
+        year_tops.sort(key=lambda item: (-item[1], item[0]))
+
+        return month_totals, dict(month_tops), year_tops
+
+    @staticmethod
+    async def get_year_histograms(
+        db: AsyncSession,
+        year: int,
+        sector_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Распределение дежурств за год по месяцам и дням недели
+
+        Один запрос с GROUP BY (месяц, день недели ISO) возвращает не больше
+        12 x 7 строк, обе гистограммы собираются из них.
+
+        Returns:
+            (дежурств по месяцам [янв..дек], дежурств по дням недели [пн..вс])
+        """
+        month = func.extract("month", DutySchedule.duty_date)
+        weekday = iso_weekday(DutySchedule.duty_date)
+
+        query = (
+            select(month, weekday, func.count())
+            .where(DutyService.in_year(year))
+            .group_by(month, weekday)
+        )
+        if sector_id:
+            query = query.where(DutySchedule.sector_id == sector_id)
+        if user_id:
+            query = query.where(DutySchedule.user_id == user_id)
+
+        monthly = [0] * 12
+        weekly = [0] * 7
+        for row_month, row_weekday, duties in (await db.execute(query)).all():
+            monthly[int(row_month) - 1] += duties
+            weekly[int(row_weekday) - 1] += duties
+
+        return monthly, weekly
+
     @staticmethod
     async def assign_duty_for_period(
         db: AsyncSession,
@@ -910,15 +1138,12 @@ class DutyService:
                 "assigned_user_id": None,
             }
 
-        # Проверяем, есть ли активные дежурные в пуле для этого сектора
-        pool_result = await db.execute(
-            select(DutyAdminPool).where(
-                DutyAdminPool.sector_id == sector_id, DutyAdminPool.is_active == True
-            )
-        )
-        active_pool = pool_result.scalars().all()
+        year = start_date.year
 
-        if not active_pool:
+        # Получаем всех активных дежурных в пуле вместе с их статистикой
+        user_stats = await DutyService._get_pool_candidates(db, sector_id, year)
+
+        if not user_stats:
             return {
                 "success": False,
                 "message": "В пуле нет активных дежурных для этого сектора",
@@ -927,64 +1152,20 @@ class DutyService:
 
         # Проверяем, не назначено ли уже на какие-то даты в этом периоде
         existing = await db.execute(
-            select(DutySchedule).where(
+            select(DutySchedule.duty_date).where(
                 DutySchedule.sector_id == sector_id,
                 DutySchedule.duty_date.between(start_date, end_date),
             )
         )
-        existing_duties = existing.scalars().all()
+        existing_dates = existing.scalars().all()
 
-        if existing_duties:
-            existing_dates = [d.duty_date for d in existing_duties]
+        if existing_dates:
             return {
                 "success": False,
                 "message": f"На некоторые даты уже назначены дежурства: {existing_dates}",
                 "assigned_user_id": None,
             }
 
-        year = start_date.year
-
-        # Получаем статистику для всех в пуле
-        user_stats = []
-        for pool_entry in active_pool:
-            user_id = pool_entry.user_id
-
-            # Статистика за год
-            stats_result = await db.execute(
-                select(DutyStatistics).where(
-                    DutyStatistics.user_id == user_id,
-                    DutyStatistics.sector_id == sector_id,
-                    DutyStatistics.year == year,
-                )
-            )
-            stats = stats_result.scalar_one_or_none()
-
-            # Получаем ФИО
-            fio_result = await db.execute(select(FIO).where(FIO.user_id == user_id))
-            fio = fio_result.scalar_one_or_none()
-
-            # Получаем предыдущие дежурства в этом году для более точного распределения
-            prev_duties_result = await db.execute(
-                select(DutySchedule).where(
-                    DutySchedule.user_id == user_id,
-                    DutySchedule.sector_id == sector_id,
-                    DutySchedule.duty_date >= date(year, 1, 1),
-                    DutySchedule.duty_date <= date(year, 12, 31),
-                )
-            )
-            prev_duties = prev_duties_result.scalars().all()
-            prev_days_count = len(prev_duties)
-
-            user_stats.append(
-                {
-                    "user_id": user_id,
-                    "fio": fio,
-                    "total_duties": stats.total_duties if stats else 0,
-                    "prev_days_count": prev_days_count,
-                    "last_duty_date": stats.last_duty_date if stats else None,
-                }
-            )
-
         # Сортируем по количеству дежурств (меньше -> лучше)
         user_stats.sort(
             key=lambda x: (
@@ -1017,49 +1198,16 @@ class DutyService:
             db.add(schedule_entry)
 
         # Обновляем статистику
-        stats_result = await db.execute(
-            select(DutyStatistics).where(
-                DutyStatistics.user_id == selected_user_id,
-                DutyStatistics.sector_id == sector_id,
-                DutyStatistics.year == year,
-            )
+        await DutyService._update_statistics(
+            db, selected_user_id, sector_id, year, days_count, period_dates[-1]
         )
-        stats = stats_result.scalar_one_or_none()
-
-        if stats:
-            stats.total_duties += days_count
-            stats.last_duty_date = period_dates[-1]
-            stats.updated_at = datetime.utcnow()
-        else:
-            stats = DutyStatistics(
-                user_id=selected_user_id,
-                sector_id=sector_id,
-                year=year,
-                total_duties=days_count,
-                last_duty_date=period_dates[-1],
-            )
-            db.add(stats)
 
         await db.commit()
 
-        # Формируем имя пользователя
-        user_name = "Неизвестно"
-        if selected["fio"]:
-            user_name = (
-                f"{selected['fio'].last_name} {selected['fio'].first_name}".strip()
-            )
-        else:
-            user_result = await db.execute(
-                select(User).where(User.user_id == selected_user_id)
-            )
-            user = user_result.scalar_one_or_none()
-            if user and user.last_name and user.first_name:
-                user_name = f"{user.last_name} {user.first_name}".strip()
-
         return {
             "success": True,
             "message": f"Дежурство успешно назначено на {days_count} дней",
             "assigned_user_id": selected_user_id,
-            "assigned_user_name": user_name,
+            "assigned_user_name": selected["user_name"],
             "dates": [d.isoformat() for d in period_dates],
         }
@@ -0,0 +1,157 @@
+# app/services/health_buffer.py
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.models.database import AsyncSessionLocal
+from app.services.health_snapshot import health_report_snapshot
+from app.services.user_service import UserService
+
+logger = logging.getLogger(__name__)
+
+# (статус, заболевание); заболевание None - оставить текущее
+HealthUpdate = Tuple[str, Optional[str]]
+
+
+class HealthWriteBuffer:
+    """
+    Отложенная запись статусов здоровья (write-behind)
+
+    Изменения копятся в памяти по одному на пользователя (побеждает
+    последнее) и раз в interval секунд записываются в БД одной
+    транзакцией с пакетными upsert. Пока запись не выполнена, отчет
+    о здоровье накладывает ожидающие изменения поверх снимка
+    (см. overrides()). При остановке выполняется финальная запись.
+    """
+
+    def __init__(self, interval: float = 0.3, session_factory=AsyncSessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self._pending: Dict[int, HealthUpdate] = {}
+        self._flushing: Dict[int, HealthUpdate] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.written = 0
+        self.flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @staticmethod
+    def _normalize(status: str, disease: Optional[str]) -> HealthUpdate:
+        """Те же правила, что в UserService.set_health_status"""
+        if status != "болен":
+            return status, ""
+        return status, disease or None
+
+    @staticmethod
+    def _merge(older: Optional[HealthUpdate], newer: HealthUpdate) -> HealthUpdate:
+        """Объединить два изменения одного пользователя"""
+        status, disease = newer
+        if disease is None and older is not None:
+            # "Оставить заболевание" относится к еще не записанному значению
+            disease = older[1]
+        return status, disease
+
+    def submit(
+        self, user_id: int, status: str, disease: Optional[str] = None
+    ) -> HealthUpdate:
+        """
+        Поставить изменение статуса в очередь на запись
+
+        Returns:
+            Итоговое ожидающее изменение пользователя (статус, заболевание)
+        """
+        update = self._merge(
+            self._pending.get(user_id) or self._flushing.get(user_id),
+            self._normalize(status, disease),
+        )
+        self._pending[user_id] = update
+        self.submitted += 1
+        return update
+
+    def has_pending(self, user_id: int) -> bool:
+        return user_id in self._pending or user_id in self._flushing
+
+    def overrides(self) -> Dict[int, HealthUpdate]:
+        """Изменения, еще не видимые в БД (включая записываемые сейчас)"""
+        if not self._pending and not self._flushing:
+            return {}
+        return {**self._flushing, **self._pending}
+
+    async def flush(self) -> int:
+        """
+        Записать накопленные изменения
+
+        Returns:
+            Количество записанных пользователей
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            try:
+                async with self.session_factory() as db:
+                    written = await UserService.bulk_set_health_status(db, batch)
+                    await health_report_snapshot.refresh_users(db, written)
+            except Exception as e:
+                logger.error(f"Ошибка записи статусов здоровья ({len(batch)}): {e}")
+                # Возвращаем пачку в очередь, не затирая более новые изменения
+                for user_id, update in batch.items():
+                    newer = self._pending.get(user_id)
+                    self._pending[user_id] = (
+                        self._merge(update, newer) if newer else update
+                    )
+                return 0
+            finally:
+                self._flushing = {}
+
+            if len(written) < len(batch):
+                logger.warning(
+                    f"Пропущены статусы неизвестных пользователей: "
+                    f"{sorted(set(batch) - set(written))}"
+                )
+            self.flushes += 1
+            self.written += len(written)
+            return len(written)
+
+    async def flush_user(self, user_id: int):
+        """Дождаться записи изменений пользователя перед прямой записью в БД"""
+        if self.has_pending(user_id):
+            await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        """Запустить фоновую запись"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую запись и записать оставшиеся изменения"""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        await self.flush()
+        if self._pending:
+            logger.error(
+                f"Не записаны статусы {len(self._pending)} пользователей при остановке"
+            )
+
+
+# Глобальный экземпляр
+health_write_buffer = HealthWriteBuffer(
+    interval=settings.HEALTH_FLUSH_INTERVAL_MS / 1000
+)
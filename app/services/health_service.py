@@ -1,10 +1,10 @@
 # app/services/health_service.py - обновленная версия
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
-from app.models.user import User, UserStatus, FIO, Health, Disease, Sector
+from app.models.user import UserStatus, Health, Disease, Sector
+from app.services.health_snapshot import health_report_snapshot
+from app.services.health_buffer import health_write_buffer
 from typing import List, Tuple, Dict, Optional
-from collections import defaultdict
 
 class HealthService:
     @staticmethod
@@ -23,6 +23,7 @@ class HealthService:
         
         await db.commit()
         await db.refresh(db_health)
+        await health_report_snapshot.refresh_user(db, user_id)
         return db_health
     
     @staticmethod
@@ -41,40 +42,15 @@ class HealthService:
         
         await db.commit()
         await db.refresh(db_disease)
+        await health_report_snapshot.refresh_user(db, user_id)
         return db_disease
     
     @staticmethod
     async def get_report(db: AsyncSession, sector_id: Optional[int] = None) -> Tuple[Dict, List]:
-        # Базовый запрос с JOIN
-        query = (
-            select(
-                FIO.first_name,
-                FIO.last_name,
-                Health.status,
-                Disease.disease
-            )
-            .select_from(User)
-            .join(FIO, FIO.user_id == User.user_id)
-            .join(Health, Health.user_id == User.user_id)
-            .join(Disease, Disease.user_id == User.user_id)
-            .join(UserStatus, UserStatus.user_id == User.user_id)
-            .where(UserStatus.enable_report == True)
+        """Отчет по сектору из снимка в памяти (статистика и строки пользователей)"""
+        return await health_report_snapshot.get_report(
+            db, sector_id, overrides=health_write_buffer.overrides()
         )
-        
-        if sector_id:
-            query = query.where(UserStatus.sector_id == sector_id)
-        
-        result = await db.execute(query)
-        users_data = result.all()
-        
-        # Статистика по статусам
-        status_stats = defaultdict(int)
-        
-        for user in users_data:
-            status = user[2] or "не указан"
-            status_stats[status] += 1
-        
-        return dict(status_stats), users_data
     
     @staticmethod
     async def get_all_sectors(db: AsyncSession) -> List[int]:
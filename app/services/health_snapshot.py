@@ -0,0 +1,213 @@
+# app/services/health_snapshot.py
+import asyncio
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user import User, UserStatus, FIO, Health, Disease
+
+# Ключ общей статистики по всем секторам
+ALL_SECTORS = None
+
+
+def report_query():
+    """Запрос строк отчета: пользователи с включенным отчетом и их статусы"""
+    return (
+        select(
+            User.user_id,
+            UserStatus.sector_id,
+            FIO.first_name,
+            FIO.last_name,
+            Health.status,
+            Disease.disease,
+        )
+        .select_from(User)
+        .join(FIO, FIO.user_id == User.user_id)
+        .join(Health, Health.user_id == User.user_id)
+        .join(Disease, Disease.user_id == User.user_id)
+        .join(UserStatus, UserStatus.user_id == User.user_id)
+        .where(UserStatus.enable_report == True)
+    )
+
+
+class HealthReportSnapshot:
+    """
+    Отчет о здоровье по секторам, который поддерживается в памяти
+
+    При первом обращении (и затем раз в ttl секунд, на случай записей
+    из других процессов) строится одним запросом. Между перезагрузками
+    изменения конкретного пользователя применяются точечно через
+    refresh_user(), поэтому отдача отчета не зависит от размера таблиц.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._loaded_at: Optional[float] = None
+        self._loading = False
+        self._load_lock = asyncio.Lock()
+        self._touched: Dict[int, Optional[tuple]] = {}
+        self._reset()
+
+    def _reset(self):
+        # user_id -> (sector_id, отрисованная строка отчета)
+        self._users: Dict[int, Tuple[Optional[int], dict]] = {}
+        self._rows: Dict[Optional[int], Dict[int, dict]] = defaultdict(dict)
+        self._stats: Dict[Optional[int], Counter] = defaultdict(Counter)
+
+    @staticmethod
+    def _status_key(status: Optional[str]) -> str:
+        return status or "не указан"
+
+    def _remove(self, user_id: int):
+        entry = self._users.pop(user_id, None)
+        if entry is None:
+            return
+
+        sector_id, row = entry
+        status = self._status_key(row["status"])
+        for key in {sector_id, ALL_SECTORS}:
+            self._rows[key].pop(user_id, None)
+            self._stats[key][status] -= 1
+            if self._stats[key][status] <= 0:
+                del self._stats[key][status]
+
+    def _apply(self, user_id: int, data: Optional[tuple]):
+        """Заменить строку пользователя; data=None - убрать его из отчета"""
+        self._remove(user_id)
+        if data is None:
+            return
+
+        sector_id, first_name, last_name, status, disease = data
+        row = {
+            "first_name": first_name,
+            "last_name": last_name,
+            "status": status,
+            "disease": disease if disease else "",
+        }
+        self._users[user_id] = (sector_id, row)
+        for key in {sector_id, ALL_SECTORS}:
+            self._rows[key][user_id] = row
+            self._stats[key][self._status_key(status)] += 1
+
+    @property
+    def is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def load(self, db: AsyncSession):
+        """
+        Перестроить снимок целиком
+
+        Перестройка выполняется одна за раз: вызов, дождавшийся завершения
+        чужой перестройки, повторно таблицы не читает. Иначе более поздний
+        полный запрос затер бы изменения, примененные во время первого.
+        """
+        loaded_at = self._loaded_at
+        async with self._load_lock:
+            if self._loaded_at != loaded_at and self.is_fresh:
+                return
+
+            self._loading = True
+            self._touched = {}
+            try:
+                result = await db.execute(report_query())
+                rows = result.all()
+            finally:
+                self._loading = False
+
+            self._reset()
+            for row in rows:
+                self._apply(row[0], tuple(row[1:]))
+
+            # Изменения, пришедшие пока выполнялся запрос, накладываем сверху
+            for user_id, data in self._touched.items():
+                self._apply(user_id, data)
+            self._touched = {}
+            self._loaded_at = time.monotonic()
+
+    async def refresh_user(self, db: AsyncSession, user_id: int):
+        """Перечитать строку отчета одного пользователя после записи"""
+        await self.refresh_users(db, [user_id])
+
+    async def refresh_users(self, db: AsyncSession, user_ids: List[int]):
+        """Перечитать строки отчета пачки пользователей одним запросом"""
+        if not user_ids or (self._loaded_at is None and not self._loading):
+            return
+
+        result = await db.execute(report_query().where(User.user_id.in_(user_ids)))
+        rows = {row[0]: tuple(row[1:]) for row in result.all()}
+        for user_id in user_ids:
+            self.set_user_row(user_id, rows.get(user_id))
+
+    def set_user_row(self, user_id: int, data: Optional[tuple]):
+        """
+        Записать уже известную строку отчета пользователя без запроса к БД
+
+        data: (sector_id, first_name, last_name, status, disease) или None,
+        если пользователь не попадает в отчет.
+        """
+        if self._loaded_at is None and not self._loading:
+            return
+
+        self._apply(user_id, data)
+        if self._loading:
+            self._touched[user_id] = data
+
+    def invalidate(self):
+        """Сбросить снимок - он будет перестроен при следующем отчете"""
+        self._loaded_at = None
+        self._reset()
+
+    async def get_report(
+        self,
+        db: AsyncSession,
+        sector_id: Optional[int] = None,
+        overrides: Optional[Dict[int, Tuple[str, Optional[str]]]] = None,
+    ) -> Tuple[Dict[str, int], List[dict]]:
+        """
+        Получить отчет по сектору (или по всем секторам)
+
+        Args:
+            db: Сессия БД
+            sector_id: Сектор или None для всех секторов
+            overrides: Еще не записанные в БД изменения user_id ->
+                (статус, заболевание или None - без изменений)
+
+        Returns:
+            Статистика по статусам и список строк пользователей
+        """
+        if not self.is_fresh:
+            await self.load(db)
+
+        key = sector_id if sector_id else ALL_SECTORS
+        stats = self._stats.get(key, {})
+        rows = self._rows.get(key, {})
+        if not overrides:
+            return dict(stats), list(rows.values())
+
+        stats = Counter(stats)
+        replaced = {}
+        for user_id, (status, disease) in overrides.items():
+            row = rows.get(user_id)
+            if row is None:
+                continue
+            stats[self._status_key(row["status"])] -= 1
+            stats[self._status_key(status)] += 1
+            replaced[user_id] = {
+                **row,
+                "status": status,
+                "disease": row["disease"] if disease is None else disease,
+            }
+
+        stats = {status: count for status, count in stats.items() if count > 0}
+        return stats, [replaced.get(user_id, row) for user_id, row in rows.items()]
+
+
+# Глобальный экземпляр
+health_report_snapshot = HealthReportSnapshot(ttl=settings.HEALTH_SNAPSHOT_TTL)
@@ -0,0 +1,130 @@
+# app/services/name_resolver.py
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user import User, FIO
+
+
+def default_user_name(user_id: int) -> str:
+    """Имя-заглушка для пользователя без ФИО и имени в users"""
+    return f"Пользователь {user_id}"
+
+
+def format_user_name(
+    user_id: int,
+    fio_last_name: Optional[str],
+    fio_first_name: Optional[str],
+    last_name: Optional[str],
+    first_name: Optional[str],
+) -> str:
+    """Сформировать отображаемое имя: ФИО, затем данные users, затем заглушка"""
+    if fio_last_name and fio_first_name:
+        return f"{fio_last_name} {fio_first_name}".strip()
+    if last_name and first_name:
+        return f"{last_name} {first_name}".strip()
+    return default_user_name(user_id)
+
+
+class UserNameResolver:
+    """
+    Кэш отображаемых имен пользователей на уровне процесса
+
+    Записи живут не дольше ttl секунд, при превышении max_size вытесняются
+    давно не использованные. Промахи добираются одним запросом
+    users LEFT JOIN fio на всю пачку идентификаторов.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, Tuple[float, str]]" = OrderedDict()
+
+    def _get_cached(self, user_id: int) -> Optional[str]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, name = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return name
+
+    def _store(self, user_id: int, name: str):
+        self._entries[user_id] = (time.monotonic() + self.ttl, name)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def resolve_many(
+        self, db: AsyncSession, user_ids: Iterable[int]
+    ) -> Dict[int, str]:
+        """
+        Получить имена для набора пользователей
+
+        Args:
+            db: Сессия БД
+            user_ids: Идентификаторы пользователей (повторы допускаются)
+
+        Returns:
+            Словарь user_id -> отображаемое имя для всех переданных id
+        """
+        names: Dict[int, str] = {}
+        missing = []
+
+        for user_id in dict.fromkeys(user_ids):
+            if user_id is None:
+                continue
+            name = self._get_cached(user_id)
+            if name is None:
+                missing.append(user_id)
+            else:
+                names[user_id] = name
+
+        if missing:
+            result = await db.execute(
+                select(
+                    User.user_id,
+                    FIO.last_name,
+                    FIO.first_name,
+                    User.last_name,
+                    User.first_name,
+                )
+                .outerjoin(FIO, FIO.user_id == User.user_id)
+                .where(User.user_id.in_(missing))
+            )
+            for row in result.all():
+                names[row[0]] = format_user_name(*row)
+
+            for user_id in missing:
+                name = names.setdefault(user_id, default_user_name(user_id))
+                self._store(user_id, name)
+
+        return names
+
+    async def resolve(self, db: AsyncSession, user_id: int) -> str:
+        """Получить имя одного пользователя"""
+        names = await self.resolve_many(db, [user_id])
+        return names[user_id]
+
+    def invalidate(self, *user_ids: int):
+        """Сбросить кэш для пользователей, чьи users/ФИО изменились"""
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Полностью очистить кэш"""
+        self._entries.clear()
+
+
+# Глобальный экземпляр
+user_name_resolver = UserNameResolver(
+    ttl=settings.NAME_CACHE_TTL, max_size=settings.NAME_CACHE_SIZE
+)
@@ -0,0 +1,90 @@
+# app/services/report_service.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.models.user import Sector
+from app.models.duty import DutySchedule
+from app.services.health_snapshot import health_report_snapshot
+from app.services.health_buffer import health_write_buffer
+from app.services.name_resolver import user_name_resolver
+from typing import Optional, Dict, Any, List
+from datetime import date
+from collections import defaultdict
+
+
+class ReportService:
+    @staticmethod
+    async def get_daily_digest(
+        db: AsyncSession, day: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Ежедневная сводка по всем секторам для рассылки
+
+        Число запросов не зависит от количества секторов: список секторов,
+        дежурства на день и имена дежурных (по одному запросу), отчеты о
+        здоровье - из снимка в памяти.
+
+        Args:
+            db: Сессия БД
+            day: Дата сводки (по умолчанию сегодня)
+
+        Returns:
+            Дата и список секторов с отчетом о здоровье и дежурными на день
+        """
+        day = day or date.today()
+
+        sectors_result = await db.execute(
+            select(Sector.sector_id, Sector.name).order_by(Sector.sector_id)
+        )
+        sectors = [
+            (row[0], row[1] or f"Сектор {row[0]}") for row in sectors_result.all()
+        ]
+        sector_names = dict(sectors)
+
+        duties_result = await db.execute(
+            select(DutySchedule.duty_id, DutySchedule.user_id, DutySchedule.sector_id)
+            .where(DutySchedule.duty_date == day)
+            .order_by(DutySchedule.duty_id)
+        )
+        duty_rows = duties_result.all()
+        user_names = await user_name_resolver.resolve_many(
+            db, [row[1] for row in duty_rows]
+        )
+
+        duties_by_sector: Dict[int, List[dict]] = defaultdict(list)
+        for duty_id, user_id, sector_id in duty_rows:
+            duties_by_sector[sector_id].append(
+                {
+                    "duty_id": duty_id,
+                    "user_id": user_id,
+                    "user_name": user_names[user_id],
+                    "sector_id": sector_id,
+                    "sector_name": sector_names.get(sector_id, f"Сектор {sector_id}"),
+                    "duty_date": day,
+                }
+            )
+
+        digest = []
+        overrides = health_write_buffer.overrides()
+        for sector_id, name in sectors:
+            status_stats, users = await health_report_snapshot.get_report(
+                db, sector_id, overrides=overrides
+            )
+            digest.append(
+                {
+                    "sector_id": sector_id,
+                    "name": name,
+                    "report": {
+                        "status_summary": status_stats,
+                        "users": users,
+                        "total": len(users),
+                        "sector_info": {
+                            "sector_id": sector_id,
+                            "name": name,
+                            "is_user_sector": False,
+                        },
+                    },
+                    "duties": duties_by_sector.get(sector_id, []),
+                }
+            )
+
+        return {"date": day, "sectors": digest}
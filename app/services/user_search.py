@@ -0,0 +1,152 @@
+# app/services/user_search.py
+from difflib import SequenceMatcher
+from typing import Any, Dict, List
+
+from sqlalchemy import String, func, literal_column, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User, FIO
+
+
+def fold_search_text(text: str) -> str:
+    """Свернуть регистр и ё -> е, как выражение поисковых индексов"""
+    return text.casefold().replace("ё", "е")
+
+
+def normalize_search_text(text: str) -> str:
+    """Привести строку запроса к виду поискового индекса"""
+    return fold_search_text(text).strip()
+
+
+def _search_expression(*columns):
+    """
+    Нормализованная строка для поиска по столбцам
+
+    Выражение должно совпадать с выражением индексов из миграции
+    008_user_search_trigram, иначе PostgreSQL не использует индекс.
+    Разделители - константы SQL, а не параметры, по той же причине.
+    """
+    parts = [func.coalesce(column, literal_column("''")) for column in columns]
+    expression = parts[0]
+    for part in parts[1:]:
+        expression = expression.op("||")(literal_column("' '")).op("||")(part)
+    return func.replace(
+        func.lower(expression),
+        literal_column("'ё'"),
+        literal_column("'е'"),
+        type_=String,
+    )
+
+
+USER_SEARCH_EXPRESSION = _search_expression(User.first_name, User.last_name, User.username)
+FIO_SEARCH_EXPRESSION = _search_expression(FIO.first_name, FIO.last_name)
+
+
+class UserSearchService:
+    """
+    Поиск пользователей по имени, фамилии, username и ФИО
+
+    В PostgreSQL подстрока ищется по триграммным GIN-индексам (pg_trgm) на
+    нормализованных строках users и fio, результаты ранжируются по
+    word_similarity. lower() в PostgreSQL учитывает кириллицу при локали
+    БД *.UTF-8. В SQLite (тесты) индексов нет - выполняется простой
+    просмотр таблиц со сравнением в Python.
+    """
+
+    @staticmethod
+    async def search(
+        db: AsyncSession, query: str, skip: int = 0, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Найти пользователей, у которых строка query входит в имя или ФИО
+
+        Returns:
+            Пользователи по убыванию сходства с запросом
+        """
+        normalized = normalize_search_text(query)
+        if not normalized:
+            return []
+
+        if db.get_bind().dialect.name == "postgresql":
+            return await UserSearchService._search_trigram(db, normalized, skip, limit)
+        return await UserSearchService._search_scan(db, normalized, skip, limit)
+
+    @staticmethod
+    def _row_to_dict(user: User) -> Dict[str, Any]:
+        return {
+            "id": user.id,
+            "user_id": user.user_id,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "username": user.username,
+            "created_at": user.created_at,
+            "updated_at": user.updated_at,
+        }
+
+    @staticmethod
+    async def _search_trigram(
+        db: AsyncSession, normalized: str, skip: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        """Поиск по триграммным индексам с ранжированием по сходству"""
+        # Каждая половина UNION использует свой GIN-индекс
+        matched = union(
+            select(User.user_id).where(
+                USER_SEARCH_EXPRESSION.contains(normalized, autoescape=True)
+            ),
+            select(FIO.user_id).where(
+                FIO_SEARCH_EXPRESSION.contains(normalized, autoescape=True)
+            ),
+        )
+
+        rank = func.greatest(
+            func.word_similarity(normalized, USER_SEARCH_EXPRESSION),
+            func.word_similarity(normalized, FIO_SEARCH_EXPRESSION),
+        )
+
+        result = await db.execute(
+            select(User)
+            .outerjoin(FIO, FIO.user_id == User.user_id)
+            .where(User.user_id.in_(matched))
+            .order_by(rank.desc(), User.user_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return [UserSearchService._row_to_dict(user) for user in result.scalars()]
+
+    @staticmethod
+    def _word_similarity(query: str, text: str) -> float:
+        """Сходство запроса с лучшим отрезком text из стольких же слов"""
+        size = len(query.split())
+        words = text.split()
+        return max(
+            SequenceMatcher(None, query, " ".join(words[i : i + size])).ratio()
+            for i in range(max(len(words) - size + 1, 1))
+        )
+
+    @staticmethod
+    async def _search_scan(
+        db: AsyncSession, normalized: str, skip: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        """Простой просмотр users и fio (SQLite не складывает регистр кириллицы)"""
+        result = await db.execute(
+            select(User, FIO.first_name, FIO.last_name).outerjoin(
+                FIO, FIO.user_id == User.user_id
+            )
+        )
+
+        found = []
+        for user, fio_first_name, fio_last_name in result.all():
+            texts = (
+                f"{user.first_name or ''} {user.last_name or ''} {user.username or ''}",
+                f"{fio_first_name or ''} {fio_last_name or ''}",
+            )
+            matched = [t for t in map(fold_search_text, texts) if normalized in t]
+            if matched:
+                rank = max(UserSearchService._word_similarity(normalized, t) for t in matched)
+                found.append((rank, user))
+
+        found.sort(key=lambda item: (-item[0], item[1].user_id))
+        return [
+            UserSearchService._row_to_dict(user)
+            for _, user in found[skip : skip + limit]
+        ]
@@ -1,24 +1,37 @@
 # app/services/user_service.py - упрощенная версия
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
 from app.models.user import User, UserStatus, FIO, Health, Disease
+from app.models.loaders import load_profile
 from app.schemas.user import UserCreate, UserUpdate, UserStatusUpdate
-from typing import Optional, List
+from app.services.name_resolver import user_name_resolver
+from app.services.health_snapshot import health_report_snapshot
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
 
 class UserService:
     @staticmethod
-    async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
-        # Упрощенный запрос без сложных join
-        result = await db.execute(
-            select(User).where(User.user_id == user_id)
-        )
+    async def get_user_by_id(
+        db: AsyncSession, user_id: int, profile: Optional[str] = None
+    ) -> Optional[User]:
+        """
+        Пользователь по user_id
+        
+        Без profile загружаются только столбцы users; "detail" - вместе
+        со статусом, ФИО, здоровьем и заболеванием в том же запросе.
+        """
+        query = select(User).where(User.user_id == user_id)
+        if profile:
+            query = query.options(*load_profile(User, profile))
+        result = await db.execute(query)
         return result.scalar_one_or_none()
     
     @staticmethod
     async def create_user(db: AsyncSession, user_data: UserCreate, chat_id: int) -> Optional[User]:
-        """Создать пользователя или вернуть существующего"""
+        """Создать пользователя или вернуть существующего (с профилем "detail")"""
         # Проверяем, существует ли уже пользователь
-        existing_user = await UserService.get_user_by_id(db, user_data.user_id)
+        existing_user = await UserService.get_user_by_id(db, user_data.user_id, profile="detail")
         if existing_user:
             return existing_user
         
@@ -58,8 +71,9 @@ class UserService:
             db.add(db_disease)
             
             await db.commit()
-            await db.refresh(db_user)
-            return db_user
+            user_name_resolver.invalidate(user_data.user_id)
+            await health_report_snapshot.refresh_user(db, user_data.user_id)
+            return await UserService.get_user_by_id(db, user_data.user_id, profile="detail")
             
         except Exception as e:
             await db.rollback()
@@ -115,14 +129,13 @@ class UserService:
                     )
                     
                     await db.commit()
+                    user_name_resolver.invalidate(user_data.user_id)
+                    await health_report_snapshot.refresh_user(db, user_data.user_id)
                     
                     # Получаем созданного/обновленного пользователя
-                    result = await db.execute(
-                        select(User).where(User.user_id == user_data.user_id)
+                    return await UserService.get_user_by_id(
+                        db, user_data.user_id, profile="detail"
                     )
-                    db_user = result.scalar_one_or_none()
-                    
-                    return db_user
                     
                 except Exception as e2:
                     await db.rollback()
@@ -134,8 +147,11 @@ class UserService:
     
     @staticmethod
     async def update_user(db: AsyncSession, user_id: int, user_data: UserUpdate) -> Optional[User]:
+        """Обновить данные users (пользователь возвращается с профилем "detail")"""
         result = await db.execute(
-            select(User).where(User.user_id == user_id)
+            select(User)
+            .where(User.user_id == user_id)
+            .options(*load_profile(User, "detail"))
         )
         db_user = result.scalar_one_or_none()
         
@@ -146,6 +162,7 @@ class UserService:
                     setattr(db_user, key, value)
             
             await db.commit()
+            user_name_resolver.invalidate(user_id)
             await db.refresh(db_user)
         
         return db_user
@@ -162,18 +179,114 @@ class UserService:
                 if value is not None:
                     setattr(db_status, key, value)
             await db.commit()
+            await health_report_snapshot.refresh_user(db, user_id)
         
         return db_status
     
     @staticmethod
-    async def get_all_users(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
-        result = await db.execute(
-            select(User)
-            .offset(skip)
-            .limit(limit)
-        )
+    def filter_users(
+        query,
+        enable_admin: Optional[bool] = None,
+        sector_id: Optional[int] = None,
+        enable_report: Optional[bool] = None,
+    ):
+        """Фильтры по id_status (запрос должен содержать outer join с UserStatus)"""
+        if enable_admin is not None:
+            query = query.where(func.coalesce(UserStatus.enable_admin, False) == enable_admin)
+        if enable_report is not None:
+            query = query.where(func.coalesce(UserStatus.enable_report, False) == enable_report)
+        if sector_id is not None:
+            query = query.where(UserStatus.sector_id == sector_id)
+        return query
+    
+    @staticmethod
+    async def get_all_users(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[int] = None,
+        enable_admin: Optional[bool] = None,
+        sector_id: Optional[int] = None,
+        enable_report: Optional[bool] = None,
+        profile: Optional[str] = None,
+    ) -> List[User]:
+        """
+        Страница пользователей в порядке user_id
+        
+        Если передан after (курсор - последний user_id предыдущей страницы),
+        используется keyset-пагинация, иначе OFFSET skip. Связи загружаются
+        только по профилю profile (см. app/models/loaders.py).
+        """
+        query = select(User).outerjoin(UserStatus, UserStatus.user_id == User.user_id)
+        if profile:
+            query = query.options(*load_profile(User, profile))
+        query = UserService.filter_users(query, enable_admin, sector_id, enable_report)
+        
+        if after is not None:
+            query = query.where(User.user_id > after)
+        else:
+            query = query.offset(skip)
+        
+        result = await db.execute(query.order_by(User.user_id).limit(limit))
         return result.scalars().all()
     
+    @staticmethod
+    async def get_directory(
+        db: AsyncSession, updated_since: Optional[datetime] = None
+    ) -> Tuple[List[dict], Optional[datetime]]:
+        """
+        Справочник пользователей для поиска в боте: имена, username и ФИО
+        
+        Без updated_since возвращаются все пользователи, иначе только
+        измененные начиная с этого момента (users.updated_at, индекс
+        idx_users_updated_at). Изменения только в fio (без записи в users)
+        по updated_at не видны и попадают в справочник бота при полной
+        перезагрузке (USER_DIRECTORY_FULL_RELOAD_INTERVAL).
+        
+        Returns:
+            (строки справочника, наибольший updated_at среди них -
+             курсор следующего запроса; None, если строк нет)
+        """
+        query = (
+            select(
+                User.user_id,
+                User.first_name,
+                User.last_name,
+                User.username,
+                User.updated_at,
+                FIO.first_name.label("fio_first_name"),
+                FIO.last_name.label("fio_last_name"),
+                FIO.patronymic_name.label("fio_patronymic_name"),
+            )
+            .select_from(User)
+            .outerjoin(FIO, FIO.user_id == User.user_id)
+        )
+        if updated_since is not None:
+            query = query.where(User.updated_at >= updated_since)
+        
+        rows = [dict(row) for row in (await db.execute(query)).mappings()]
+        cursor = max(
+            (row["updated_at"] for row in rows if row["updated_at"] is not None),
+            default=None,
+        )
+        return rows, cursor
+    
+    @staticmethod
+    async def count_users(
+        db: AsyncSession,
+        enable_admin: Optional[bool] = None,
+        sector_id: Optional[int] = None,
+        enable_report: Optional[bool] = None,
+    ) -> int:
+        """Количество пользователей с учетом фильтров"""
+        query = (
+            select(func.count(User.user_id))
+            .select_from(User)
+            .outerjoin(UserStatus, UserStatus.user_id == User.user_id)
+        )
+        query = UserService.filter_users(query, enable_admin, sector_id, enable_report)
+        return await db.scalar(query)
+    
     @staticmethod
     async def is_user_admin(db: AsyncSession, user_id: int) -> bool:
         result = await db.execute(
@@ -183,6 +296,27 @@ class UserService:
         )
         return result.scalar_one_or_none() is not None
     
+    @staticmethod
+    async def get_user_permissions(db: AsyncSession, user_id: int) -> Optional[dict]:
+        """Права пользователя одним запросом к id_status, без загрузки связей"""
+        result = await db.execute(
+            select(
+                UserStatus.enable_admin,
+                UserStatus.enable_report,
+                UserStatus.sector_id,
+            ).where(UserStatus.user_id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        
+        return {
+            "user_id": user_id,
+            "is_admin": bool(row[0]),
+            "enable_report": bool(row[1]),
+            "sector_id": row[2],
+        }
+    
     @staticmethod
     async def update_health_status(db: AsyncSession, user_id: int, status: str, reset_disease: bool = False) -> tuple[Optional[Health], Optional[Disease]]:
         """Обновить статус здоровья и при необходимости сбросить заболевание"""
@@ -218,9 +352,212 @@ class UserService:
         await db.refresh(db_health)
         if db_disease:
             await db.refresh(db_disease)
+        await health_report_snapshot.refresh_user(db, user_id)
         
         return db_health, db_disease
     
+    @staticmethod
+    def _dialect_insert(dialect_name: str):
+        """insert() с поддержкой ON CONFLICT для диалекта сессии"""
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert
+    
+    @staticmethod
+    def _health_upserts(dialect_name: str, user_id: int, status: str, disease: Optional[str]):
+        """
+        Upsert-выражения для health и disease с RETURNING
+        
+        Заболевание сбрасывается для любого статуса, кроме "болен"; для
+        "болен" без указанного заболевания сохраняется текущее значение.
+        """
+        dialect_insert = UserService._dialect_insert(dialect_name)
+        
+        health_stmt = dialect_insert(Health).values(user_id=user_id, status=status)
+        health_stmt = health_stmt.on_conflict_do_update(
+            index_elements=[Health.user_id],
+            set_={"status": health_stmt.excluded.status},
+        ).returning(Health.user_id, Health.status)
+        
+        keep_disease = status == "болен" and not disease
+        disease_stmt = dialect_insert(Disease).values(
+            user_id=user_id, disease=disease if status == "болен" and disease else ""
+        )
+        disease_stmt = disease_stmt.on_conflict_do_update(
+            index_elements=[Disease.user_id],
+            set_={
+                "disease": Disease.disease if keep_disease else disease_stmt.excluded.disease
+            },
+        ).returning(Disease.user_id, Disease.disease)
+        
+        return health_stmt, disease_stmt
+    
+    @staticmethod
+    def _user_health_columns():
+        """Поля ответа PUT /users/{id}/health и строки отчета о здоровье"""
+        return (
+            User.id,
+            User.user_id,
+            User.first_name,
+            User.last_name,
+            User.username,
+            User.created_at,
+            User.updated_at,
+            FIO.first_name.label("fio_first_name"),
+            FIO.last_name.label("fio_last_name"),
+            UserStatus.sector_id,
+            UserStatus.enable_report,
+        )
+    
+    @staticmethod
+    def _health_upsert_query(health_stmt, disease_stmt):
+        """PostgreSQL: оба upsert в CTE и выборка пользователя одним выражением"""
+        health_cte = health_stmt.cte("h")
+        disease_cte = disease_stmt.cte("d")
+        return (
+            select(
+                *UserService._user_health_columns(),
+                health_cte.c.status,
+                disease_cte.c.disease,
+            )
+            .select_from(User)
+            .join(health_cte, health_cte.c.user_id == User.user_id)
+            .join(disease_cte, disease_cte.c.user_id == User.user_id)
+            .outerjoin(FIO, FIO.user_id == User.user_id)
+            .outerjoin(UserStatus, UserStatus.user_id == User.user_id)
+        )
+    
+    @staticmethod
+    async def set_health_status(
+        db: AsyncSession, user_id: int, status: str, disease: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Записать статус здоровья и заболевание в одной транзакции
+        
+        В PostgreSQL это одно выражение: два upsert в CTE с RETURNING и
+        выборка пользователя по их результатам. В SQLite (DML в CTE не
+        поддерживается) - два upsert с RETURNING и выборка пользователя.
+        
+        Returns:
+            Данные пользователя со статусом и заболеванием или None,
+            если пользователь не найден
+        """
+        dialect_name = db.get_bind().dialect.name
+        health_stmt, disease_stmt = UserService._health_upserts(
+            dialect_name, user_id, status, disease
+        )
+        
+        try:
+            if dialect_name == "postgresql":
+                query = UserService._health_upsert_query(health_stmt, disease_stmt)
+                row = (await db.execute(query)).mappings().first()
+            else:
+                health_row = (await db.execute(health_stmt)).first()
+                disease_row = (await db.execute(disease_stmt)).first()
+                row = (
+                    await db.execute(
+                        select(*UserService._user_health_columns())
+                        .select_from(User)
+                        .outerjoin(FIO, FIO.user_id == User.user_id)
+                        .outerjoin(UserStatus, UserStatus.user_id == User.user_id)
+                        .where(User.user_id == user_id)
+                    )
+                ).mappings().first()
+                if row is not None:
+                    row = {**row, "status": health_row[1], "disease": disease_row[1]}
+            
+            if row is None:
+                await db.rollback()
+                return None
+            await db.commit()
+        except IntegrityError:
+            # Нет пользователя с таким user_id (внешний ключ)
+            await db.rollback()
+            return None
+        
+        row = dict(row)
+        in_report = row["enable_report"] and row["fio_first_name"] is not None
+        health_report_snapshot.set_user_row(
+            user_id,
+            (
+                row["sector_id"],
+                row["fio_first_name"],
+                row["fio_last_name"],
+                row["status"],
+                row["disease"],
+            )
+            if in_report
+            else None,
+        )
+        return row
+    
+    @staticmethod
+    async def bulk_set_health_status(
+        db: AsyncSession, updates: Dict[int, Tuple[str, Optional[str]]]
+    ) -> List[int]:
+        """
+        Записать статусы здоровья пачки пользователей в одной транзакции
+        
+        Args:
+            db: Сессия БД
+            updates: user_id -> (статус, заболевание); заболевание None
+                означает "оставить текущее" (допустимо только для "болен")
+        
+        Returns:
+            user_id, для которых статус записан; неизвестные пользователи
+            пропускаются
+        """
+        if not updates:
+            return []
+        
+        result = await db.execute(
+            select(User.user_id).where(User.user_id.in_(list(updates)))
+        )
+        user_ids = [row[0] for row in result.all()]
+        if not user_ids:
+            return []
+        
+        dialect_insert = UserService._dialect_insert(db.get_bind().dialect.name)
+        
+        health_stmt = dialect_insert(Health).values(
+            [{"user_id": user_id, "status": updates[user_id][0]} for user_id in user_ids]
+        )
+        await db.execute(
+            health_stmt.on_conflict_do_update(
+                index_elements=[Health.user_id],
+                set_={"status": health_stmt.excluded.status},
+            )
+        )
+        
+        explicit, keep = [], []
+        for user_id in user_ids:
+            disease = updates[user_id][1]
+            if disease is None:
+                keep.append({"user_id": user_id, "disease": ""})
+            else:
+                explicit.append({"user_id": user_id, "disease": disease})
+        
+        if explicit:
+            disease_stmt = dialect_insert(Disease).values(explicit)
+            await db.execute(
+                disease_stmt.on_conflict_do_update(
+                    index_elements=[Disease.user_id],
+                    set_={"disease": disease_stmt.excluded.disease},
+                )
+            )
+        if keep:
+            # Текущее заболевание не трогаем, только создаем недостающие строки
+            await db.execute(
+                dialect_insert(Disease)
+                .values(keep)
+                .on_conflict_do_nothing(index_elements=[Disease.user_id])
+            )
+        
+        await db.commit()
+        return user_ids
+    
     @staticmethod
     async def update_disease(db: AsyncSession, user_id: int, disease: str) -> Optional[Disease]:
         """Обновить заболевание (только для статуса "болен")"""
@@ -248,6 +585,7 @@ class UserService:
         
         await db.commit()
         await db.refresh(db_disease)
+        await health_report_snapshot.refresh_user(db, user_id)
         return db_disease
     
     @staticmethod
@@ -7,12 +7,12 @@ import asyncio
 import logging
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import Command
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram import types
 from bot.scheduler import ReportScheduler
 from aiogram.fsm.context import FSMContext
 
-from bot.config import TOKEN
+from bot.config import TOKEN, FSM_STORAGE, FSM_STATE_TTL, FSM_SQLITE_PATH
+from bot.utils.fsm_storage import SQLStorage, create_fsm_storage
 
 # Импорт обработчиков
 from bot.handlers.start import (
@@ -50,6 +50,9 @@ from bot.handlers.admin import (
     get_pagination_keyboard,
 )
 
+from bot.handlers.inline_search import inline_user_search
+from bot.services.user_directory import user_directory
+
 from bot.handlers.user_selection_handlers import (
     handle_user_pagination,
     handle_user_selection,
@@ -128,7 +131,9 @@ logger = logging.getLogger(__name__)
 async def setup_bot() -> tuple[Bot, Dispatcher]:
     """Настройка и конфигурация бота"""
     bot = Bot(token=TOKEN)
-    storage = MemoryStorage()
+    storage = create_fsm_storage(
+        FSM_STORAGE, ttl=FSM_STATE_TTL, sqlite_path=FSM_SQLITE_PATH
+    )
     dp = Dispatcher(storage=storage)
 
     # Создаем планировщик
@@ -136,6 +141,8 @@ async def setup_bot() -> tuple[Bot, Dispatcher]:
 
     # Планируем задачи
     scheduler.schedule_daily_report("07:30")  # Ежедневно в 7:30
+    if isinstance(storage, SQLStorage):
+        scheduler.schedule_fsm_cleanup(storage)
 
     # Запускаем планировщик
     scheduler.start()
@@ -145,6 +152,10 @@ async def setup_bot() -> tuple[Bot, Dispatcher]:
     # Команды
     dp.message.register(cmd_start, Command("start"))
     dp.message.register(cmd_help, Command("help"))
+    dp.message.register(cmd_user_info, Command("user_info"))
+
+    # Поиск сотрудников в inline-режиме
+    dp.inline_query.register(inline_user_search)
 
     # Основные действия
     dp.message.register(cmd_cancel, F.text == "❌ Отменить действие")
@@ -524,7 +535,10 @@ async def main():
 
     from app.api_client import api_client
 
-    print(f"🌐 API сервер: {api_client.base_url}")
+    if api_client.in_process:
+        print("🌐 API: приложение FastAPI в процессе бота")
+    else:
+        print(f"🌐 API сервер: {api_client.base_url}")
 
     # Проверяем доступность API
     if await api_client.check_health():
@@ -532,6 +546,10 @@ async def main():
     else:
         print("⚠️  API сервер недоступен. Проверьте запущен ли FastAPI сервер.")
 
+    # Справочник для inline-поиска; при ошибке загрузится при обновлении
+    await user_directory.load()
+    user_directory.start()
+
     # Настраиваем бота
     bot, dp = await setup_bot()
 
@@ -544,7 +562,9 @@ async def main():
     except KeyboardInterrupt:
         print("\n🛑 Остановка бота...")
     finally:
-        # Закрываем сессию API клиента
+        # Закрываем хранилище состояний и сессию API клиента
+        await user_directory.stop()
+        await dp.storage.close()
         await api_client.close()
         print("✅ Сессия API закрыта")
 
@@ -19,7 +19,28 @@ API_BASE_URL = os.getenv("API_BASE_URL", "http://api-prod:8000")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 ADMIN_USER_IDS = list(map(int, os.getenv("ADMIN_USER_IDS", "").split(","))) if os.getenv("ADMIN_USER_IDS") else []
 
+# Хранилище состояний FSM: memory, postgres или sqlite
+FSM_STORAGE = os.getenv("FSM_STORAGE", "memory")
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", "86400"))
+FSM_SQLITE_PATH = os.getenv("FSM_SQLITE_PATH", "bot_fsm.db")
+
+# Время жизни кэша прав администратора (сек)
+ADMIN_CACHE_TTL = int(os.getenv("ADMIN_CACHE_TTL", "60"))
+
 REPORT_TIME = os.getenv("REPORT_TIME", "07:30")
 REPORT_TIMEZONE = os.getenv("REPORT_TIMEZONE", "Europe/Moscow")
 REPORT_DAYS = list(map(int, os.getenv("REPORT_DAYS", "0,1,2,3,4").split(",")))
-REPORT_ENABLED = os.getenv("REPORT_ENABLED", "true").lower() == "true"
\ No newline at end of file
+REPORT_ENABLED = os.getenv("REPORT_ENABLED", "true").lower() == "true"
+
+# Параллельная рассылка отчетов
+REPORT_CONCURRENCY = int(os.getenv("REPORT_CONCURRENCY", "5"))
+REPORT_SEND_RETRIES = int(os.getenv("REPORT_SEND_RETRIES", "3"))
+
+# Лимиты Telegram на отправку сообщений
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_GROUP_RATE_PER_MINUTE = float(os.getenv("TELEGRAM_GROUP_RATE_PER_MINUTE", "20"))
+
+# Справочник пользователей для inline-поиска (сек)
+USER_DIRECTORY_REFRESH_INTERVAL = float(os.getenv("USER_DIRECTORY_REFRESH_INTERVAL", "60"))
+USER_DIRECTORY_FULL_RELOAD_INTERVAL = float(os.getenv("USER_DIRECTORY_FULL_RELOAD_INTERVAL", "3600"))
@@ -12,6 +12,7 @@ from aiogram.types import ReplyKeyboardRemove
 from bot.imports import (
     admin_only,
     is_user_admin,
+    toggle_user_admin,
     api_client,
     format_report,
     format_user_info,
@@ -51,19 +52,22 @@ async def show_all_users(message: types.Message, state: FSMContext):
         return
 
     users = result.get("users", [])
+    total = result.get("total", len(users))
 
     if not users:
         await message.answer("📭 Пользователи не найдены")
         return
 
     keyboard = get_user_selection_keyboard(users, page=0)
+    bot_user = await message.bot.me()
 
     await message.answer("🔽", reply_markup=ReplyKeyboardRemove())
     # await message.answer("‎", reply_markup=ReplyKeyboardRemove())
 
     await message.answer(
         f"📋 **Список пользователей**\n"
-        f"👥 Всего: {len(users)}\n\n"
+        f"👥 Всего: {total}\n\n"
+        f"💡 Быстрый поиск в любом чате: `@{bot_user.username} Фамилия`\n\n"
         f"Выберите пользователя:",
         reply_markup=keyboard,
         parse_mode="Markdown",
@@ -226,8 +230,6 @@ async def cmd_sector_report(message: types.Message):
 
 async def process_toggle_action(callback: types.CallbackQuery):
     """Обработка переключения настроек пользователя"""
-    import aiohttp
-
     action, user_id_str = callback.data.split(":")
     user_id = int(user_id_str)
 
@@ -249,39 +251,23 @@ async def process_toggle_action(callback: types.CallbackQuery):
         status_text = "включены" if new_status else "выключены"
 
         # Используем API для изменения статуса
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.put(
-                    f"{api_client.base_url}/admin/users/{user_id}/toggle-report"
-                ) as response:
-                    if response.status == 200:
-                        await callback.answer(
-                            f"✅ Отчеты для {current_name} {status_text}"
-                        )
-                    else:
-                        await callback.answer("❌ Ошибка при изменении настроек")
-        except Exception as e:
-            await callback.answer(f"❌ Ошибка: {str(e)}")
+        result = await api_client.toggle_user_report(user_id)
+        if "error" not in result:
+            await callback.answer(f"✅ Отчеты для {current_name} {status_text}")
+        else:
+            await callback.answer("❌ Ошибка при изменении настроек")
 
     elif action == "toggle_admin":
         current_status = status_info.get("enable_admin", False)
         new_status = not current_status
         status_text = "даны" if new_status else "забраны"
 
-        # Используем API для изменения статуса
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.put(
-                    f"{api_client.base_url}/admin/users/{user_id}/toggle-admin"
-                ) as response:
-                    if response.status == 200:
-                        await callback.answer(
-                            f"✅ Админ права для {current_name} {status_text}"
-                        )
-                    else:
-                        await callback.answer("❌ Ошибка при изменении прав")
-        except Exception as e:
-            await callback.answer(f"❌ Ошибка: {str(e)}")
+        # Через обертку: она сбрасывает кэш прав пользователя в боте
+        result = await toggle_user_admin(user_id)
+        if "error" not in result:
+            await callback.answer(f"✅ Админ права для {current_name} {status_text}")
+        else:
+            await callback.answer("❌ Ошибка при изменении прав")
 
 
 # ========== ВОЗВРАТ В ГЛАВНОЕ МЕНЮ ==========
@@ -0,0 +1,51 @@
+# bot/handlers/inline_search.py
+"""
+Поиск сотрудников в inline-режиме (@bot Иван...)
+
+Ответ собирается из справочника в памяти (bot/services/user_directory.py),
+ввод каждой буквы не обращается ни к API, ни к БД. Inline-режим должен
+быть включен у бота в @BotFather (/setinline).
+"""
+from aiogram import types
+
+from bot.services import is_user_admin
+from bot.services.user_directory import user_directory
+
+# Telegram принимает не больше 50 результатов за ответ
+INLINE_PAGE_SIZE = 50
+
+
+def _user_article(entry: dict) -> types.InlineQueryResultArticle:
+    details = [f"ID {entry['user_id']}"]
+    if entry.get("username"):
+        details.insert(0, f"@{entry['username']}")
+
+    return types.InlineQueryResultArticle(
+        id=str(entry["user_id"]),
+        title=entry["name"],
+        description=" · ".join(details),
+        # Выбранный результат отправляется боту командой карточки сотрудника
+        input_message_content=types.InputTextMessageContent(
+            message_text=f"/user_info {entry['user_id']}"
+        ),
+    )
+
+
+async def inline_user_search(inline_query: types.InlineQuery):
+    """Найти сотрудников по началу ФИО, имени или username"""
+    if not await is_user_admin(inline_query.from_user.id):
+        await inline_query.answer([], cache_time=60, is_personal=True)
+        return
+
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    users = user_directory.search(
+        inline_query.query, limit=INLINE_PAGE_SIZE, offset=offset
+    )
+    next_offset = str(offset + INLINE_PAGE_SIZE) if len(users) == INLINE_PAGE_SIZE else ""
+
+    await inline_query.answer(
+        [_user_article(entry) for entry in users],
+        cache_time=5,
+        is_personal=True,
+        next_offset=next_offset,
+    )
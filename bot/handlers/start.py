@@ -18,6 +18,14 @@ logger = logging.getLogger(__name__)
 
 async def cmd_start(message: types.Message, state: FSMContext):
     """Обработчик команды /start"""
+    # Пока API недоступен (размыкатель разомкнут), не ждем таймаутов
+    if not api_client.breaker.available:
+        await message.answer(
+            "⚠️ Сервис временно недоступен.\n"
+            f"Попробуйте через {api_client.breaker.retry_after():.0f} с."
+        )
+        return
+
     # Проверяем доступность API
     api_available = await api_client.check_health()
 
@@ -4,7 +4,7 @@
 """
 
 # Services
-from bot.services.admin_check import is_user_admin
+from bot.services.admin_check import is_user_admin, toggle_user_admin
 
 # Utils
 from bot.utils.formatters import format_report, format_user_info
@@ -46,6 +46,7 @@ from app.api_client import api_client
 
 __all__ = [
     "is_user_admin",
+    "toggle_user_admin",
     "format_report",
     "format_user_info",
     "admin_only",
@@ -2,10 +2,22 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from aiogram.exceptions import TelegramRetryAfter
 from datetime import datetime, timedelta
+import asyncio
+import time
 import pytz
 import logging
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Any
+
+from bot.config import (
+    REPORT_CONCURRENCY,
+    REPORT_SEND_RETRIES,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_GROUP_RATE_PER_MINUTE,
+)
+from bot.utils.rate_limiter import TelegramRateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -22,33 +34,70 @@ class ReportScheduler:
         """
         self.bot = bot
         self.scheduler = AsyncIOScheduler(timezone="Europe/Moscow")
+        self.rate_limiter = TelegramRateLimiter(
+            global_rate=TELEGRAM_GLOBAL_RATE,
+            chat_rate=TELEGRAM_CHAT_RATE,
+            group_rate_per_minute=TELEGRAM_GROUP_RATE_PER_MINUTE,
+        )
+        self.concurrency = REPORT_CONCURRENCY
+        self.last_run_summary: Optional[Dict[str, Any]] = None
         logger.info("🕐 Планировщик инициализирован")
 
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        """
+        Отправить сообщение с учетом лимитов Telegram
+
+        При RetryAfter ждет указанное Telegram время (приостанавливая все
+        отправки) и повторяет попытку до REPORT_SEND_RETRIES раз.
+        """
+        for attempt in range(REPORT_SEND_RETRIES + 1):
+            await self.rate_limiter.acquire(chat_id)
+            try:
+                return await self.bot.send_message(chat_id, text, **kwargs)
+            except TelegramRetryAfter as e:
+                if attempt == REPORT_SEND_RETRIES:
+                    raise
+                logger.warning(
+                    f"⏳ Лимит Telegram для чата {chat_id}, повтор через {e.retry_after} с"
+                )
+                self.rate_limiter.pause(e.retry_after)
+
     async def send_sector_report(
-        self, chat_id: int, sector_id: Optional[int] = None
+        self,
+        chat_id: int,
+        sector_id: Optional[int] = None,
+        report_data: Optional[Dict] = None,
+        duty_info: Optional[Dict] = None,
     ) -> bool:
         """
         Отправить отчет по сектору в указанный чат с информацией о дежурном
+
+        Если report_data передан (из ежедневной сводки), отчет и дежурный
+        не запрашиваются у API повторно.
         """
         try:
             from app.api_client import api_client
             from bot.utils.formatters import format_report, format_duty_info
 
+            prefetched = report_data is not None
+
             # Получаем отчет о здоровье
-            report_data = await api_client.get_report(
-                sector_id=sector_id, include_sector_name=True
-            )
+            if not prefetched:
+                report_data = await api_client.get_report(
+                    sector_id=sector_id, include_sector_name=True
+                )
 
             if "error" in report_data:
                 error_msg = f"❌ Ошибка при получении отчета: {report_data['error']}"
-                await self.bot.send_message(chat_id, error_msg)
+                await self.send_message(chat_id, error_msg)
                 logger.error(
                     f"Ошибка отчета для чата {chat_id}: {report_data['error']}"
                 )
                 return False
 
             # Получаем информацию о дежурном администраторе на сегодня
-            duty_info = await self.get_today_duty_info(sector_id)
+            if not prefetched:
+                duty_info = await self.get_today_duty_info(sector_id)
 
             # Форматируем отчет с информацией о дежурном
             formatted_report = format_report(report_data, duty_info)
@@ -60,9 +109,9 @@ class ReportScheduler:
                     for i in range(0, len(formatted_report), 4000)
                 ]
                 for part in parts:
-                    await self.bot.send_message(chat_id, part, parse_mode="Markdown")
+                    await self.send_message(chat_id, part, parse_mode="Markdown")
             else:
-                await self.bot.send_message(
+                await self.send_message(
                     chat_id, formatted_report, parse_mode="Markdown"
                 )
 
@@ -72,7 +121,7 @@ class ReportScheduler:
         except Exception as e:
             logger.error(f"❌ Ошибка отправки отчета в чат {chat_id}: {e}")
             try:
-                await self.bot.send_message(
+                await self.send_message(
                     chat_id, f"❌ Ошибка отправки отчета: {str(e)}"
                 )
             except:
@@ -102,82 +151,164 @@ class ReportScheduler:
                 )
                 return None
 
-            duties = today_data.get("duties", [])
+            return self.duty_info_from_duties(today_data.get("duties", []), sector_id)
 
-            if not duties:
-                return None
+        except Exception as e:
+            logger.error(f"Ошибка получения информации о дежурном: {e}")
+            return None
 
-            # Если указан конкретный сектор, берем первого
-            if sector_id:
-                for duty in duties:
-                    if duty.get("sector_id") == sector_id:
-                        return {
-                            "user_name": duty.get("user_name", "Неизвестно"),
-                            "sector_name": duty.get(
-                                "sector_name", f"Сектор {sector_id}"
-                            ),
-                        }
-                return None
+    @staticmethod
+    def duty_info_from_duties(
+        duties: List[Dict], sector_id: Optional[int] = None
+    ) -> Optional[Dict]:
+        """
+        Собрать информацию о дежурном из списка дежурств на день
 
-            # Если сектор не указан, возвращаем всех дежурных
-            return {
-                "multiple": True,
-                "duties": [
-                    {
-                        "user_name": d.get("user_name", "Неизвестно"),
-                        "sector_name": d.get(
-                            "sector_name", f"Сектор {d.get('sector_id')}"
-                        ),
-                    }
-                    for d in duties
-                ],
-            }
+        Args:
+            duties: Дежурства в формате /duty/schedule/today
+            sector_id: ID сектора (если None - для всех секторов)
 
-        except Exception as e:
-            logger.error(f"Ошибка получения информации о дежурном: {e}")
+        Returns:
+            Dict с информацией о дежурном или None
+        """
+        if not duties:
+            return None
+
+        # Если указан конкретный сектор, берем первого
+        if sector_id:
+            for duty in duties:
+                if duty.get("sector_id") == sector_id:
+                    return {
+                        "user_name": duty.get("user_name", "Неизвестно"),
+                        "sector_name": duty.get("sector_name", f"Сектор {sector_id}"),
+                    }
             return None
 
-    async def send_all_sectors_reports(self):
-        """Разослать отчеты по всем секторам с информацией о дежурных"""
+        # Если сектор не указан, возвращаем всех дежурных
+        return {
+            "multiple": True,
+            "duties": [
+                {
+                    "user_name": d.get("user_name", "Неизвестно"),
+                    "sector_name": d.get("sector_name", f"Сектор {d.get('sector_id')}"),
+                }
+                for d in duties
+            ],
+        }
+
+    async def send_all_sectors_reports(self) -> Optional[Dict[str, Any]]:
+        """
+        Разослать отчеты по всем секторам с информацией о дежурных
+
+        Отчеты и дежурные по всем секторам берутся одним запросом к
+        /reports/daily-digest. Сектора обрабатываются параллельно, но не
+        более self.concurrency одновременно. Итоги прогона (время, ошибки)
+        пишутся в лог и сохраняются в self.last_run_summary.
+        """
         logger.info("📨 Начинаю рассылку отчетов по всем секторам...")
 
         try:
             from app.api_client import api_client
 
-            # Получаем список всех секторов
-            sectors_data = await api_client.get_sectors()
+            if not api_client.breaker.available:
+                logger.warning(
+                    "⏸️ API недоступен, рассылка пропущена "
+                    f"({api_client.breaker.snapshot()})"
+                )
+                return None
 
-            if "error" in sectors_data:
-                logger.error(f"❌ Ошибка получения секторов: {sectors_data['error']}")
-                return
+            # Получаем сводку по всем секторам
+            digest = await api_client.get_daily_digest()
+
+            if "error" in digest:
+                logger.error(f"❌ Ошибка получения сводки: {digest['error']}")
+                return None
 
-            sectors = sectors_data.get("sectors", [])
+            sectors = digest.get("sectors", [])
             logger.info(f"📊 Найдено секторов для рассылки: {len(sectors)}")
 
-            # Для каждого сектора отправляем отчет
-            for sector in sectors:
+            started_at = datetime.now()
+            started = time.monotonic()
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def process(sector: Dict) -> Dict[str, Any]:
                 sector_id = sector.get("sector_id")
                 sector_name = sector.get("name", f"Сектор {sector_id}")
 
-                logger.info(f"📨 Обрабатываю сектор: {sector_name} (ID: {sector_id})")
+                async with semaphore:
+                    logger.info(
+                        f"📨 Обрабатываю сектор: {sector_name} (ID: {sector_id})"
+                    )
+                    sector_started = time.monotonic()
+                    error = None
+                    try:
+                        success = await self.send_sector_report(
+                            sector_id,
+                            sector_id,
+                            report_data=sector.get("report", {}),
+                            duty_info=self.duty_info_from_duties(
+                                sector.get("duties", []), sector_id
+                            ),
+                        )
+                    except Exception as e:
+                        success = False
+                        error = str(e)
+                        logger.error(f"  ❌ Ошибка отправки {sector_id}: {e}")
 
-                try:
-                    success = await self.send_sector_report(sector_id, sector_id)
                     if success:
                         logger.info(f"  ✅ Отправлено в сектор {sector_id}")
-                except Exception as e:
-                    logger.error(f"  ❌ Ошибка отправки {sector_id}: {e}")
 
-            logger.info("✅ Рассылка завершена")
+                    return {
+                        "sector_id": sector_id,
+                        "name": sector_name,
+                        "success": success,
+                        "error": error,
+                        "duration": round(time.monotonic() - sector_started, 3),
+                    }
+
+            results = await asyncio.gather(*(process(s) for s in sectors))
+
+            summary = {
+                "started_at": started_at.isoformat(),
+                "total": len(results),
+                "sent": sum(1 for r in results if r["success"]),
+                "failed": [r for r in results if not r["success"]],
+                "duration": round(time.monotonic() - started, 3),
+                "slowest": sorted(results, key=lambda r: r["duration"], reverse=True)[
+                    :3
+                ],
+            }
+            self.last_run_summary = summary
+
+            logger.info(
+                f"✅ Рассылка завершена: отправлено {summary['sent']}/{summary['total']}, "
+                f"ошибок {len(summary['failed'])}, время {summary['duration']} с"
+            )
+            flight = api_client.coalescing_stats()
+            logger.info(
+                f"🔗 GET-запросы к API: отправлено {flight['requests']}, "
+                f"объединено {flight['coalesced']}"
+            )
+            for failed in summary["failed"]:
+                logger.warning(
+                    f"  ⚠️ Сектор {failed['sector_id']} ({failed['name']}): "
+                    f"{failed['error'] or 'отчет не отправлен'}"
+                )
+
+            return summary
 
         except Exception as e:
             logger.error(f"❌ Критическая ошибка рассылки: {e}")
+            return None
 
-    async def get_sector_admins(self, sector_id: int) -> List[int]:
+    async def get_sector_admins(self, sector_id: Optional[int]) -> List[int]:
         """Получить список админов сектора
 
+        Фильтрация выполняется на стороне API, страницы забираются
+        по курсору next_cursor.
+
         Args:
-            sector_id: ID сектора
+            sector_id: ID сектора (None - админы всех секторов)
 
         Returns:
             List[int]: Список chat_id админов
@@ -185,86 +316,24 @@ class ReportScheduler:
         try:
             from app.api_client import api_client
 
-            # Получаем всех пользователей через API
-            users_data = await api_client.get_all_users(limit=1000)
-
-            logger.debug(f"Получены данные пользователей: {type(users_data)}")
-
-            # Проверяем, что данные получены и это словарь
-            if not users_data:
-                logger.warning("Данные пользователей не получены (пустой ответ)")
-                return []
+            admins = []
+            cursor = None
+            while True:
+                page = await api_client.get_admin_users_list(
+                    limit=500, after=cursor, enable_admin=True, sector_id=sector_id
+                )
 
-            # Проверяем формат ответа
-            if isinstance(users_data, dict):
-                # Если это словарь с ошибкой
-                if "error" in users_data:
+                if "error" in page:
                     logger.error(
-                        f"Ошибка API при получении пользователей: {users_data['error']}"
+                        f"Ошибка API при получении админов: {page['error']}"
                     )
-                    return []
-
-                # Если это словарь с пользователями в ключе "users"
-                if "users" in users_data:
-                    users = users_data["users"]
-                else:
-                    # Пытаемся найти список пользователей в других ключах
-                    users = []
-                    for key, value in users_data.items():
-                        if isinstance(value, list):
-                            users = value
-                            break
-            elif isinstance(users_data, list):
-                # Если это просто список
-                users = users_data
-            else:
-                logger.error(
-                    f"Неизвестный формат данных пользователей: {type(users_data)}"
-                )
-                return []
-
-            if not users:
-                logger.warning("Список пользователей пуст")
-                return []
+                    return admins
 
-            logger.debug(f"Обрабатываю {len(users)} пользователей")
+                admins.extend(user["user_id"] for user in page.get("users", []))
 
-            admins = []
-            for user in users:
-                try:
-                    # Проверяем структуру пользователя
-                    if not isinstance(user, dict):
-                        continue
-
-                    # Получаем ID пользователя
-                    user_id = user.get("user_id") or user.get("id")
-                    if not user_id:
-                        continue
-
-                    # Получаем информацию о статусе
-                    status_info = user.get("status_info", {})
-                    if not isinstance(status_info, dict):
-                        continue
-
-                    # Проверяем админские права
-                    is_admin = status_info.get("enable_admin", False)
-                    if not is_admin:
-                        continue
-
-                    # Проверяем сектор пользователя
-                    user_sector = status_info.get("sector_id")
-
-                    # Если sector_id передан, проверяем совпадение
-                    # Если sector_id не передан (None), берем всех админов
-                    if sector_id is None or user_sector == sector_id:
-                        admins.append(user_id)
-                        logger.debug(
-                            f"  Найден админ: {user_id} (сектор: {user_sector})"
-                        )
-
-                except Exception as e:
-                    logger.debug(f"Ошибка обработки пользователя {user}: {e}")
-                    continue
+                cursor = page.get("next_cursor")
+                if cursor is None:
+                    break
 
             logger.info(f"Найдено админов для сектора {sector_id}: {len(admins)}")
             return admins
@@ -298,6 +367,28 @@ class ReportScheduler:
         except Exception as e:
             logger.error(f"❌ Ошибка планирования: {e}")
 
+    def schedule_fsm_cleanup(self, storage, hours: int = 1):
+        """
+        Запланировать удаление устаревших состояний FSM
+
+        Args:
+            storage: Хранилище с методом cleanup()
+            hours: Интервал в часах
+        """
+        try:
+            self.scheduler.add_job(
+                storage.cleanup,
+                IntervalTrigger(hours=hours),
+                id="fsm_cleanup",
+                name="Очистка устаревших состояний FSM",
+                replace_existing=True,
+            )
+
+            logger.info(f"🧹 Очистка состояний FSM каждые {hours} ч")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка планирования очистки FSM: {e}")
+
     def schedule_test_report(self, seconds: int = 60):
         """
         Запланировать тестовую рассылку (для отладки)
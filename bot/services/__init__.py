@@ -1,6 +1,6 @@
 """
 Сервисы для бота
 """
-from .admin_check import is_user_admin
+from .admin_check import is_user_admin, invalidate_admin_cache, toggle_user_admin
 
-__all__ = ['is_user_admin']
\ No newline at end of file
+__all__ = ['is_user_admin', 'invalidate_admin_cache', 'toggle_user_admin']
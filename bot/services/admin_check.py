@@ -1,17 +1,48 @@
 """
 Проверка прав администратора
 """
+import time
+from typing import Dict, Optional, Tuple
+
 from app.api_client import api_client
+from bot.config import ADMIN_CACHE_TTL
+
+# user_id -> (время истечения, является ли админом)
+_admin_cache: Dict[int, Tuple[float, bool]] = {}
+
 
 async def is_user_admin(user_id: int) -> bool:
-    """Проверить, является ли пользователь администратором"""
-    user_info = await api_client.get_user(user_id)
-    
-    if "error" in user_info:
+    """
+    Проверить, является ли пользователь администратором
+
+    Ответ API кэшируется на ADMIN_CACHE_TTL секунд. Ошибки API не
+    кэшируются, чтобы временный сбой не лишал админа доступа надолго.
+    """
+    cached = _admin_cache.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    permissions = await api_client.get_user_permissions(user_id)
+
+    if "error" in permissions:
         return False
-    
-    # Проверяем поле enable_admin в status_info
-    status_info = user_info.get("status_info", {})
-    is_admin = status_info.get("enable_admin", False)
-    
-    return is_admin
\ No newline at end of file
+
+    is_admin = bool(permissions.get("is_admin", False))
+    _admin_cache[user_id] = (time.monotonic() + ADMIN_CACHE_TTL, is_admin)
+
+    return is_admin
+
+
+def invalidate_admin_cache(user_id: Optional[int] = None):
+    """Сбросить кэш прав пользователя (или всех пользователей)"""
+    if user_id is None:
+        _admin_cache.clear()
+    else:
+        _admin_cache.pop(user_id, None)
+
+
+async def toggle_user_admin(user_id: int) -> dict:
+    """Переключить права администратора и сбросить их кэш"""
+    result = await api_client.toggle_user_admin(user_id)
+    invalidate_admin_cache(user_id)
+    return result
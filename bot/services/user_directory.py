@@ -0,0 +1,228 @@
+"""
+Справочник пользователей в памяти для поиска в inline-режиме
+"""
+import asyncio
+import logging
+import time
+from bisect import bisect_left, insort
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.api_client import api_client
+from bot.config import (
+    USER_DIRECTORY_FULL_RELOAD_INTERVAL,
+    USER_DIRECTORY_REFRESH_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Запас при инкрементальном обновлении: updated_at ставится в начале
+# транзакции, запись с таким временем может стать видна позже курсора
+CURSOR_OVERLAP = timedelta(minutes=2)
+
+
+def fold(text: str) -> str:
+    """Свернуть регистр и ё -> е (как поиск /users/search/)"""
+    return text.casefold().replace("ё", "е")
+
+
+def display_name(entry: dict) -> str:
+    """Отображаемое имя: ФИО, затем данные users, затем заглушка"""
+    if entry.get("fio_last_name") and entry.get("fio_first_name"):
+        return f"{entry['fio_last_name']} {entry['fio_first_name']}"
+    if entry.get("last_name") and entry.get("first_name"):
+        return f"{entry['last_name']} {entry['first_name']}"
+    return f"Пользователь {entry['user_id']}"
+
+
+def entry_tokens(entry: dict) -> Set[str]:
+    """Слова, по началу которых находится пользователь"""
+    fields = (
+        "fio_last_name",
+        "fio_first_name",
+        "fio_patronymic_name",
+        "last_name",
+        "first_name",
+        "username",
+    )
+    return {
+        word.lstrip("@")
+        for field in fields
+        for word in fold(entry.get(field) or "").split()
+        if word.lstrip("@")
+    }
+
+
+class PrefixIndex:
+    """
+    Поиск идентификаторов по префиксу слова
+
+    Пары (слово, id) хранятся в отсортированном списке: все слова с
+    префиксом лежат подряд и находятся двоичным поиском.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, int]] = []
+        self._tokens: Dict[int, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def rebuild(self, items: Dict[int, Set[str]]):
+        """Построить индекс заново"""
+        self._tokens = {key: set(tokens) for key, tokens in items.items()}
+        self._keys = sorted(
+            (token, key) for key, tokens in self._tokens.items() for token in tokens
+        )
+
+    def remove(self, key: int):
+        for token in self._tokens.pop(key, ()):
+            position = bisect_left(self._keys, (token, key))
+            if position < len(self._keys) and self._keys[position] == (token, key):
+                del self._keys[position]
+
+    def update(self, key: int, tokens: Iterable[str]):
+        """Заменить слова записи"""
+        self.remove(key)
+        self._tokens[key] = set(tokens)
+        for token in self._tokens[key]:
+            insort(self._keys, (token, key))
+
+    def match(self, prefix: str) -> Set[int]:
+        """Записи, у которых есть слово, начинающееся с prefix"""
+        found = set()
+        position = bisect_left(self._keys, (prefix,))
+        while position < len(self._keys) and self._keys[position][0].startswith(prefix):
+            found.add(self._keys[position][1])
+            position += 1
+        return found
+
+
+class UserDirectory:
+    """
+    Справочник пользователей бота (ФИО, имя, username)
+
+    Загружается целиком из /users/directory/ и раз в refresh_interval
+    секунд дополняется изменениями (updated_since=курсор), раз в
+    full_reload_interval загружается заново - так учитываются удаленные
+    пользователи. Поиск по мере ввода выполняется только в памяти.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = 60,
+        full_reload_interval: float = 3600,
+        client=api_client,
+    ):
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self.client = client
+        self.entries: Dict[int, dict] = {}
+        self._index = PrefixIndex()
+        self._cursor: Optional[datetime] = None
+        self._loaded_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def _advance_cursor(self, cursor: Optional[str]):
+        if cursor:
+            cursor = datetime.fromisoformat(cursor)
+            if self._cursor is None or cursor > self._cursor:
+                self._cursor = cursor
+
+    async def load(self) -> bool:
+        """Загрузить справочник целиком"""
+        result = await self.client.get_users_directory()
+        if "error" in result:
+            logger.warning(f"Справочник пользователей не загружен: {result['error']}")
+            return False
+
+        self.entries = {}
+        for entry in result["users"]:
+            entry["name"] = display_name(entry)
+            self.entries[entry["user_id"]] = entry
+        self._index.rebuild(
+            {user_id: entry_tokens(entry) for user_id, entry in self.entries.items()}
+        )
+        self._cursor = None
+        self._advance_cursor(result.get("cursor"))
+        self._loaded_at = time.monotonic()
+        logger.info(f"Справочник пользователей загружен: {len(self.entries)}")
+        return True
+
+    async def refresh(self) -> bool:
+        """Применить изменения с последнего обновления"""
+        if (
+            not self.loaded
+            or self._cursor is None
+            or time.monotonic() - self._loaded_at >= self.full_reload_interval
+        ):
+            return await self.load()
+
+        result = await self.client.get_users_directory(
+            updated_since=(self._cursor - CURSOR_OVERLAP).isoformat()
+        )
+        if "error" in result:
+            logger.warning(f"Справочник пользователей не обновлен: {result['error']}")
+            return False
+
+        for entry in result["users"]:
+            entry["name"] = display_name(entry)
+            self.entries[entry["user_id"]] = entry
+            self._index.update(entry["user_id"], entry_tokens(entry))
+        self._advance_cursor(result.get("cursor"))
+        return True
+
+    def search(self, query: str, limit: int = 50, offset: int = 0) -> List[dict]:
+        """
+        Пользователи, у которых каждое слово запроса - начало одного из слов
+        ФИО, имени или username; по алфавиту отображаемого имени
+        """
+        words = [word.lstrip("@") for word in fold(query).split()]
+        words = [word for word in words if word]
+        if not words:
+            return []
+
+        found = self._index.match(words[0])
+        for word in words[1:]:
+            if not found:
+                break
+            found &= self._index.match(word)
+
+        users = sorted(
+            (self.entries[user_id] for user_id in found),
+            key=lambda entry: (fold(entry["name"]), entry["user_id"]),
+        )
+        return users[offset : offset + limit]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка обновления справочника пользователей: {e}")
+
+    def start(self):
+        """Запустить периодическое обновление"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить периодическое обновление"""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+# Глобальный экземпляр
+user_directory = UserDirectory(
+    refresh_interval=USER_DIRECTORY_REFRESH_INTERVAL,
+    full_reload_interval=USER_DIRECTORY_FULL_RELOAD_INTERVAL,
+)
@@ -0,0 +1,186 @@
+"""
+Хранилище состояний FSM в базе данных (PostgreSQL или SQLite)
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import (
+    Column,
+    Float,
+    MetaData,
+    String,
+    Table,
+    Text,
+    case,
+    delete,
+    null,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+fsm_states = Table(
+    "bot_fsm_states",
+    metadata,
+    Column("key", String(255), primary_key=True),
+    Column("state", String(255)),
+    Column("data", Text),
+    Column("expires_at", Float, nullable=False, index=True),
+)
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    """
+    Компактный JSON: без пробелов, кириллица без экранирования
+
+    Значения, которых нет в JSON (даты, Decimal, объекты), вызывают
+    TypeError: молча сохраненные строкой, они вернулись бы другого типа.
+    """
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+class SQLStorage(BaseStorage):
+    """
+    FSM-хранилище поверх SQLAlchemy (asyncpg или aiosqlite)
+
+    Состояние и данные хранятся в одной строке на ключ и переживают
+    перезапуск бота, поэтому несколько экземпляров бота могут работать
+    с общей базой. Записи, не обновлявшиеся дольше ttl секунд, считаются
+    устаревшими и удаляются при очистке.
+    """
+
+    def __init__(self, engine: AsyncEngine, ttl: int = 86400):
+        self.engine = engine
+        self.ttl = ttl
+        self._ready = False
+
+    @classmethod
+    def from_url(cls, url: str, ttl: int = 86400, **engine_kwargs) -> "SQLStorage":
+        return cls(create_async_engine(url, **engine_kwargs), ttl=ttl)
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return ":".join(
+            str(part) if part is not None else ""
+            for part in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id,
+                key.destiny,
+            )
+        )
+
+    def _insert(self):
+        if self.engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(fsm_states)
+
+    async def _ensure_table(self):
+        if self._ready:
+            return
+        async with self.engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+        self._ready = True
+
+    async def _upsert(self, key: StorageKey, **values):
+        """
+        Записать состояние или данные ключа и продлить срок жизни
+
+        Если строка уже истекла, но еще не удалена очисткой, второй
+        столбец обнуляется: запись начинается с пустого состояния.
+        """
+        await self._ensure_table()
+        now = time.time()
+        values["expires_at"] = now + self.ttl
+        stmt = self._insert().values(key=self._key(key), **values)
+
+        update = dict(values)
+        for column in ("state", "data"):
+            if column not in values:
+                update[column] = case(
+                    (fsm_states.c.expires_at <= now, null()),
+                    else_=fsm_states.c[column],
+                )
+        stmt = stmt.on_conflict_do_update(index_elements=["key"], set_=update)
+        async with self.engine.begin() as conn:
+            await conn.execute(stmt)
+
+    async def _get(self, key: StorageKey, column) -> Optional[str]:
+        await self._ensure_table()
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                select(column).where(
+                    fsm_states.c.key == self._key(key),
+                    fsm_states.c.expires_at > time.time(),
+                )
+            )
+            return result.scalar_one_or_none()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        if isinstance(state, State):
+            state = state.state
+        await self._upsert(key, state=state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._get(key, fsm_states.c.state)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._upsert(key, data=_dumps(data) if data else None)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        data = await self._get(key, fsm_states.c.data)
+        return json.loads(data) if data else {}
+
+    async def cleanup(self) -> int:
+        """Удалить устаревшие состояния, вернуть количество удаленных"""
+        await self._ensure_table()
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                delete(fsm_states).where(fsm_states.c.expires_at <= time.time())
+            )
+        return result.rowcount
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+
+def create_fsm_storage(
+    backend: str, ttl: int = 86400, sqlite_path: str = "bot_fsm.db"
+) -> BaseStorage:
+    """
+    Создать FSM-хранилище по настройке FSM_STORAGE
+
+    Args:
+        backend: "memory", "postgres" или "sqlite"
+        ttl: Время жизни неактивного состояния в секундах
+        sqlite_path: Путь к файлу для SQLite
+
+    Returns:
+        Экземпляр хранилища aiogram
+    """
+    backend = (backend or "memory").lower()
+
+    if backend == "postgres":
+        from app.core.config import settings
+
+        logger.info("💾 FSM-хранилище: PostgreSQL")
+        return SQLStorage.from_url(settings.DATABASE_URL, ttl=ttl, pool_size=5)
+
+    if backend == "sqlite":
+        logger.info(f"💾 FSM-хранилище: SQLite ({sqlite_path})")
+        return SQLStorage.from_url(f"sqlite+aiosqlite:///{sqlite_path}", ttl=ttl)
+
+    if backend != "memory":
+        logger.warning(f"Неизвестный FSM_STORAGE={backend}, используется память")
+    return MemoryStorage()
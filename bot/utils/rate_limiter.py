@@ -0,0 +1,77 @@
+"""
+Ограничение частоты отправки сообщений в Telegram
+"""
+import asyncio
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше capacity в запасе"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self):
+        """Дождаться и забрать один токен"""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class TelegramRateLimiter:
+    """
+    Общий и поштучный (на чат) лимиты отправки
+
+    Telegram допускает около 30 сообщений в секунду на бота, 1 сообщение
+    в секунду в личный чат и 20 сообщений в минуту в группу. После
+    RetryAfter отправка приостанавливается для всех чатов.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        group_rate_per_minute: float = 20,
+    ):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate_per_minute / 60
+        self._global = TokenBucket(global_rate, capacity=global_rate)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._paused_until = 0.0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Отрицательные chat_id - группы и каналы
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate)
+        return bucket
+
+    def pause(self, seconds: float):
+        """Приостановить все отправки (ответ RetryAfter от Telegram)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, chat_id: int):
+        """Дождаться разрешения на отправку сообщения в чат"""
+        await self._chat_bucket(chat_id).acquire()
+        await self._global.acquire()
+
+        delay = self._paused_until - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_until - time.monotonic()
@@ -1,9 +1,18 @@
 # main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.models.database import init_database, engine, Base
+from app.models.database import (
+    init_database,
+    engine,
+    raw_pool,
+    sql_logger,
+    query_counter,
+    Base,
+)
+from app.core.sql_logging import current_route
 from app.core.config import settings
+from app.services.health_buffer import health_write_buffer
 import uvicorn
 
 
@@ -22,14 +31,26 @@ async def lifespan(app: FastAPI):
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         print("✅ Таблицы созданы")
+
+        # Пул для сырых SQL-запросов живет столько же, сколько движок
+        await raw_pool.open()
     else:
         print("❌ Ошибка инициализации базы данных")
         print("💡 Проверьте что PostgreSQL запущен и доступен")
 
+    if settings.HEALTH_WRITE_BEHIND:
+        health_write_buffer.start()
+        print("✅ Отложенная запись статусов здоровья включена")
+
     yield
 
+    # Записываем накопленные статусы до закрытия соединений
+    await health_write_buffer.stop()
+
     # Закрываем соединения
+    await raw_pool.close()
     await engine.dispose()
+    sql_logger.stop()
 
 
 app = FastAPI(
@@ -48,13 +69,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def track_sql(request: Request, call_next):
+    """Маршрут запроса для журнала SQL, счетчик запросов к БД и признаки N+1"""
+    route = f"{request.method} {request.url.path}"
+    token = current_route.set(route)
+    try:
+        with query_counter.collect() as stats:
+            response = await call_next(request)
+    finally:
+        current_route.reset(token)
+
+    if settings.SQL_TIMING_HEADERS:
+        response.headers.update(query_counter.headers(stats))
+    query_counter.warn_repeated(stats, route)
+    return response
+
+
 # Подключение роутеров
-from app.api.routes import health_router, users_router, admin_router, duty_router
+from app.api.routes import (
+    health_router,
+    users_router,
+    admin_router,
+    duty_router,
+    reports_router,
+)
 
 app.include_router(health_router)
 app.include_router(users_router)
 app.include_router(admin_router)
 app.include_router(duty_router)
+app.include_router(reports_router)
 
 
 @app.get("/")
@@ -0,0 +1,36 @@
+# migrations/versions/007_duty_schedule_covering_indexes.py
+"""
+Покрывающие индексы для чтения расписания дежурств по диапазону дат
+
+Запросы расписания фильтруют duty_date диапазоном (>= начало, < конец)
+и читают только sector_id, duty_date и user_id, поэтому выполняются
+сканированием одного индекса без обращения к таблице:
+- (sector_id, duty_date) INCLUDE (user_id) - расписание сектора
+- (duty_date) INCLUDE (sector_id, user_id) - расписание всех секторов,
+  заменяет idx_duty_schedule_date
+"""
+
+migration = {
+    "id": "007_duty_schedule_covering_indexes",
+    "description": "Add covering indexes for duty_schedule date range reads",
+    "up": [
+        """
+        CREATE INDEX IF NOT EXISTS idx_duty_schedule_sector_date_cover
+        ON public.duty_schedule(sector_id, duty_date) INCLUDE (user_id);
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_duty_schedule_date_cover
+        ON public.duty_schedule(duty_date) INCLUDE (sector_id, user_id);
+        """,
+        "DROP INDEX IF EXISTS public.idx_duty_schedule_date;",
+        "ANALYZE public.duty_schedule;",
+    ],
+    "down": [
+        """
+        CREATE INDEX IF NOT EXISTS idx_duty_schedule_date
+        ON public.duty_schedule(duty_date);
+        """,
+        "DROP INDEX IF EXISTS public.idx_duty_schedule_date_cover;",
+        "DROP INDEX IF EXISTS public.idx_duty_schedule_sector_date_cover;",
+    ],
+}
@@ -0,0 +1,42 @@
+# migrations/versions/008_user_search_trigram.py
+"""
+Триграммные индексы для поиска пользователей (/users/search/)
+
+Поиск подстроки LIKE '%...%' по нормализованным строкам users и fio
+выполняется по GIN-индексам pg_trgm вместо последовательного просмотра.
+Выражения индексов совпадают с USER_SEARCH_EXPRESSION и
+FIO_SEARCH_EXPRESSION из app/services/user_search.py: регистр сворачивается
+lower(), ё заменяется на е. Индексы не объявлены в моделях: create_all
+не должен зависеть от расширения pg_trgm.
+"""
+
+migration = {
+    "id": "008_user_search_trigram",
+    "description": "Add pg_trgm GIN indexes for user search",
+    "up": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_search_trgm
+        ON public.users USING gin (
+            replace(lower(
+                coalesce(first_name, '') || ' ' || coalesce(last_name, '')
+                || ' ' || coalesce(username, '')
+            ), 'ё', 'е') gin_trgm_ops
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_fio_search_trgm
+        ON public.fio USING gin (
+            replace(lower(
+                coalesce(first_name, '') || ' ' || coalesce(last_name, '')
+            ), 'ё', 'е') gin_trgm_ops
+        );
+        """,
+        "ANALYZE public.users;",
+        "ANALYZE public.fio;",
+    ],
+    "down": [
+        "DROP INDEX IF EXISTS public.idx_fio_search_trgm;",
+        "DROP INDEX IF EXISTS public.idx_users_search_trgm;",
+    ],
+}
@@ -0,0 +1,23 @@
+# migrations/versions/009_users_updated_at_index.py
+"""
+Индекс users.updated_at для инкрементального обновления справочника
+
+Бот держит в памяти индекс пользователей для поиска в inline-режиме и
+периодически запрашивает /users/directory/?updated_since=..., то есть
+пользователей с updated_at >= курсора. Без индекса каждый такой запрос -
+последовательный просмотр users.
+"""
+
+migration = {
+    "id": "009_users_updated_at_index",
+    "description": "Add index on users.updated_at for directory change feed",
+    "up": [
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_updated_at
+        ON public.users(updated_at);
+        """,
+    ],
+    "down": [
+        "DROP INDEX IF EXISTS public.idx_users_updated_at;",
+    ],
+}
@@ -0,0 +1,135 @@
+import os
+
+import pytest
+import pytest_asyncio
+
+# Настройки должны быть заданы до первого импорта app.core.config
+os.environ.setdefault("POSTGRES_USER", "test_user")
+os.environ.setdefault("POSTGRES_PASSWORD", "test_pass")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_DB", "test_db")
+os.environ.setdefault("TELEGRAM_TOKEN", "test_token")
+os.environ.setdefault("SECRET_KEY", "test_key")
+
+
+@pytest_asyncio.fixture
+async def db_engine():
+    """Движок SQLite в памяти со всеми таблицами приложения"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import StaticPool
+    from app.models.database import Base
+    import app.models.user  # noqa: F401
+    import app.models.duty  # noqa: F401
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield engine
+
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db_session(db_engine):
+    """Сессия БД поверх тестового движка"""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    session_factory = async_sessionmaker(
+        db_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def statement_counter(db_engine):
+    """Счетчик SQL-выражений, выполненных через тестовый движок"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    yield statements
+    event.remove(db_engine.sync_engine, "before_cursor_execute", on_execute)
+
+
+@pytest.fixture
+def query_budget(db_engine):
+    """
+    Проверка бюджета SQL-запросов
+
+        with query_budget(3) as stats:
+            await HealthService.get_report(db_session, 1)
+    """
+    from contextlib import contextmanager
+    from app.core.query_stats import QueryCounter
+
+    counter = QueryCounter()
+    counter.install(db_engine)
+
+    @contextmanager
+    def budget(max_queries: int):
+        with counter.collect() as stats:
+            yield stats
+        assert stats.count <= max_queries, (
+            f"{stats.count} SQL-запросов при бюджете {max_queries}: "
+            f"{stats.shapes.most_common(3)}"
+        )
+
+    yield budget
+    counter.remove(db_engine)
+
+
+@pytest_asyncio.fixture
+async def api_client(db_engine):
+    """HTTP-клиент приложения поверх тестовой БД (без lifespan)"""
+    import httpx
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    from app.models.database import get_db, get_session_factory, query_counter
+    from main import app
+
+    session_factory = async_sessionmaker(
+        db_engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    query_counter.install(db_engine)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    query_counter.remove(db_engine)
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_session_factory, None)
+
+
+@pytest.fixture(autouse=True)
+def clear_name_cache():
+    """Кэш имен живет на уровне процесса - между тестами его сбрасываем"""
+    from app.services.name_resolver import user_name_resolver
+
+    user_name_resolver.clear()
+    yield
+    user_name_resolver.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_health_snapshot():
+    """Снимок отчета о здоровье тоже общий для процесса"""
+    from app.services.health_snapshot import health_report_snapshot
+
+    health_report_snapshot.invalidate()
+    yield
+    health_report_snapshot.invalidate()
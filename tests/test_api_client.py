@@ -0,0 +1,289 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_response_cache_ttl_stale_and_invalidation(monkeypatch):
+    """Свежий ответ из кэша, устаревший - сразу и с фоновым обновлением"""
+    from app import api_client as module
+    from app.api_client import APIClient
+
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+
+    client = APIClient()
+    client.cache.stale_ttl = 100
+    monkeypatch.setitem(client.CACHE_TTLS, "get_sectors", 10)
+    fetch = AsyncMock(return_value={"sectors": [{"id": 1}]})
+
+    with patch.object(client, "_fetch_sectors", fetch):
+        first = await client.get_sectors()
+        first["sectors"].append({"id": 2})  # копия, кэш не меняется
+        assert await client.get_sectors() == {"sectors": [{"id": 1}]}
+        assert fetch.await_count == 1
+
+        # Устаревший ответ отдается сразу, новый запрашивается в фоне
+        now[0] += 15
+        fetch.return_value = {"sectors": [{"id": 1}, {"id": 3}]}
+        assert await client.get_sectors() == {"sectors": [{"id": 1}]}
+        await asyncio.sleep(0)
+        assert fetch.await_count == 2
+        assert await client.get_sectors() == {"sectors": [{"id": 1}, {"id": 3}]}
+
+        # Ошибки не кэшируются
+        client.invalidate("get_sectors")
+        fetch.return_value = {"error": "API error 500"}
+        assert "error" in await client.get_sectors()
+        fetch.return_value = {"sectors": []}
+        assert await client.get_sectors() == {"sectors": []}
+        assert fetch.await_count == 4
+
+        # После stale_ttl ответ запрашивается заново
+        now[0] += 200
+        assert await client.get_sectors() == {"sectors": []}
+        assert fetch.await_count == 5
+
+    assert client.cache.stats()["stale_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_mutation_invalidates_cached_summary(monkeypatch):
+    """Изменение пула сбрасывает сводку и список кандидатов, начатое раньше обновление не сохраняется"""
+    from app.api_client import APIClient
+
+    client = APIClient()
+    monkeypatch.setitem(client.CACHE_TTLS, "get_sector_statistics_summary", 30)
+    monkeypatch.setitem(client.CACHE_TTLS, "get_eligible_users", 60)
+    summary = AsyncMock(return_value=[{"user_id": 1, "in_pool": False}])
+    eligible = AsyncMock(return_value={"users": [{"user_id": 1, "in_pool": False}]})
+
+    response = MagicMock(status=200)
+    response.json = AsyncMock(return_value={"pool_id": 1})
+    request = MagicMock()
+    request.__aenter__ = AsyncMock(return_value=response)
+    request.__aexit__ = AsyncMock(return_value=False)
+    session = MagicMock(request=MagicMock(return_value=request))
+
+    with patch.object(client, "_fetch_sector_statistics_summary", summary), \
+            patch.object(client, "_fetch_eligible_users", eligible), \
+            patch.object(client, "get_session", AsyncMock(return_value=session)):
+        await client.get_eligible_users(1)
+        await client.get_sector_statistics_summary(1, 2025)
+        await client.get_sector_statistics_summary(1, 2025)
+        await client.get_sector_statistics_summary(2, 2025)
+        assert summary.await_count == 2
+
+        await client.add_to_duty_pool(1, 1)
+        summary.return_value = [{"user_id": 1, "in_pool": True}]
+        assert await client.get_sector_statistics_summary(1, 2025) == summary.return_value
+        assert summary.await_count == 3
+
+        eligible.return_value = {"users": [{"user_id": 1, "in_pool": True}]}
+        assert await client.get_eligible_users(1) == eligible.return_value
+        assert eligible.await_count == 2
+
+        # Создание пользователя не меняет список секторов
+        client.cache._store(("get_sectors", ()), 0, {"sectors": []}, 300)
+        await client.create_user({"user_id": 2}, chat_id=2)
+        assert client.cache.stats()["entries"] == 3
+
+    # Результат запроса, начатого до сброса, в кэш не попадает
+    key = ("get_sector_statistics_summary", (1, 2025))
+    generation = client.cache._generations["get_sector_statistics_summary"]
+    client.invalidate()
+    client.cache._store(key, generation, [{"user_id": 1}], 30)
+    assert client.cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_identical_gets_share_one_request():
+    """Одинаковые одновременные GET объединяются в один запрос"""
+    from app.api_client import APIClient
+
+    client = APIClient()
+    release = asyncio.Event()
+    calls = []
+
+    async def request(method, url, params=None, json=None, not_found=None, idempotent=False):
+        calls.append((url, params))
+        await release.wait()
+        return {"url": url, "params": params}
+
+    with patch.object(client, "_request", request):
+        same = [
+            asyncio.create_task(client.get_report(sector_id=7)) for _ in range(5)
+        ]
+        other = asyncio.create_task(client.get_report(sector_id=8))
+        await asyncio.sleep(0)
+
+        # Отмена одного из ожидающих не отменяет общий запрос
+        same[0].cancel()
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*same[1:], other)
+
+    assert len(calls) == 2
+    assert client.coalescing_stats() == {"requests": 2, "coalesced": 4, "in_flight": 0}
+    assert results[0] == results[1] and results[0] is not results[1]
+    assert results[-1]["params"]["sector_id"] == 8
+    assert same[0].cancelled()
+
+    # Завершенный запрос не переиспользуется
+    with patch.object(client, "_request", AsyncMock(return_value={"ok": 1})):
+        assert await client.get_report(sector_id=7) == {"ok": 1}
+    assert client.coalescing_stats()["requests"] == 3
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    async def json(self):
+        return self.body
+
+    async def text(self):
+        return str(self.body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Сессия aiohttp, отвечающая заданной последовательностью исходов"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(*outcome)
+
+
+def make_client(monkeypatch, outcomes, threshold=5):
+    import aiohttp
+    from app import api_client as module
+    from app.api_client import APIClient
+
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(module.asyncio, "sleep", sleep)
+    client = APIClient()
+    client.retry_attempts = 3
+    client.retry_base_delay = 0.2
+    client.breaker.failure_threshold = threshold
+    session = FakeSession(outcomes)
+    monkeypatch.setattr(client, "get_session", AsyncMock(return_value=session))
+    return client, session, sleeps, aiohttp
+
+
+@pytest.mark.asyncio
+async def test_get_retried_with_jitter_post_not_retried(monkeypatch):
+    """GET повторяется при сбоях с задержкой, POST - нет"""
+    import aiohttp
+
+    client, session, sleeps, _ = make_client(
+        monkeypatch,
+        [aiohttp.ClientConnectionError("refused"), (503, "restarting"), (200, {"ok": 1})],
+    )
+    assert await client.get_report(sector_id=1) == {"ok": 1}
+    assert len(session.calls) == 3
+    assert len(sleeps) == 2 and 0 <= sleeps[0] <= 0.2 and 0 <= sleeps[1] <= 0.4
+    assert client.breaker.failures == 0
+
+    session.outcomes = [asyncio.TimeoutError(), (200, {"ok": 2})]
+    result = await client.register_user({"user_id": 1})
+    assert "Connection error" in result["error"]
+    assert len(session.calls) == 4
+
+    # Медленные эндпоинты получают увеличенный таймаут чтения
+    session.outcomes = [(200, {"ok": 3})]
+    await client._request("post", "/duty/plan-year", json={})
+    assert session.calls[-1][2]["timeout"] is client.slow_timeout
+    assert session.calls[0][2]["timeout"] is client.timeout
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens_and_probes(monkeypatch):
+    """После порога сбоев запросы не отправляются, затем один пробный"""
+    import aiohttp
+    from app import api_client as module
+
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    client, session, _, _ = make_client(
+        monkeypatch, [aiohttp.ClientConnectionError()] * 3, threshold=3
+    )
+    client.breaker.reset_timeout = 15
+
+    assert "Connection error" in (await client.get_report(sector_id=1))["error"]
+    assert client.breaker.state == "open" and not client.breaker.available
+
+    result = await client.get_report(sector_id=1)
+    assert result["unavailable"] is True
+    assert await client.check_health() is False
+    assert len(session.calls) == 3
+
+    # Неудачная проба снова размыкает цепь
+    now[0] += 16
+    assert client.breaker.state == "half_open" and client.breaker.available
+    session.outcomes = [(502, "bad gateway")]
+    await client.register_user({"user_id": 1})
+    assert client.breaker.state == "open"
+
+    # Удачная проба замыкает цепь; одновременно пропускается одна
+    now[0] += 16
+    assert client.breaker.allow_request() is True
+    assert client.breaker.allow_request() is False
+    client.breaker.release()
+    session.outcomes = [(200, {"status": "ok"})]
+    assert await client.check_health() is True
+    assert client.breaker.snapshot() == {"state": "closed", "failures": 0, "retry_after": 0.0}
+
+
+@pytest.mark.asyncio
+async def test_asgi_transport_calls_app_in_process(db_engine):
+    """В режиме asgi запросы выполняет приложение FastAPI без сети"""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    from app.api_client import APIClient, ASGISession
+    from app.models.database import get_db
+    from main import app
+
+    session_factory = async_sessionmaker(
+        db_engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = APIClient()
+    client.transport = "asgi"
+    client.session = ASGISession(app, lifespan=False)
+    try:
+        assert client.in_process
+        assert await client.check_health() is True
+
+        registered = await client.register_user(
+            {"user_id": 501, "chat_id": 501, "first_name": "Иван", "last_name": "Петров"}
+        )
+        assert registered["status"] == "success"
+        assert (await client.get_user(501))["first_name"] == "Иван"
+        assert await client.get_user(502) == {"error": "User not found in the system"}
+    finally:
+        await client.close()
+        app.dependency_overrides.pop(get_db, None)
+    assert client.session.closed
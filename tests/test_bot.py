@@ -1,4 +1,5 @@
 import pytest
+from datetime import date
 from unittest.mock import AsyncMock, MagicMock, patch
 import os
 from pathlib import Path
@@ -55,3 +56,170 @@ async def test_cmd_cancel():
 
         # Проверяем, что answer был вызван
         message.answer.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_admin_check_cached_until_toggle():
+    """Права админа запрашиваются у API один раз до переключения"""
+    from bot.services import admin_check
+
+    admin_check.invalidate_admin_cache()
+    permissions = AsyncMock(return_value={"user_id": 1, "is_admin": True})
+
+    with patch.object(admin_check.api_client, "get_user_permissions", permissions), \
+            patch.object(admin_check.api_client, "toggle_user_admin",
+                         AsyncMock(return_value={"message": "ok"})):
+        assert await admin_check.is_user_admin(1)
+        assert await admin_check.is_user_admin(1)
+        assert permissions.await_count == 1
+
+        await admin_check.toggle_user_admin(1)
+        permissions.return_value = {"user_id": 1, "is_admin": False}
+        assert not await admin_check.is_user_admin(1)
+        assert permissions.await_count == 2
+
+    admin_check.invalidate_admin_cache()
+
+
+@pytest.mark.asyncio
+async def test_toggle_admin_callback_resets_admin_cache():
+    """Кнопка переключения прав сразу меняет результат is_user_admin"""
+    from bot.handlers.admin import process_toggle_action
+    from bot.services import admin_check
+
+    admin_check.invalidate_admin_cache()
+    client = admin_check.api_client
+    permissions = AsyncMock(return_value={"user_id": 7, "is_admin": False})
+    user = {"first_name": "Иван", "last_name": "Петров", "status_info": {}}
+
+    callback = AsyncMock()
+    callback.data = "toggle_admin:7"
+
+    with patch.object(client, "get_user_permissions", permissions), \
+            patch.object(client, "get_user", AsyncMock(return_value=user)), \
+            patch.object(client, "toggle_user_admin",
+                         AsyncMock(return_value={"message": "ok"})):
+        assert not await admin_check.is_user_admin(7)
+
+        await process_toggle_action(callback)
+        permissions.return_value = {"user_id": 7, "is_admin": True}
+        assert await admin_check.is_user_admin(7)
+
+    callback.answer.assert_awaited_once_with("✅ Админ права для Иван Петров даны")
+    admin_check.invalidate_admin_cache()
+
+
+@pytest.mark.asyncio
+async def test_sql_fsm_storage_roundtrip_and_ttl():
+    """Состояние и данные FSM сохраняются в БД и истекают по TTL"""
+    from aiogram.fsm.storage.base import StorageKey
+    from sqlalchemy.pool import StaticPool
+    from bot.states import AdminStates
+    from bot.utils.fsm_storage import SQLStorage
+
+    storage = SQLStorage.from_url(
+        "sqlite+aiosqlite://",
+        ttl=60,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+    await storage.set_state(key, AdminStates.waiting_admin_command)
+    await storage.update_data(key, {"users": [{"user_id": 1, "name": "Иван"}]})
+
+    assert await storage.get_state(key) == AdminStates.waiting_admin_command.state
+    assert await storage.get_data(key) == {"users": [{"user_id": 1, "name": "Иван"}]}
+
+    storage.ttl = -1
+    await storage.set_data(key, {"page": 2})
+    assert await storage.get_data(key) == {}
+    assert await storage.get_state(key) is None
+    assert await storage.cleanup() == 1
+
+    # Значения вне JSON не сохраняются строкой, а вызывают ошибку
+    with pytest.raises(TypeError):
+        await storage.set_data(key, {"day": date(2025, 1, 1)})
+
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_sql_fsm_storage_write_after_expiry_starts_empty(monkeypatch):
+    """Запись в истекшую, но не удаленную строку не возвращает старые значения"""
+    from aiogram.fsm.storage.base import StorageKey
+    from sqlalchemy.pool import StaticPool
+    from bot.states import AdminStates
+    from bot.utils import fsm_storage
+
+    now = [1000.0]
+    monkeypatch.setattr(fsm_storage.time, "time", lambda: now[0])
+    storage = fsm_storage.SQLStorage.from_url(
+        "sqlite+aiosqlite://",
+        ttl=60,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+    await storage.set_state(key, AdminStates.waiting_admin_command)
+    await storage.set_data(key, {"users": [1, 2, 3]})
+
+    now[0] += 61
+    await storage.set_state(key, AdminStates.waiting_admin_command)
+    assert await storage.get_data(key) == {}
+
+    await storage.set_data(key, {"page": 1})
+    assert await storage.get_state(key) == AdminStates.waiting_admin_command.state
+
+    now[0] += 61
+    await storage.set_data(key, {"page": 2})
+    assert await storage.get_state(key) is None
+    assert await storage.get_data(key) == {"page": 2}
+
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_user_directory_prefix_search_and_change_feed():
+    """Поиск по началу слов в памяти, изменения применяются по курсору"""
+    from bot.services.user_directory import UserDirectory
+
+    client = MagicMock()
+    client.get_users_directory = AsyncMock(
+        return_value={
+            "users": [
+                {"user_id": 1, "first_name": "Petr", "last_name": "Smirnov",
+                 "username": "petya", "fio_first_name": "Пётр",
+                 "fio_last_name": "Семёнов", "fio_patronymic_name": None},
+                {"user_id": 2, "first_name": "Иван", "last_name": "Петров",
+                 "username": None, "fio_first_name": None, "fio_last_name": None,
+                 "fio_patronymic_name": None},
+            ],
+            "cursor": "2025-03-01T10:00:00",
+        }
+    )
+    directory = UserDirectory(client=client)
+    assert await directory.load()
+
+    assert [u["user_id"] for u in directory.search("пет")] == [2, 1]
+    assert [u["user_id"] for u in directory.search("СЕМЕН П")] == [1]
+    assert [u["user_id"] for u in directory.search("@pet")] == [1]
+    assert directory.search("ров") == []
+    assert directory.search("  ") == []
+    assert directory.search("пет", limit=1, offset=1)[0]["name"] == "Семёнов Пётр"
+
+    client.get_users_directory.return_value = {
+        "users": [
+            {"user_id": 2, "first_name": "Иван", "last_name": "Сидоров",
+             "username": None, "fio_first_name": None, "fio_last_name": None,
+             "fio_patronymic_name": None},
+        ],
+        "cursor": "2025-03-02T09:00:00",
+    }
+    assert await directory.refresh()
+    client.get_users_directory.assert_awaited_with(updated_since="2025-03-01T09:58:00")
+
+    assert [u["user_id"] for u in directory.search("пет")] == [1]
+    assert directory.search("сид")[0]["name"] == "Сидоров Иван"
+    assert len(directory.entries) == 2
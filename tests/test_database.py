@@ -0,0 +1,59 @@
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_before_open():
+    """Статистика доступна до открытия пула, закрытие неоткрытого пула безопасно"""
+    from app.services.db import DatabaseService
+    from app.models.database import raw_pool
+
+    stats = DatabaseService.get_pool_stats()
+
+    assert stats["raw"]["open"] is False
+    assert stats["raw"]["queries"] == 0
+    assert stats["raw"]["max_size"] == raw_pool.max_size
+    assert stats["orm"]["checked_out"] == 0
+
+    await raw_pool.close()
+    assert raw_pool.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_and_sampled_queries_logged(db_engine):
+    """Медленные запросы пишутся с маршрутом, остальные - по выборке"""
+    import logging
+    from logging.handlers import BufferingHandler
+    from sqlalchemy import text
+    from app.core.sql_logging import SQLQueryLogger, current_route
+
+    handler = BufferingHandler(capacity=100)
+    sql_logger = SQLQueryLogger(
+        slow_ms=0.001, logger_name="test.sql.slow", handlers=[handler]
+    )
+    sql_logger.install(db_engine)
+    token = current_route.set("GET /health/report")
+    try:
+        async with db_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    finally:
+        current_route.reset(token)
+        sql_logger.stop()
+
+    assert len(handler.buffer) == 1
+    record = handler.buffer[0]
+    assert record.levelno == logging.WARNING
+    assert "[GET /health/report]: SELECT 1" in record.getMessage()
+
+    handler = BufferingHandler(capacity=100)
+    sql_logger = SQLQueryLogger(
+        slow_ms=0, sample_rate=1.0, logger_name="test.sql.sample", handlers=[handler]
+    )
+    sql_logger.install(db_engine)
+    async with db_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    sql_logger.stop()
+
+    assert [r.levelno for r in handler.buffer] == [logging.INFO]
+    assert "[-]" in handler.buffer[0].getMessage()
+
+    assert not SQLQueryLogger(slow_ms=0).enabled
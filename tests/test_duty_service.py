@@ -0,0 +1,328 @@
+import pytest
+from datetime import date, timedelta
+
+
+async def _seed_sector(db, sector_id: int, users_count: int, year: int):
+    """Создать сектор и пользователей, часть из которых в пуле и со статистикой"""
+    from app.models.user import User, FIO, Sector
+    from app.models.duty import DutyAdminPool, DutyStatistics
+
+    db.add(Sector(sector_id=sector_id, name=f"Сектор {sector_id}"))
+    for i in range(1, users_count + 1):
+        user_id = sector_id * 1000 + i
+        db.add(
+            User(
+                user_id=user_id,
+                first_name=f"Имя{i}",
+                last_name=f"Фамилия{i}",
+                is_duty_eligible=True,
+            )
+        )
+        if i % 2:
+            db.add(FIO(user_id=user_id, first_name=f"Иван{i}", last_name=f"Иванов{i}"))
+        if i % 3 == 0:
+            db.add(
+                DutyAdminPool(
+                    pool_id=user_id, user_id=user_id, sector_id=sector_id, is_active=True
+                )
+            )
+            db.add(
+                DutyStatistics(
+                    stat_id=user_id,
+                    user_id=user_id,
+                    sector_id=sector_id,
+                    year=year,
+                    total_duties=i,
+                    last_duty_date=date(year, 1, 1) + timedelta(days=i),
+                )
+            )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_sector_statistics_summary_shape(db_session):
+    """Сводка по сектору содержит пул, статистику и имена"""
+    from app.services.duty_service import DutyService
+
+    await _seed_sector(db_session, 1, 6, 2025)
+
+    summary = await DutyService.get_sector_statistics_summary(db_session, 1, 2025)
+
+    assert len(summary) == 6
+    assert set(summary[0]) == {
+        "user_id",
+        "user_name",
+        "total_duties",
+        "last_duty_date",
+        "in_pool",
+    }
+    # Сначала участники пула, по убыванию количества дежурств
+    assert [s["user_id"] for s in summary[:2]] == [1006, 1003]
+    assert summary[0]["total_duties"] == 6
+    assert summary[0]["last_duty_date"] == date(2025, 1, 7)
+    assert summary[1]["user_name"] == "Иванов3 Иван3"
+    assert summary[0]["user_name"] == "Фамилия6 Имя6"
+    assert not any(s["in_pool"] for s in summary[2:])
+    assert all(s["total_duties"] == 0 for s in summary[2:])
+
+
+@pytest.mark.asyncio
+async def test_sector_statistics_summary_constant_queries(
+    db_session, statement_counter
+):
+    """Количество SQL-запросов не зависит от числа пользователей"""
+    from app.services.duty_service import DutyService
+
+    await _seed_sector(db_session, 1, 3, 2025)
+    await _seed_sector(db_session, 2, 60, 2025)
+
+    statement_counter.clear()
+    small = await DutyService.get_sector_statistics_summary(db_session, 1, 2025)
+    small_count = len(statement_counter)
+
+    statement_counter.clear()
+    large = await DutyService.get_sector_statistics_summary(db_session, 2, 2025)
+    large_count = len(statement_counter)
+
+    assert len(small) == len(large) == 63
+    assert small_count == large_count == 1
+
+
+@pytest.mark.asyncio
+async def test_assignment_queries_do_not_depend_on_pool_size(
+    db_session, statement_counter
+):
+    """Назначение дежурного стоит одинаковое число запросов для любого пула"""
+    from app.services.duty_service import DutyService
+
+    await _seed_sector(db_session, 1, 3, 2025)
+    await _seed_sector(db_session, 2, 60, 2025)
+
+    counts = {}
+    for sector_id in (1, 2):
+        statement_counter.clear()
+        result = await DutyService.assign_duty_for_period(
+            db_session, sector_id, date(2025, 3, 3), date(2025, 3, 9), 7
+        )
+        assert result["success"]
+        counts[("period", sector_id)] = len(statement_counter)
+
+        statement_counter.clear()
+        result = await DutyService.assign_weekly_duty_auto(
+            db_session, sector_id, date(2025, 3, 10)
+        )
+        assert result["success"]
+        counts[("weekly", sector_id)] = len(statement_counter)
+
+    assert counts[("period", 1)] == counts[("period", 2)]
+    assert counts[("weekly", 1)] == counts[("weekly", 2)]
+
+
+@pytest.mark.asyncio
+async def test_period_assignment_prefers_least_loaded(db_session):
+    """На период назначается дежурный с наименьшей нагрузкой"""
+    from app.services.duty_service import DutyService
+
+    await _seed_sector(db_session, 1, 6, 2025)
+
+    result = await DutyService.assign_duty_for_period(
+        db_session, 1, date(2025, 3, 3), date(2025, 3, 9), 7
+    )
+
+    assert result["assigned_user_id"] == 1003
+    assert result["assigned_user_name"] == "Иванов3 Иван3"
+    assert len(result["dates"]) == 7
+
+
+@pytest.mark.asyncio
+async def test_yearly_schedule_bulk_write(db_session, statement_counter):
+    """Годовое расписание пишется пакетно, статистика накапливается upsert-ом"""
+    from sqlalchemy import select, func
+    from app.models.duty import DutySchedule, DutyStatistics
+    from app.services.duty_service import DutyService
+
+    await _seed_sector(db_session, 1, 6, 2025)
+    await _seed_sector(db_session, 2, 60, 2025)
+
+    results = {}
+    counts = []
+    for sector_id in (1, 2):
+        statement_counter.clear()
+        results[sector_id] = await DutyService.assign_yearly_schedule(
+            db_session, sector_id, 2025
+        )
+        assert results[sector_id]["success"]
+        counts.append(len(statement_counter))
+
+    assert counts[0] == counts[1]
+
+    days = await db_session.scalar(
+        select(func.count()).where(DutySchedule.sector_id == 1)
+    )
+    assert days == 261
+    assert sum(results[1]["stats"].values()) == 261
+
+    # Дежурства прибавляются к уже накопленной статистике
+    stats = await db_session.scalar(
+        select(DutyStatistics).where(
+            DutyStatistics.user_id == 1003, DutyStatistics.year == 2025
+        )
+    )
+    assert stats.total_duties == 3 + results[1]["stats"][1003]
+    assert stats.last_duty_date == date(2025, 12, 31)
+
+
+@pytest.mark.asyncio
+async def test_plan_all_sectors(db_engine, db_session):
+    """Планирование года выполняется для каждого сектора отдельно"""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.services.duty_service import DutyService
+
+    await _seed_sector(db_session, 1, 3, 2025)
+    await _seed_sector(db_session, 2, 2, 2025)  # без участников пула
+
+    result = await DutyService.plan_all_sectors(
+        2025,
+        concurrency=1,
+        session_factory=async_sessionmaker(db_engine, expire_on_commit=False),
+    )
+
+    assert result["total_sectors"] == 2
+    assert result["planned"] == 1
+    assert [s["success"] for s in result["sectors"]] == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_plan_year_all_route(api_client, db_session):
+    """POST /duty/plan-year/all планирует сектора в тестовой БД и сообщает ошибки по секторам"""
+    await _seed_sector(db_session, 1, 3, 2025)
+    await _seed_sector(db_session, 2, 2, 2025)  # без участников пула
+
+    response = await api_client.post("/duty/plan-year/all", params={"year": 2025})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["year"] == 2025
+    assert result["total_sectors"] == 2
+    assert result["planned"] == 1
+    assert result["sectors"][0]["success"] is True
+    assert result["sectors"][0]["weeks"] > 0
+    assert result["sectors"][1] == {
+        "sector_id": 2,
+        "success": False,
+        "message": "В пуле нет активных дежурных",
+        "weeks": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_year_schedule_reads_use_date_indexes(db_engine):
+    """Чтение расписания за год - поиск по индексу диапазоном дат, без полного скана"""
+    from sqlalchemy import select, text
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateIndex
+    from app.models.duty import DutySchedule
+    from app.services.duty_service import DutyService
+
+    async def plan(query):
+        sql = str(
+            query.compile(db_engine.sync_engine, compile_kwargs={"literal_binds": True})
+        )
+        async with db_engine.connect() as conn:
+            rows = (await conn.execute(text("EXPLAIN QUERY PLAN " + sql))).all()
+        return " | ".join(row[-1] for row in rows)
+
+    columns = select(DutySchedule.user_id, DutySchedule.duty_date)
+
+    sector_plan = await plan(
+        columns.where(DutyService.in_year(2025), DutySchedule.sector_id == 1)
+    )
+    assert "USING INDEX idx_duty_schedule_sector_date_cover" in sector_plan
+    assert "sector_id=? AND duty_date>? AND duty_date<?" in sector_plan
+
+    all_plan = await plan(columns.where(DutyService.in_year(2025)))
+    assert "USING INDEX idx_duty_schedule_date_cover" in all_plan
+    assert "SCAN" not in all_plan
+
+    # В PostgreSQL индекс покрывающий: user_id в INCLUDE
+    index = next(
+        i for i in DutySchedule.__table__.indexes
+        if i.name == "idx_duty_schedule_sector_date_cover"
+    )
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert "(sector_id, duty_date) INCLUDE (user_id)" in ddl
+
+
+@pytest.mark.asyncio
+async def test_year_summary_aggregated_in_db(db_session, statement_counter):
+    """Итоги и рейтинги за год считаются одним запросом и совпадают с подсчетом по строкам"""
+    from collections import Counter
+    from sqlalchemy import select
+    from app.models.duty import DutySchedule
+    from app.services.duty_service import DutyService
+
+    await _seed_sector(db_session, 1, 6, 2025)
+    await DutyService.assign_yearly_schedule(db_session, 1, 2025)
+
+    rows = (
+        await db_session.execute(
+            select(DutySchedule.user_id, DutySchedule.duty_date).where(
+                DutySchedule.sector_id == 1
+            )
+        )
+    ).all()
+    by_month = Counter(duty_date.month for _, duty_date in rows)
+    by_user = Counter(user_id for user_id, _ in rows)
+
+    statement_counter.clear()
+    month_totals, month_tops, year_tops = await DutyService.get_year_summary(
+        db_session, 2025, 1
+    )
+    assert len(statement_counter) == 1
+
+    assert month_totals == dict(by_month)
+    assert year_tops == sorted(by_user.items(), key=lambda x: (-x[1], x[0]))[:5]
+    for month, users in month_tops.items():
+        expected = Counter(u for u, d in rows if d.month == month)
+        assert users == sorted(expected.items(), key=lambda x: (-x[1], x[0]))[:3]
+
+    assert await DutyService.get_year_summary(db_session, 2024, 1) == ({}, {}, [])
+
+
+@pytest.mark.asyncio
+async def test_year_histograms_grouped_in_db(db_session, statement_counter):
+    """Гистограммы по месяцам и дням недели ISO - один сгруппированный запрос"""
+    from app.models.duty import DutySchedule
+    from app.services.duty_service import DutyService
+
+    await _seed_sector(db_session, 1, 3, 2025)
+    days = [
+        date(2025, 1, 4),  # суббота
+        date(2025, 1, 5),  # воскресенье
+        date(2025, 3, 3),  # понедельник
+        date(2025, 12, 31),  # среда
+        date(2026, 1, 1),  # другой год
+    ]
+    for i, day in enumerate(days):
+        db_session.add(
+            DutySchedule(
+                duty_id=i + 1,
+                user_id=1001 + i % 2,
+                sector_id=1,
+                duty_date=day,
+                week_start=day - timedelta(days=day.weekday()),
+            )
+        )
+    await db_session.commit()
+
+    statement_counter.clear()
+    monthly, weekly = await DutyService.get_year_histograms(db_session, 2025, 1)
+    assert len(statement_counter) == 1
+    assert monthly == [2, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1]
+    assert weekly == [1, 0, 1, 0, 0, 1, 1]
+
+    monthly, weekly = await DutyService.get_year_histograms(
+        db_session, 2025, user_id=1002
+    )
+    assert monthly == [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1]
+    assert weekly == [0, 0, 1, 0, 0, 0, 1]
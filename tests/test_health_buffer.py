@@ -0,0 +1,75 @@
+import pytest
+
+from tests.test_health_snapshot import _seed_reports
+
+
+@pytest.mark.asyncio
+async def test_write_behind_coalesces_and_overlays(
+    db_engine, db_session, statement_counter
+):
+    """Повторные нажатия схлопываются, отчет видит их до записи в БД"""
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.models.user import Disease, Health
+    from app.services.health_buffer import HealthWriteBuffer
+    from app.services.health_snapshot import health_report_snapshot
+
+    await _seed_reports(db_session, 1, 4)
+    await health_report_snapshot.get_report(db_session, 1)
+
+    buffer = HealthWriteBuffer(
+        session_factory=async_sessionmaker(db_engine, expire_on_commit=False)
+    )
+    buffer.submit(1001, "болен", "ОРВИ")
+    buffer.submit(1001, "болен")  # заболевание не указано - остается ОРВИ
+    buffer.submit(1002, "болен")
+    buffer.submit(1003, "болен", "грипп")
+    buffer.submit(1003, "здоров", "грипп")  # не "болен" - заболевание сбрасывается
+    buffer.submit(9999, "здоров")  # неизвестный пользователь
+
+    stats, users = await health_report_snapshot.get_report(
+        db_session, 1, overrides=buffer.overrides()
+    )
+    assert stats == {"болен": 2, "здоров": 1, "не указан": 1}
+    assert {"first_name": "Иван1", "last_name": "Иванов1", "status": "болен",
+            "disease": "ОРВИ"} in users
+
+    statement_counter.clear()
+    assert await buffer.flush() == 3
+    # Выборка пользователей, upsert health, два upsert disease, обновление снимка
+    assert len(statement_counter) == 5
+    assert buffer.overrides() == {}
+
+    statuses = dict((await db_session.execute(select(Health.user_id, Health.status))).all())
+    diseases = dict((await db_session.execute(select(Disease.user_id, Disease.disease))).all())
+    assert statuses == {1001: "болен", 1002: "болен", 1003: "здоров", 1004: ""}
+    assert diseases == {1001: "ОРВИ", 1002: "", 1003: "", 1004: ""}
+    assert 9999 not in statuses
+
+    stats, _ = await health_report_snapshot.get_report(db_session, 1)
+    assert stats == {"болен": 2, "здоров": 1, "не указан": 1}
+
+
+@pytest.mark.asyncio
+async def test_write_behind_flushes_on_stop(db_engine, db_session):
+    """Фоновая запись и финальная запись при остановке"""
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.models.user import Health
+    from app.services.health_buffer import HealthWriteBuffer
+
+    await _seed_reports(db_session, 1, 2)
+
+    buffer = HealthWriteBuffer(
+        interval=3600,
+        session_factory=async_sessionmaker(db_engine, expire_on_commit=False),
+    )
+    buffer.start()
+    assert buffer.running
+    buffer.submit(1002, "в отпуске")
+    await buffer.stop()
+
+    assert not buffer.running
+    assert buffer.flushes == 1
+    status = await db_session.scalar(select(Health.status).where(Health.user_id == 1002))
+    assert status == "в отпуске"
@@ -0,0 +1,134 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+
+async def _seed_reports(db, sector_id: int, users_count: int):
+    """Пользователи сектора с ФИО, статусом здоровья и включенным отчетом"""
+    from app.models.user import User, UserStatus, FIO, Health, Disease
+
+    for i in range(1, users_count + 1):
+        user_id = sector_id * 1000 + i
+        db.add(User(user_id=user_id, first_name=f"Имя{i}", last_name=f"Фамилия{i}"))
+        db.add(FIO(user_id=user_id, first_name=f"Иван{i}", last_name=f"Иванов{i}"))
+        db.add(UserStatus(user_id=user_id, enable_report=True, sector_id=sector_id))
+        db.add(Health(user_id=user_id, status="здоров" if i % 2 else ""))
+        db.add(Disease(user_id=user_id, disease=""))
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_report_counts_by_sector(db_session):
+    """Снимок считает статусы по сектору и по всем секторам сразу"""
+    from app.services.health_service import HealthService
+
+    await _seed_reports(db_session, 1, 4)
+    await _seed_reports(db_session, 2, 3)
+
+    stats, users = await HealthService.get_report(db_session, 1)
+    assert stats == {"здоров": 2, "не указан": 2}
+    assert len(users) == 4
+    assert users[0] == {
+        "first_name": "Иван1",
+        "last_name": "Иванов1",
+        "status": "здоров",
+        "disease": "",
+    }
+
+    stats, users = await HealthService.get_report(db_session)
+    assert stats == {"здоров": 4, "не указан": 3}
+    assert len(users) == 7
+
+
+@pytest.mark.asyncio
+async def test_report_served_from_memory_after_writes(db_session, statement_counter):
+    """После записей отчет обновлен и отдается без обращения к БД"""
+    from app.services.admin_service import AdminService
+    from app.services.health_service import HealthService
+    from app.services.user_service import UserService
+
+    await _seed_reports(db_session, 1, 4)
+    await HealthService.get_report(db_session, 1)
+
+    await UserService.update_health_status(db_session, 1002, "болен")
+    await UserService.update_disease(db_session, 1002, "ОРВИ")
+    await AdminService.toggle_user_report(db_session, 1003)
+
+    statement_counter.clear()
+    stats, users = await HealthService.get_report(db_session, 1)
+    assert statement_counter == []
+
+    assert stats == {"здоров": 1, "болен": 1, "не указан": 1}
+    assert {"first_name": "Иван2", "last_name": "Иванов2", "status": "болен",
+            "disease": "ОРВИ"} in users
+    assert all(u["first_name"] != "Иван3" for u in users)
+
+
+@pytest.mark.asyncio
+async def test_daily_digest_constant_queries(db_session, statement_counter):
+    """Сводка по всем секторам строится фиксированным числом запросов"""
+    from app.models.user import Sector
+    from app.models.duty import DutySchedule
+    from app.services.health_snapshot import health_report_snapshot
+    from app.services.name_resolver import user_name_resolver
+    from app.services.report_service import ReportService
+    from datetime import date
+
+    day = date(2025, 3, 3)
+    counts = []
+    for sectors_count in (2, 6):
+        for sector_id in range(len(counts) * 10 + 1, len(counts) * 10 + sectors_count + 1):
+            db_session.add(Sector(sector_id=sector_id, name=f"Сектор {sector_id}"))
+            await _seed_reports(db_session, sector_id, 3)
+            db_session.add(
+                DutySchedule(
+                    user_id=sector_id * 1000 + 1,
+                    sector_id=sector_id,
+                    duty_date=day,
+                    week_start=day,
+                )
+            )
+        await db_session.commit()
+
+        health_report_snapshot.invalidate()
+        user_name_resolver.clear()
+        statement_counter.clear()
+        digest = await ReportService.get_daily_digest(db_session, day)
+        counts.append(len(statement_counter))
+
+    assert counts[0] == counts[1]
+    assert len(digest["sectors"]) == 8
+    sector = digest["sectors"][-1]
+    assert sector["report"]["total"] == 3
+    assert sector["duties"][0]["user_name"] == "Иванов1 Иван1"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_keep_update_made_during_load():
+    """Изменение во время перестройки не затирается второй перестройкой"""
+    from app.services.health_snapshot import HealthReportSnapshot
+
+    class SlowDB:
+        def __init__(self):
+            self.calls = 0
+            self.release = asyncio.Event()
+
+        async def execute(self, statement):
+            self.calls += 1
+            await self.release.wait()
+            return MagicMock(all=lambda: [(1, 1, "Иван", "Иванов", "здоров", "")])
+
+    db = SlowDB()
+    snapshot = HealthReportSnapshot(ttl=300)
+    loads = [asyncio.create_task(snapshot.get_report(db, 1)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    snapshot.set_user_row(1, (1, "Иван", "Иванов", "болен", "грипп"))
+    db.release.set()
+    await asyncio.gather(*loads)
+
+    assert db.calls == 1
+    stats, users = await snapshot.get_report(db, 1)
+    assert stats == {"болен": 1}
+    assert users[0]["disease"] == "грипп"
@@ -0,0 +1,56 @@
+import pytest
+
+from tests.test_duty_service import _seed_sector
+
+
+@pytest.mark.asyncio
+async def test_resolve_many_single_query_then_cached(db_session, statement_counter):
+    """Пачка имен загружается одним запросом, повтор берется из кэша"""
+    from app.services.name_resolver import user_name_resolver
+
+    await _seed_sector(db_session, 1, 40, 2025)
+    user_ids = [1000 + i for i in range(1, 41)] + [1001, 999999]
+
+    statement_counter.clear()
+    names = await user_name_resolver.resolve_many(db_session, user_ids)
+    assert len(statement_counter) == 1
+
+    assert names[1001] == "Иванов1 Иван1"
+    assert names[1002] == "Фамилия2 Имя2"
+    assert names[999999] == "Пользователь 999999"
+
+    statement_counter.clear()
+    assert await user_name_resolver.resolve_many(db_session, user_ids) == names
+    assert statement_counter == []
+
+
+@pytest.mark.asyncio
+async def test_update_user_invalidates_cached_name(db_session):
+    """Изменение пользователя через UserService сбрасывает его имя в кэше"""
+    from app.schemas.user import UserUpdate
+    from app.services.name_resolver import user_name_resolver
+    from app.services.user_service import UserService
+
+    await _seed_sector(db_session, 1, 2, 2025)
+    assert await user_name_resolver.resolve(db_session, 1002) == "Фамилия2 Имя2"
+
+    await UserService.update_user(db_session, 1002, UserUpdate(last_name="Петров"))
+
+    assert await user_name_resolver.resolve(db_session, 1002) == "Петров Имя2"
+
+
+def test_lru_and_ttl_eviction():
+    """Старые записи вытесняются по размеру и по времени жизни"""
+    from app.services.name_resolver import UserNameResolver
+
+    resolver = UserNameResolver(ttl=60, max_size=2)
+    resolver._store(1, "a")
+    resolver._store(2, "b")
+    resolver._get_cached(1)
+    resolver._store(3, "c")
+    assert resolver._get_cached(2) is None
+    assert resolver._get_cached(1) == "a"
+
+    expired = UserNameResolver(ttl=-1)
+    expired._store(1, "a")
+    assert expired._get_cached(1) is None
@@ -0,0 +1,52 @@
+import pytest
+
+from tests.test_duty_service import _seed_sector
+from tests.test_health_snapshot import _seed_reports
+
+
+@pytest.mark.asyncio
+async def test_endpoints_report_query_count(api_client, db_session):
+    """Заголовки X-DB-Queries/Server-Timing и бюджет запросов по эндпоинтам"""
+    from app.services.duty_service import DutyService
+
+    await _seed_sector(db_session, 1, 6, 2025)
+    await _seed_reports(db_session, 2, 20)
+    await DutyService.assign_yearly_schedule(db_session, 1, 2025)
+
+    response = await api_client.get(
+        "/duty/schedule/month", params={"sector_id": 1, "year": 2025, "month": 3}
+    )
+    assert response.status_code == 200
+    assert int(response.headers["X-DB-Queries"]) <= 2
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+    response = await api_client.get("/health/report", params={"sector_id": 2})
+    assert response.status_code == 200
+    assert response.json()["total"] == 20
+    assert int(response.headers["X-DB-Queries"]) <= 1
+
+    # Повторный отчет отдается из снимка в памяти
+    response = await api_client.get("/health/report", params={"sector_id": 2})
+    assert response.headers["X-DB-Queries"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_query_budget_and_repeated_shapes(db_session, query_budget):
+    """Помощник бюджета считает запросы и одинаковые формы запросов"""
+    from sqlalchemy import select
+    from app.core.query_stats import statement_shape
+    from app.models.user import User
+
+    await _seed_reports(db_session, 1, 3)
+
+    with query_budget(5) as stats:
+        for user_id in (1001, 1002, 1003):
+            await db_session.execute(select(User).where(User.user_id == user_id))
+        await db_session.execute(select(User).where(User.user_id.in_([1, 2, 3])))
+        await db_session.execute(select(User).where(User.user_id.in_([1, 2])))
+
+    assert stats.count == 5
+    assert [count for _, count in stats.repeated(2)] == [3]
+    assert statement_shape("SELECT a FROM t WHERE id IN (?, ?,  ?)") == (
+        "SELECT a FROM t WHERE id IN (?)"
+    )
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+def _retry_after(seconds):
+    from aiogram.exceptions import TelegramRetryAfter
+
+    return TelegramRetryAfter(method=MagicMock(), message="Flood", retry_after=seconds)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    """Корзина не выдает больше rate токенов в секунду сверх запаса"""
+    from bot.utils.rate_limiter import TokenBucket
+
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+
+    assert time.monotonic() - started >= 4 / 20 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_send_message_retries_after_flood_control():
+    """RetryAfter приостанавливает отправку и сообщение уходит повторно"""
+    from bot.scheduler import ReportScheduler
+
+    bot = MagicMock()
+    bot.send_message = AsyncMock(side_effect=[_retry_after(0), "ok"])
+    scheduler = ReportScheduler(bot)
+
+    assert await scheduler.send_message(-100, "текст") == "ok"
+    assert bot.send_message.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_send_all_sectors_reports_bounded_concurrency():
+    """Сектора рассылаются параллельно в пределах лимита, итоги сохраняются"""
+    from bot.scheduler import ReportScheduler
+
+    scheduler = ReportScheduler(MagicMock())
+    scheduler.concurrency = 3
+
+    active = 0
+    peak = 0
+
+    async def fake_send(chat_id, sector_id, report_data=None, duty_info=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if sector_id == 4:
+            raise RuntimeError("boom")
+        return sector_id != 5
+
+    digest = {
+        "sectors": [
+            {"sector_id": i, "name": f"S{i}", "report": {}, "duties": []}
+            for i in range(1, 9)
+        ]
+    }
+    scheduler.send_sector_report = fake_send
+
+    with patch(
+        "app.api_client.api_client.get_daily_digest", AsyncMock(return_value=digest)
+    ):
+        summary = await scheduler.send_all_sectors_reports()
+
+    assert peak == 3
+    assert summary["total"] == 8
+    assert summary["sent"] == 6
+    assert {f["sector_id"]: f["error"] for f in summary["failed"]} == {
+        4: "boom",
+        5: None,
+    }
+    assert scheduler.last_run_summary is summary
@@ -0,0 +1,90 @@
+import importlib
+import re
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_search_folds_case_and_ranks(api_client, db_session):
+    """Поиск не различает регистр кириллицы и ё/е, точные совпадения выше"""
+    from app.models.user import User, FIO
+
+    db_session.add_all(
+        [
+            User(user_id=1, first_name="Пётр", last_name="Семёнов", username="petr"),
+            User(user_id=2, first_name="Петрович", last_name="Иванов"),
+            User(user_id=3, first_name="Anna", last_name="Smith"),
+            User(user_id=4, first_name="x", last_name="y"),
+            FIO(user_id=4, first_name="Петр", last_name="Кузнецов"),
+        ]
+    )
+    await db_session.commit()
+
+    response = await api_client.get("/users/search/", params={"q": "ПЕТР"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [u["user_id"] for u in body["users"]] == [1, 4, 2]
+    assert body["total"] == 3
+
+    response = await api_client.get("/users/search/", params={"q": "семенов"})
+    assert [u["user_id"] for u in response.json()["users"]] == [1]
+
+    response = await api_client.get("/users/search/", params={"q": "SMI"})
+    assert [u["user_id"] for u in response.json()["users"]] == [3]
+
+    response = await api_client.get("/users/search/", params={"q": "%_"})
+    assert response.json()["users"] == []
+
+
+def test_search_expressions_match_migration_indexes():
+    """Выражения запроса совпадают с выражениями триграммных индексов миграции"""
+    from sqlalchemy.dialects import postgresql
+    from app.services.user_search import FIO_SEARCH_EXPRESSION, USER_SEARCH_EXPRESSION
+
+    up = " ".join(
+        importlib.import_module("migrations.versions.008_user_search_trigram")
+        .migration["up"]
+    )
+
+    def squash(sql: str) -> str:
+        return re.sub(r"[\s()]|users\.|fio\.", "", sql)
+
+    for expression in (USER_SEARCH_EXPRESSION, FIO_SEARCH_EXPRESSION):
+        sql = str(expression.compile(dialect=postgresql.dialect()))
+        # Разделители - константы, а не параметры запроса
+        assert "%(" not in sql
+        assert squash(sql) + "gin_trgm_ops" in squash(up)
+
+
+@pytest.mark.asyncio
+async def test_directory_feed_returns_changes_since_cursor(api_client, db_session):
+    """Справочник целиком и изменения начиная с курсора"""
+    from datetime import datetime
+    from app.models.user import User, FIO
+
+    db_session.add_all(
+        [
+            User(user_id=1, first_name="Иван", updated_at=datetime(2025, 3, 1, 10)),
+            User(user_id=2, first_name="Петр", updated_at=datetime(2025, 3, 2, 10)),
+            FIO(user_id=2, first_name="Пётр", last_name="Петров"),
+        ]
+    )
+    await db_session.commit()
+
+    body = (await api_client.get("/users/directory/")).json()
+    assert body["total"] == 2
+    assert body["cursor"] == "2025-03-02T10:00:00"
+    assert body["users"][1]["fio_last_name"] == "Петров"
+
+    response = await api_client.get(
+        "/users/directory/", params={"updated_since": "2025-03-02T00:00:00"}
+    )
+    body = response.json()
+    assert [u["user_id"] for u in body["users"]] == [2]
+
+    response = await api_client.get(
+        "/users/directory/", params={"updated_since": "2025-03-03T00:00:00"}
+    )
+    assert response.json() == {
+        "users": [], "total": 0, "cursor": "2025-03-03T00:00:00"
+    }
@@ -0,0 +1,131 @@
+import pytest
+
+
+async def _seed_users(db, count: int):
+    """Пользователи в двух секторах, каждый третий - админ"""
+    from app.models.user import User, UserStatus
+
+    for i in range(1, count + 1):
+        db.add(User(user_id=i, first_name=f"Имя{i}", last_name=f"Фамилия{i}"))
+        db.add(
+            UserStatus(
+                user_id=i,
+                enable_admin=i % 3 == 0,
+                enable_report=True,
+                sector_id=1 if i % 2 else 2,
+            )
+        )
+    db.add(User(user_id=count + 1, first_name="Без", last_name="Статуса"))
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_filtered_users(db_session):
+    """Страницы по курсору не пересекаются, total учитывает фильтры"""
+    from app.services.user_service import UserService
+
+    await _seed_users(db_session, 30)
+
+    assert await UserService.count_users(db_session) == 31
+    assert await UserService.count_users(db_session, enable_admin=False) == 21
+    assert await UserService.count_users(db_session, enable_admin=True, sector_id=1) == 5
+
+    seen = []
+    after = None
+    while True:
+        page = await UserService.get_all_users(
+            db_session, limit=4, after=after, enable_admin=True
+        )
+        if not page:
+            break
+        seen.extend(u.user_id for u in page)
+        after = page[-1].user_id
+
+    assert seen == list(range(3, 31, 3))
+
+
+@pytest.mark.asyncio
+async def test_sector_admins_follow_cursor():
+    """Планировщик забирает админов сектора постранично с фильтром на API"""
+    from unittest.mock import AsyncMock, MagicMock, patch
+    from bot.scheduler import ReportScheduler
+
+    pages = AsyncMock(
+        side_effect=[
+            {"users": [{"user_id": 3}, {"user_id": 9}], "next_cursor": 9},
+            {"users": [{"user_id": 15}], "next_cursor": None},
+        ]
+    )
+
+    with patch("app.api_client.api_client.get_admin_users_list", pages):
+        admins = await ReportScheduler(MagicMock()).get_sector_admins(1)
+
+    assert admins == [3, 9, 15]
+    assert pages.await_args_list[1].kwargs["after"] == 9
+    assert pages.await_args_list[0].kwargs["enable_admin"] is True
+
+
+@pytest.mark.asyncio
+async def test_set_health_status_single_transaction(db_session, statement_counter):
+    """Статус и заболевание пишутся upsert-ами в одной транзакции"""
+    from sqlalchemy import select
+    from app.models.user import Disease
+    from app.services.user_service import UserService
+
+    await _seed_users(db_session, 1)
+
+    statement_counter.clear()
+    row = await UserService.set_health_status(db_session, 1, "болен", "орви")
+    assert len(statement_counter) == 3
+    assert (row["status"], row["disease"], row["first_name"]) == ("болен", "орви", "Имя1")
+
+    # "болен" без заболевания сохраняет текущее, другой статус сбрасывает
+    row = await UserService.set_health_status(db_session, 1, "болен")
+    assert row["disease"] == "орви"
+    row = await UserService.set_health_status(db_session, 1, "здоров", "орви")
+    assert row["disease"] == ""
+    assert await db_session.scalar(select(Disease.disease)) == ""
+
+    assert await UserService.set_health_status(db_session, 404, "здоров") is None
+    assert await db_session.scalar(select(Disease).where(Disease.user_id == 404)) is None
+
+
+def test_set_health_status_postgres_single_statement():
+    """В PostgreSQL оба upsert выполняются в CTE одного выражения"""
+    from sqlalchemy.dialects import postgresql
+    from app.services.user_service import UserService
+
+    health_stmt, disease_stmt = UserService._health_upserts(
+        "postgresql", 1, "болен", "орви"
+    )
+    query = UserService._health_upsert_query(health_stmt, disease_stmt)
+    sql = " ".join(str(query.compile(dialect=postgresql.dialect())).split())
+
+    assert sql.startswith("WITH h AS (INSERT INTO health")
+    assert "d AS (INSERT INTO disease" in sql
+    assert sql.count("ON CONFLICT (user_id) DO UPDATE") == 2
+    assert sql.count("RETURNING") == 2
+
+
+@pytest.mark.asyncio
+async def test_relationships_load_only_by_profile(db_session, statement_counter):
+    """select(User) не тянет связи; профиль "detail" грузит их тем же запросом"""
+    from sqlalchemy.exc import InvalidRequestError
+    from app.services.user_service import UserService
+
+    await _seed_users(db_session, 10)
+    db_session.expunge_all()
+
+    statement_counter.clear()
+    page = await UserService.get_all_users(db_session, limit=10)
+    assert len(page) == 10
+    assert len(statement_counter) == 1
+    with pytest.raises(InvalidRequestError):
+        page[0].status_info
+
+    db_session.expunge_all()
+    statement_counter.clear()
+    user = await UserService.get_user_by_id(db_session, 3, profile="detail")
+    assert len(statement_counter) == 1
+    assert user.status_info.enable_admin is True
+    assert user.health_info is None